@@ -0,0 +1,154 @@
+"""
+Semantik yanıt önbelleği (üretimden önce).
+Sosyal medya şikayetleri çok tekrarlı: aynı fatura şikayetinin farklı yazımları için
+LLM yanıtını yeniden üretmek yerine, sorgu embedding benzerliği eşiği geçen önceki
+GenOut sonucu döndürülür.
+- Kapsam: seçilen tool/kategori (farklı kategoride eşleşme yapılmaz)
+- TTL + boyut sınırlı (LRU) tahliye
+- Korpus damgası (ingest_from_json her çalıştığında güncellenir) değişince tamamı geçersiz
+"""
+from __future__ import annotations
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+
+# ---- Config ----
+_ENABLED: bool = bool(getattr(settings, "answer_cache_enabled", True))
+_MAX_ITEMS: int = int(getattr(settings, "answer_cache_size", 1000))
+_TTL_S: int = int(getattr(settings, "answer_cache_ttl_s", 6 * 3600))
+_THRESHOLD: float = float(getattr(settings, "answer_cache_threshold", 0.95))
+_STAMP_PATH: str = os.path.abspath(getattr(settings, "corpus_stamp_path", "data/corpus_version"))
+
+# ---- Korpus damgası (süreçler arası geçersiz kılma) ----
+def corpus_stamp() -> float:
+    try:
+        return os.stat(_STAMP_PATH).st_mtime
+    except OSError:
+        return 0.0
+
+def bump_corpus_stamp() -> None:
+    """Korpus değişti: bu damgayı izleyen tüm süreçlerin önbellekleri boşalır."""
+    os.makedirs(os.path.dirname(_STAMP_PATH) or ".", exist_ok=True)
+    with open(_STAMP_PATH, "w", encoding="utf-8") as f:
+        f.write(str(time.time_ns()))
+    ANSWER_CACHE.invalidate()
+
+class SemanticAnswerCache:
+    def __init__(self, max_items: int = _MAX_ITEMS, ttl_s: int = _TTL_S,
+                 threshold: float = _THRESHOLD, enabled: bool = _ENABLED):
+        self.max_items = max(int(max_items), 0)
+        self.ttl_s = int(ttl_s)
+        self.threshold = float(threshold)
+        self.enabled = enabled and self.max_items > 0
+        self._lock = threading.Lock()
+        # scope → OrderedDict[sıra no. (son kullanım), (unit_vec, payload, created_at)]
+        self._scopes: Dict[str, "OrderedDict[int, Tuple[np.ndarray, Dict, float]]"] = {}
+        # scope → (keys, matrix) yığılmış vektör önbelleği; scope değişince düşer
+        self._mats: Dict[str, Tuple[list, np.ndarray]] = {}
+        self._seq = 0
+        self._stamp = corpus_stamp()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._scopes.values())
+
+    @staticmethod
+    def _unit(vec) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n > 0 else v
+
+    def _check_stamp(self) -> None:
+        stamp = corpus_stamp()
+        if stamp != self._stamp:
+            self._scopes.clear()
+            self._mats.clear()
+            self._stamp = stamp
+
+    def _evict(self, now: float) -> None:
+        for scope, entries in list(self._scopes.items()):
+            expired = [k for k, (_, _, ts) in entries.items() if now - ts > self.ttl_s]
+            for k in expired:
+                entries.pop(k, None)
+            if expired:
+                self._mats.pop(scope, None)
+        while len(self) > self.max_items:
+            # en eski kullanılmış kaydı at (scope'lar arasında en küçük sıra no.)
+            scope = min((s for s in self._scopes if self._scopes[s]), key=lambda s: next(iter(self._scopes[s])))
+            self._scopes[scope].popitem(last=False)
+            self._mats.pop(scope, None)
+
+    def lookup(self, vec, scope: Optional[str]) -> Optional[Tuple[Dict, float]]:
+        """(payload, benzerlik) ya da None."""
+        if not self.enabled:
+            return None
+        scope = scope or "other"
+        q = self._unit(vec)
+        now = time.time()
+        with self._lock:
+            self._check_stamp()
+            entries = self._scopes.get(scope)
+            if not entries:
+                self.misses += 1
+                return None
+            cached = self._mats.get(scope)
+            if cached is None:
+                keys = list(entries.keys())
+                mat = np.stack([entries[k][0] for k in keys])
+                cached = (keys, mat)
+                self._mats[scope] = cached
+            keys, mat = cached
+            sims = mat @ q
+            best = int(np.argmax(sims))
+            sim = float(sims[best])
+            key = keys[best]
+            unit, payload, ts = entries[key]
+            if sim < self.threshold or now - ts > self.ttl_s:
+                self.misses += 1
+                return None
+            # Son kullanım sırası yeni sıra numarasıyla: kapsamlar arası LRU ilk anahtarları karşılaştırır
+            self._seq += 1
+            entries[self._seq] = entries.pop(key)
+            self._mats.pop(scope, None)
+            self.hits += 1
+            return dict(payload), sim
+
+    def store(self, vec, scope: Optional[str], payload: Dict) -> None:
+        if not self.enabled:
+            return
+        scope = scope or "other"
+        now = time.time()
+        with self._lock:
+            self._check_stamp()
+            self._seq += 1
+            self._scopes.setdefault(scope, OrderedDict())[self._seq] = (self._unit(vec), dict(payload), now)
+            self._mats.pop(scope, None)
+            self._evict(now)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+            self._mats.clear()
+            self._stamp = corpus_stamp()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "items": len(self),
+                "scopes": {s: len(e) for s, e in self._scopes.items()},
+                "hits": self.hits,
+                "misses": self.misses,
+                "threshold": self.threshold,
+                "ttl_s": self.ttl_s,
+            }
+
+# Tekil önbellek nesnemiz
+ANSWER_CACHE = SemanticAnswerCache()
@@ -0,0 +1,115 @@
+"""
+Filtreli (category == "...") ve partition'lı arama gecikmesi karşılaştırması.
+Geçici bir koleksiyona kategori partition'larına dağıtılmış rastgele vektörler yazılır;
+koleksiyon adım adım büyütülürken her boyutta iki yol aynı veri üzerinde ölçülür.
+
+  python -m src.bench_partitions --sizes 2000,10000,50000 --queries 50
+"""
+from __future__ import annotations
+
+import time
+from statistics import median
+from typing import Dict, List
+
+import numpy as np
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+
+from .config import settings
+from .project_pipeline import _connect_milvus, _partition_name
+
+_CATEGORIES = ["billing", "roaming", "package", "coverage", "app"]
+
+def _p95(xs: List[float]) -> float:
+    return float(np.percentile(xs, 95)) if xs else 0.0
+
+def _create(name: str, dim: int) -> Collection:
+    fields = [
+        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=False),
+        FieldSchema(name="category", dtype=DataType.VARCHAR, max_length=32),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=dim),
+    ]
+    col = Collection(name, CollectionSchema(fields, description="Diyoloji partition bench"))
+    for c in _CATEGORIES:
+        col.create_partition(_partition_name(c))
+    col.create_index(field_name="embedding", index_params=settings.milvus_index_params())
+    return col
+
+def _grow(col: Collection, start: int, stop: int, dim: int, rng: np.random.Generator) -> None:
+    batch = 2000
+    for lo in range(start, stop, batch):
+        hi = min(lo + batch, stop)
+        cats = rng.choice(_CATEGORIES, size=hi - lo)
+        vecs = rng.standard_normal((hi - lo, dim)).astype(np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        for c in _CATEGORIES:
+            rows = np.flatnonzero(cats == c)
+            if rows.size:
+                col.insert(
+                    [(rows + lo).tolist(), [c] * rows.size, list(vecs[rows])],
+                    partition_name=_partition_name(c),
+                )
+    col.flush()
+
+def _measure(col: Collection, queries: np.ndarray, top_k: int, partitioned: bool) -> List[float]:
+    params = settings.milvus_search_params()
+    lat = []
+    for i, q in enumerate(queries):
+        c = _CATEGORIES[i % len(_CATEGORIES)]
+        t0 = time.perf_counter()
+        col.search(
+            data=[q],
+            anns_field="embedding",
+            param=params,
+            limit=top_k,
+            expr=None if partitioned else f'category == "{c}"',
+            partition_names=[_partition_name(c)] if partitioned else None,
+            output_fields=["category"],
+            consistency_level=settings.milvus_consistency,
+        )
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    return lat
+
+def run(sizes: List[int], n_queries: int = 50, top_k: int = 12, keep: bool = False) -> List[Dict]:
+    _connect_milvus()
+    dim = settings.milvus_dim
+    name = f"diyoloji_bench_{int(time.time())}"
+    rng = np.random.default_rng(42)
+    col = _create(name, dim)
+    results: List[Dict] = []
+    try:
+        have = 0
+        for size in sorted(sizes):
+            _grow(col, have, size, dim, rng)
+            have = size
+            col.load()
+            queries = rng.standard_normal((n_queries, dim)).astype(np.float32)
+            # ısınma
+            _measure(col, queries[:3], top_k, partitioned=False)
+            _measure(col, queries[:3], top_k, partitioned=True)
+            filt = _measure(col, queries, top_k, partitioned=False)
+            part = _measure(col, queries, top_k, partitioned=True)
+            row = {
+                "rows": size,
+                "filter_p50_ms": round(median(filt), 2),
+                "filter_p95_ms": round(_p95(filt), 2),
+                "partition_p50_ms": round(median(part), 2),
+                "partition_p95_ms": round(_p95(part), 2),
+            }
+            results.append(row)
+            print(row)
+            col.release()
+    finally:
+        if not keep:
+            utility.drop_collection(name)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Diyoloji - filtreli vs partition'lı Milvus arama benchmark'ı")
+    ap.add_argument("--sizes", type=str, default="2000,10000,50000", help="Virgülle ayrılmış koleksiyon boyutları")
+    ap.add_argument("--queries", type=int, default=50, help="Her boyutta ölçülecek sorgu sayısı")
+    ap.add_argument("--top-k", type=int, default=12)
+    ap.add_argument("--keep", action="store_true", help="Geçici koleksiyonu silme")
+    args = ap.parse_args()
+    run([int(x) for x in args.sizes.split(",") if x.strip()], n_queries=args.queries, top_k=args.top_k, keep=args.keep)
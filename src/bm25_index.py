@@ -0,0 +1,164 @@
+"""
+Türkçe'ye duyarlı BM25 (rank-bm25) sözcüksel indeks.
+- İ/ı/I ve diğer TR harfleri ASCII'ye katlanır ("Yurtdışı" == "yurtdisi")
+- Hafif ek temizleme (paketim → paket, faturası → fatura)
+- Token listeleri ingest sırasında yerel indeksin yanına yazılır: <LOCAL_INDEX_DIR>/<koleksiyon>/bm25.json
+Metin/URL/kategori bilgisi yerel NumPy indeksinden (local_index) okunur.
+"""
+from __future__ import annotations
+
+import os
+import re
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from . import local_index
+
+_BM25_FILE = "bm25.json"
+
+_FOLD = str.maketrans({
+    "İ": "i", "I": "i", "ı": "i", "i": "i",
+    "Ç": "c", "ç": "c", "Ğ": "g", "ğ": "g", "Ö": "o", "ö": "o",
+    "Ş": "s", "ş": "s", "Ü": "u", "ü": "u", "Â": "a", "â": "a", "Î": "i", "î": "i", "Û": "u", "û": "u",
+})
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+# Katlanmış (ASCII) hâlde, tek geçişte en uzun eşleşen ek atılır.
+# Çok harfli eklerde kök >= 4, tek harfli eklerde kök >= 5 karakter kalmalı.
+_SUFFIXES = sorted({
+    # çoğul (+ hâl)
+    "larindan", "lerinden", "larinin", "lerinin", "larini", "lerini", "larina", "lerine",
+    "larinda", "lerinde", "lardan", "lerden", "larda", "lerde", "lara", "lere", "lari", "leri", "lar", "ler",
+    # iyelik + hâl
+    "sindan", "sinden", "sundan", "sunden", "sinda", "sinde", "sunda", "sunde", "sini", "sunu", "sina", "sine",
+    "indan", "inden", "undan", "unden", "inda", "inde", "unda", "unde", "ini", "unu", "ina", "ine", "una", "une",
+    # hâl
+    "nin", "nun", "dan", "den", "tan", "ten", "da", "de", "ta", "te", "ya", "ye", "yi", "yu", "ni", "nu",
+    "yla", "yle", "la", "le",
+    # iyelik
+    "imiz", "iniz", "umuz", "unuz", "im", "um", "in", "un", "si", "su",
+    "i", "u", "m", "n",
+}, key=len, reverse=True)
+
+def tr_fold(s: str) -> str:
+    return (s or "").translate(_FOLD).lower()
+
+def _stem(tok: str) -> str:
+    if tok.isdigit():
+        return tok
+    for suf in _SUFFIXES:
+        if tok.endswith(suf) and len(tok) - len(suf) >= (4 if len(suf) > 1 else 5):
+            return tok[: -len(suf)]
+    return tok
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall(tr_fold(text))]
+
+class BM25Index:
+    def __init__(self, path: str):
+        self.path = path
+        self.ids = np.zeros((0,), dtype=np.int64)
+        self._bm25: Optional[BM25Okapi] = None
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    @classmethod
+    def build(cls, idx: "local_index.LocalVectorIndex") -> "BM25Index":
+        """Yerel indeksteki tüm chunk metinlerinden token listelerini üret ve kaydet."""
+        out = cls(idx.path)
+        tokens = [tokenize(t) for t in idx.texts]
+        out.ids = idx.ids.copy()
+        out._bm25 = BM25Okapi(tokens) if tokens else None
+        os.makedirs(idx.path, exist_ok=True)
+        tmp = os.path.join(idx.path, _BM25_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ids": out.ids.tolist(), "tokens": tokens}, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(idx.path, _BM25_FILE))
+        return out
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        out = cls(path)
+        fp = os.path.join(path, _BM25_FILE)
+        if not os.path.exists(fp):
+            return out
+        with open(fp, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        out.ids = np.asarray(obj["ids"], dtype=np.int64)
+        out._bm25 = BM25Okapi(obj["tokens"]) if obj["tokens"] else None
+        return out
+
+    def top(self, query: str, top_k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """(row_id, bm25_score) listesi; sadece skoru > 0 olanlar."""
+        if self._bm25 is None or top_k <= 0:
+            return []
+        q = tokenize(query)
+        if not q:
+            return []
+        scores = np.asarray(self._bm25.get_scores(q), dtype=np.float32)
+        if allowed is not None:
+            masked = np.full_like(scores, -1.0)
+            masked[allowed] = scores[allowed]
+            scores = masked
+        k = min(int(top_k), scores.shape[0])
+        part = np.argpartition(-scores, k - 1)[:k]
+        part = part[np.argsort(-scores[part], kind="stable")]
+        return [(int(self.ids[i]), float(scores[i])) for i in part.tolist() if scores[i] > 0]
+
+def search(query: str, category: Optional[str], top_k: int, name: Optional[str] = None) -> List[Dict]:
+    """
+    Sadece sözcüksel arama (embedding çağrısı yok). search() ile aynı çıktı şekli;
+    score = bm25 / en iyi bm25 (0..1, büyük DAHA İYİ), ham skor 'bm25_score' alanında.
+    """
+    idx = local_index.get_index(name)
+    bm = get_index(name)
+    allowed = None
+    if category:
+        rows = idx.rows_for_category(category)
+        if not rows.size:
+            return []
+        # local indeks satırları → bm25 satırları (aynı sıra, id ile doğrula)
+        allowed = rows if np.array_equal(bm.ids, idx.ids) else np.flatnonzero(np.isin(bm.ids, idx.ids[rows]))
+    ranked = bm.top(query, top_k, allowed)
+    if not ranked:
+        return []
+    best = ranked[0][1] or 1.0
+    hits = []
+    for rid, sc in ranked:
+        h = idx.hit(rid)
+        if h is None:
+            continue
+        h["score"] = sc / best
+        h["bm25_score"] = sc
+        hits.append(h)
+    return hits
+
+# ---- Süreç içi önbellek: bm25.json değişince yeniden yükle ----
+_CACHE: Dict[str, "tuple[float, BM25Index]"] = {}
+_CACHE_LOCK = threading.Lock()
+
+def get_index(name: Optional[str] = None) -> BM25Index:
+    path = local_index.index_path(name)
+    try:
+        mtime = os.stat(os.path.join(path, _BM25_FILE)).st_mtime
+    except OSError:
+        mtime = 0.0
+    with _CACHE_LOCK:
+        hit = _CACHE.get(path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+        bm = BM25Index.load(path)
+        _CACHE[path] = (mtime, bm)
+        return bm
+
+def rebuild(name: Optional[str] = None, idx: Optional["local_index.LocalVectorIndex"] = None) -> int:
+    """Ingest sonunda çağrılır: yerel indeksten (idx: ingest'in yazdığı nesne) BM25 token dosyasını yeniden üretir."""
+    bm = BM25Index.build(idx if idx is not None else local_index.get_index(name, writable=True))
+    with _CACHE_LOCK:
+        _CACHE.pop(bm.path, None)
+    return len(bm)
@@ -0,0 +1,161 @@
+"""
+Sorgu embedding'iyle kategori yönlendirme: anahtar kelimeler kaçırdığında LLM sınıflandırıcısından önce denenir.
+- Ingest sonunda yerel indeksteki chunk vektörlerinden kategori merkezleri (centroid) çıkarılır:
+  <LOCAL_INDEX_DIR>/<koleksiyon>/centroids.npz (satırları birim normlu vektörlerin ortalaması; "history" hariç).
+  Dosya yoksa (eski indeks, snapshot) merkezler ilk kullanımda bellekte hesaplanır.
+- CATEGORY_ROUTER=centroid: sorgu vektörüne kosinüsü en yüksek merkez
+  CATEGORY_ROUTER=knn: en yakın CATEGORY_ROUTER_K chunk'ın kategori başına benzerlik toplamı / K
+- Karar yalnızca en iyi skor ≥ CATEGORY_ROUTER_MIN_SIM ve ikinciden en az CATEGORY_ROUTER_MARGIN öndeyse
+  verilir; aksi hâlde None (eski akış: LLM sınıflandırıcı).
+Sorgu vektörü arama / yanıt önbelleği için zaten hesaplanıyor; yönlendirme ek API çağrısı yapmaz.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+from . import local_index
+
+_FILE = "centroids.npz"
+_SKIP = {"history"}
+
+def centroid_path(name: Optional[str] = None) -> str:
+    return os.path.join(local_index.index_path(name), _FILE)
+
+def _unit_rows(V: np.ndarray) -> np.ndarray:
+    V = np.asarray(V, dtype=np.float32)
+    n = np.linalg.norm(V, axis=-1, keepdims=True)
+    return V / np.where(n > 0, n, 1.0)
+
+class CategoryRouter:
+    def __init__(self, categories: List[str], centroids: np.ndarray, counts: np.ndarray):
+        self.categories = list(categories)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_index(cls, idx: "local_index.LocalVectorIndex") -> "CategoryRouter":
+        cats, cents, counts = [], [], []
+        for cat in sorted({str(c) for c in np.unique(idx.categories)} - _SKIP):
+            rows = idx.rows_for_category(cat)
+            if not rows.size:
+                continue
+            c = _unit_rows(idx.vectors[rows]).mean(axis=0)
+            cats.append(cat)
+            cents.append(c / max(float(np.linalg.norm(c)), 1e-12))
+            counts.append(int(rows.size))
+        dim = int(idx.dim)
+        return cls(cats, np.asarray(cents, dtype=np.float32).reshape(len(cats), dim), np.asarray(counts))
+
+    @classmethod
+    def load(cls, path: str) -> "CategoryRouter":
+        with np.load(path, allow_pickle=False) as z:
+            return cls([str(c) for c in z["categories"]], z["centroids"], z["counts"])
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                categories=np.asarray(self.categories, dtype=str),
+                centroids=self.centroids,
+                counts=self.counts,
+                model=np.asarray(settings.openai_embed_model),
+            )
+        os.replace(tmp, path)
+
+    def scores(self, qv) -> np.ndarray:
+        """Kategori başına kosinüs (self.categories sırasıyla)."""
+        if not self.categories:
+            return np.zeros((0,), dtype=np.float32)
+        return self.centroids @ _unit_rows(qv).reshape(-1)
+
+def _knn_scores(idx: "local_index.LocalVectorIndex", qv, k: int) -> Tuple[List[str], np.ndarray]:
+    """En yakın k chunk'ın (history hariç) kategori başına kosinüs toplamı / k."""
+    if not len(idx):
+        return [], np.zeros((0,), dtype=np.float32)
+    q = _unit_rows(qv).reshape(-1)
+    norms = np.asarray(idx.norms, dtype=np.float32)
+    sims = (np.asarray(idx.vectors) @ q) / np.where(norms > 0, norms, 1.0)
+    for cat in _SKIP:
+        rows = idx.rows_for_category(cat)
+        if rows.size:
+            sims[rows] = -np.inf
+    k = max(min(int(k), sims.shape[0]), 1)
+    top = np.argpartition(-sims, k - 1)[:k]
+    votes: Dict[str, float] = {}
+    for i in top.tolist():
+        if np.isfinite(sims[i]):
+            c = str(idx.categories[i])
+            votes[c] = votes.get(c, 0.0) + float(sims[i])
+    cats = sorted(votes)
+    return cats, np.asarray([votes[c] / k for c in cats], dtype=np.float32)
+
+def _decide(cats: List[str], scores: np.ndarray, min_sim: float, margin: float) -> Optional[str]:
+    if not len(cats):
+        return None
+    order = np.argsort(-scores)
+    best = float(scores[order[0]])
+    second = float(scores[order[1]]) if len(order) > 1 else -1.0
+    if best < min_sim or best - second < margin:
+        return None
+    return cats[int(order[0])]
+
+# ---- Süreç içi önbellek: centroids.npz değişince (yeni ingest) yeniden yükle ----
+_CACHE: Dict[str, "tuple[object, CategoryRouter]"] = {}
+_CACHE_LOCK = threading.Lock()
+
+def get_router(name: Optional[str] = None) -> CategoryRouter:
+    path = centroid_path(name)
+    idx = None
+    try:
+        key: object = os.stat(path).st_mtime
+    except OSError:
+        # Dosya yok → indeksten bellekte hesapla (indeks nesnesi değişince yeniden)
+        idx = local_index.get_index(name)
+        key = ("index", id(idx), len(idx))
+    with _CACHE_LOCK:
+        hit = _CACHE.get(path)
+        if hit is not None and hit[0] == key:
+            return hit[1]
+    router = CategoryRouter.load(path) if idx is None else CategoryRouter.from_index(idx)
+    with _CACHE_LOCK:
+        _CACHE[path] = (key, router)
+    return router
+
+def build(name: Optional[str] = None, idx: Optional["local_index.LocalVectorIndex"] = None) -> Dict[str, int]:
+    """
+    Ingest sonunda çağrılır: yerel indeksten (idx: ingest'in yazdığı nesne) kategori merkezlerini yazar;
+    kategori → chunk sayısı.
+    """
+    router = CategoryRouter.from_index(idx if idx is not None else local_index.get_index(name, writable=True))
+    path = centroid_path(name)
+    router.save(path)
+    with _CACHE_LOCK:
+        _CACHE.pop(path, None)
+    return dict(zip(router.categories, router.counts.tolist()))
+
+def route(
+    qv,
+    mode: Optional[str] = None,
+    min_sim: Optional[float] = None,
+    margin: Optional[float] = None,
+    name: Optional[str] = None,
+) -> Optional[str]:
+    """Sorgu vektörü → kategori ya da None (kararsız / CATEGORY_ROUTER=off)."""
+    mode = (mode or getattr(settings, "category_router", "off") or "off").lower()
+    if mode == "off" or qv is None:
+        return None
+    min_sim = float(getattr(settings, "category_router_min_sim", 0.2) if min_sim is None else min_sim)
+    margin = float(getattr(settings, "category_router_margin", 0.02) if margin is None else margin)
+    if mode == "knn":
+        cats, scores = _knn_scores(local_index.get_index(name), qv, int(getattr(settings, "category_router_k", 20)))
+    else:
+        router = get_router(name)
+        cats, scores = router.categories, router.scores(qv)
+    return _decide(cats, scores, min_sim, margin)
@@ -0,0 +1,140 @@
+"""
+Türkçe cümle/paragraf sınırına saygılı, token ölçülü chunk'layıcı (CHUNKER=sentence).
+- Paragraf (boş satır / satır sonu) ve cümle sınırlarından böler; kısaltmalar (T.C., vb., No.)
+  ve madde numaraları ("3.") cümle sonu sayılmaz
+- Uzunluk embed modelinin tokenizer'ı ile ölçülür (CHUNK_TOKENS, örtüşme CHUNK_OVERLAP_TOKENS)
+- Boilerplate: "Diğer içerikler" / "Benzer içerikler" sonrası kesilir, çerez bildirimleri atılır,
+  çok sayıda sayfada birebir tekrar eden cümleler (repeated_sentences) çıkarılabilir
+"""
+from __future__ import annotations
+
+import re
+import hashlib
+from collections import Counter
+from typing import Iterable, List, Optional, Set
+
+from .tokenizer import count_tokens
+
+_ABBREV = {
+    "t.c", "vb", "vs", "vd", "dr", "prof", "doç", "av", "no", "nr", "örn", "bkz", "sn", "st",
+    "cad", "mah", "sok", "apt", "tel", "ltd", "şti", "a.ş", "tic", "san", "yy", "s", "ör",
+}
+_SENT_RE = re.compile(r"(?<=[.!?…])[\"”’)]*\s+(?=[\"“'(]?[A-ZÇĞİÖŞÜ0-9])")
+_PARA_RE = re.compile(r"\n\s*\n|\r?\n")
+_ORDINAL_RE = re.compile(r"(?:^|\s)\d{1,2}\.$")
+_INITIAL_RE = re.compile(r"(?:^|[\s.])[A-ZÇĞİÖŞÜ]\.$")
+_TAIL_RE = re.compile(
+    r"\b(?:diğer|benzer|ilgili|önerilen)\s+içerikler\b.*$", re.IGNORECASE | re.DOTALL
+)
+_COOKIE_RE = re.compile(r"(çerez|cookie)", re.IGNORECASE)
+_COOKIE_CTX_RE = re.compile(r"(kullan|kabul|politika|tercih|ayar|onay|accept|policy)", re.IGNORECASE)
+
+def _fold(s: str) -> str:
+    return " ".join((s or "").replace("İ", "i").replace("I", "ı").lower().split())
+
+def sentence_key(sentence: str) -> str:
+    return hashlib.sha1(_fold(sentence).encode("utf-8")).hexdigest()
+
+def _ends_with_abbrev(seg: str) -> bool:
+    if _ORDINAL_RE.search(seg) or _INITIAL_RE.search(seg):
+        return True
+    last = seg.rsplit(None, 1)[-1] if seg.strip() else ""
+    return _fold(last).rstrip(".") in _ABBREV
+
+def split_sentences(text: str) -> List[str]:
+    out: List[str] = []
+    for seg in _SENT_RE.split(text or ""):
+        seg = seg.strip()
+        if not seg:
+            continue
+        if out and _ends_with_abbrev(out[-1]):
+            out[-1] = f"{out[-1]} {seg}"
+        else:
+            out.append(seg)
+    return out
+
+def split_paragraphs(text: str) -> List[List[str]]:
+    """Paragraf listesi; her paragraf cümle listesi. "Diğer içerikler" sonrası atılır."""
+    text = _TAIL_RE.sub("", text or "")
+    paras = []
+    for p in _PARA_RE.split(text):
+        sents = split_sentences(" ".join(p.split()))
+        if sents:
+            paras.append(sents)
+    return paras
+
+def is_boilerplate(sentence: str) -> bool:
+    return bool(_COOKIE_RE.search(sentence) and _COOKIE_CTX_RE.search(sentence))
+
+def repeated_sentences(texts: Iterable[str], min_pages: int) -> Set[str]:
+    """En az `min_pages` farklı sayfada birebir geçen cümlelerin anahtarları (sentence_key)."""
+    if min_pages <= 0:
+        return set()
+    seen: Counter = Counter()
+    for text in texts:
+        seen.update({sentence_key(s) for para in split_paragraphs(text) for s in para})
+    return {k for k, n in seen.items() if n >= min_pages}
+
+def _split_long(sentence: str, max_tokens: int) -> List[str]:
+    """Tek başına sınırı aşan cümleyi kelime sınırından böl."""
+    parts, cur, cur_t = [], [], 0
+    for w in sentence.split():
+        t = count_tokens(w + " ")
+        if cur and cur_t + t > max_tokens:
+            parts.append(" ".join(cur))
+            cur, cur_t = [], 0
+        cur.append(w)
+        cur_t += t
+    if cur:
+        parts.append(" ".join(cur))
+    return parts
+
+def chunk_sentences(
+    text: str,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    drop: Optional[Set[str]] = None,
+    keep_first: int = 1,
+) -> List[str]:
+    """
+    Cümleleri max_tokens'a kadar paketler; chunk yarıdan fazla doluysa paragraf sonunda keser.
+    Yeni chunk, bir öncekinin son cümlelerinden overlap_tokens kadarıyla başlar.
+    keep_first: metnin ilk N cümlesi (başlık) boilerplate filtresinden muaf.
+    """
+    drop = drop or set()
+    units: List[tuple] = []  # (cümle, token, paragraf_sonu)
+    idx = 0
+    for para in split_paragraphs(text):
+        kept = []
+        for s in para:
+            idx += 1
+            if idx > keep_first and (is_boilerplate(s) or (drop and sentence_key(s) in drop)):
+                continue
+            kept.append(s)
+        for j, s in enumerate(kept):
+            pieces = [s] if count_tokens(s) <= max_tokens else _split_long(s, max_tokens)
+            for k, p in enumerate(pieces):
+                units.append((p, count_tokens(p), j == len(kept) - 1 and k == len(pieces) - 1))
+
+    chunks: List[str] = []
+    cur: List[tuple] = []
+    cur_t = 0
+    for u in units:
+        if cur and cur_t + u[1] > max_tokens:
+            chunks.append(" ".join(x[0] for x in cur))
+            # örtüşme: sondan geriye overlap_tokens'ı aşmayacak kadar cümle taşı
+            carry, carry_t = [], 0
+            for x in reversed(cur):
+                if carry_t + x[1] > overlap_tokens or carry_t + x[1] + u[1] > max_tokens:
+                    break
+                carry.insert(0, x)
+                carry_t += x[1]
+            cur, cur_t = carry, carry_t
+        cur.append(u)
+        cur_t += u[1]
+        if u[2] and cur_t >= max_tokens // 2:
+            chunks.append(" ".join(x[0] for x in cur))
+            cur, cur_t = [], 0
+    if cur:
+        chunks.append(" ".join(x[0] for x in cur))
+    return chunks
@@ -0,0 +1,89 @@
+"""
+Blue/green koleksiyon sürümleri için takma ad (alias) durumu.
+MILVUS_ALIAS boşsa her şey eskisi gibi MILVUS_COLLECTION üzerinden çalışır.
+Doluysa:
+  - Milvus'ta arama/yazma alias adıyla yapılır; alias'ı hangi sürüme (<alias>_v<zaman>) bağlayacağını
+    Milvus sunucusu çözer (alter_alias atomiktir)
+  - Yerel yapılar (NumPy indeksi, BM25, metin deposu) ve ingest manifest'i fiziksel sürüm adıyla tutulur;
+    etkin sürüm MILVUS_ALIAS_STATE dosyasından okunur (mtime önbellekli, süreçler arası geçerli)
+Bu modül Milvus'a bağlanmaz; sürüm oluşturma/geçiş project_pipeline.rebuild_collection'dadır.
+"""
+from __future__ import annotations
+
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Optional
+
+from .config import settings
+
+_LOCK = threading.Lock()
+_CACHE: Dict[str, object] = {"mtime": None, "data": {}}
+
+def alias_name() -> str:
+    return (getattr(settings, "milvus_alias", "") or "").strip()
+
+def _state_path() -> str:
+    return os.path.abspath(getattr(settings, "milvus_alias_state", "./data/milvus_alias.json"))
+
+def _load() -> Dict[str, Dict]:
+    path = _state_path()
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+    with _LOCK:
+        if _CACHE["mtime"] != mtime:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    _CACHE["data"] = json.load(f)
+            except Exception as e:
+                print(f"[warn] alias state unreadable ({path}): {e}")
+                _CACHE["data"] = {}
+            _CACHE["mtime"] = mtime
+        return _CACHE["data"]  # type: ignore[return-value]
+
+def state(alias: Optional[str] = None) -> Dict[str, object]:
+    """{"current": sürüm|None, "previous": [en yeni → en eski], "updated_at": ts}"""
+    alias = alias or alias_name()
+    st = _load().get(alias) or {}
+    return {"current": st.get("current"), "previous": list(st.get("previous") or []), "updated_at": st.get("updated_at")}
+
+def serving_name() -> str:
+    """Milvus'ta okuma/yazma için ad: alias (varsa) ya da MILVUS_COLLECTION."""
+    return alias_name() or settings.milvus_collection
+
+def physical_name(name: Optional[str] = None) -> str:
+    """Yerel yapılar ve manifest için ad: alias verilirse/boşsa etkin sürüm, aksi hâlde adın kendisi."""
+    alias = alias_name()
+    if name and name != alias:
+        return name
+    if alias:
+        cur = state(alias)["current"]
+        if cur:
+            return str(cur)
+    return name or settings.milvus_collection
+
+def new_version_name(alias: Optional[str] = None) -> str:
+    return f"{alias or alias_name()}_v{time.strftime('%Y%m%d%H%M%S')}"
+
+def record_switch(current: str, previous: List[str], alias: Optional[str] = None) -> None:
+    """Etkin sürümü atomik olarak yaz (geçici dosya + os.replace)."""
+    alias = alias or alias_name()
+    path = _state_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _LOCK:
+        data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                data = {}
+        data[alias] = {"current": current, "previous": previous, "updated_at": int(time.time())}
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+        _CACHE["mtime"] = None
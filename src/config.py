@@ -23,16 +23,82 @@ class Settings(BaseSettings):
     milvus_token: str = Field(..., alias="MILVUS_TOKEN")
     milvus_db: str = Field("default", alias="MILVUS_DB")
     milvus_collection: str = Field("diyoloji_docs", alias="MILVUS_COLLECTION")
+    # Blue/green: doluysa arama bu alias'tan yapılır, `rebuild` yeni <alias>_v<zaman> sürümü kurup alias'ı çevirir
+    # (MILVUS_COLLECTION ile aynı ad olamaz). Etkin sürüm yerel yapılar için MILVUS_ALIAS_STATE'te tutulur.
+    milvus_alias: str = Field("", alias="MILVUS_ALIAS")
+    milvus_alias_state: str = Field("./data/milvus_alias.json", alias="MILVUS_ALIAS_STATE")
+    # Geri dönüş için saklanan eski sürüm sayısı (daha eskileri rebuild sonunda silinir)
+    milvus_keep_versions: int = Field(2, alias="MILVUS_KEEP_VERSIONS")
+    # Rebuild smoke testi: sorgu dosyası, ilk N soru, canlıya göre izin verilen URL isabeti düşüşü
+    rebuild_smoke_file: str = Field("./data/eval_dataset.jsonl", alias="REBUILD_SMOKE_FILE")
+    rebuild_smoke_n: int = Field(20, alias="REBUILD_SMOKE_N")
+    rebuild_max_recall_drop: float = Field(0.1, alias="REBUILD_MAX_RECALL_DROP")
     milvus_vector_field: str = Field("embedding", alias="MILVUS_VECTOR_FIELD")
     milvus_text_field: str = Field("text", alias="MILVUS_TEXT_FIELD")
     milvus_partition: Optional[str] = Field(None, alias="MILVUS_PARTITION")
+    # "filter": category == "..." ifadesiyle tüm koleksiyon; "partition": kategori başına partition
+    milvus_partition_mode: Literal["filter", "partition"] = Field("filter", alias="MILVUS_PARTITION_MODE")
 
     milvus_dim: int = Field(1536, alias="MILVUS_DIM")
     milvus_metric: str = Field("COSINE", alias="MILVUS_METRIC")
     milvus_index_type: Literal["AUTOINDEX", "HNSW", "IVF_FLAT", "IVF_SQ8", "IVF_PQ"] = "AUTOINDEX"
-    milvus_hnsw_m: int = Field(8, alias="MILVUS_HNSW_M")
-    milvus_hnsw_efconstruction: int = Field(64, alias="MILVUS_HNSW_EFCONSTRUCTION")
-    milvus_search_ef: int = Field(128, alias="MILVUS_SEARCH_EF")
+    milvus_hnsw_m: int = Field(16, alias="MILVUS_HNSW_M")
+    milvus_hnsw_efconstruction: int = Field(200, alias="MILVUS_HNSW_EFCONSTRUCTION")
+    milvus_search_ef: int = Field(64, alias="MILVUS_SEARCH_EF")
+    milvus_nlist: int = Field(1024, alias="MILVUS_NLIST")
+    milvus_nprobe: int = Field(32, alias="MILVUS_NPROBE")
+    # Korpus sadece ingest ile değişiyor → her sorguda en güncel zaman damgasını beklemeye gerek yok
+    milvus_consistency: Literal["Strong", "Bounded", "Session", "Eventually"] = Field("Bounded", alias="MILVUS_CONSISTENCY")
+    # Oturum sağlık kontrolü aralığı (sn); yazımlar MILVUS_WRITE_BATCH'lik upsert'lerle, history flush'ı
+    # MILVUS_FLUSH_INTERVAL sn'de bir (0 → zamanlayıcı yok)
+    milvus_health_interval: float = Field(30.0, alias="MILVUS_HEALTH_INTERVAL")
+    milvus_write_batch: int = Field(1000, alias="MILVUS_WRITE_BATCH")
+    milvus_flush_interval: float = Field(300.0, alias="MILVUS_FLUSH_INTERVAL")
+
+    # Arama backend'i: "milvus" (Zilliz/Milvus) veya "local" (süreç içi NumPy indeksi)
+    vector_backend: Literal["milvus", "local"] = Field("milvus", alias="VECTOR_BACKEND")
+    local_index_dir: str = Field("./data/index", alias="LOCAL_INDEX_DIR")
+    # VECTOR_BACKEND=milvus iken ingest yerel indeksi (ve BM25, metin deposu, kategori merkezleri, snapshot) de
+    # doldursun mu; kapalıyken ingest belleği korpus boyutundan bağımsızdır. local backend'de her zaman açık.
+    local_index_mirror: bool = Field(False, alias="LOCAL_INDEX_MIRROR")
+    # Taşınabilir snapshot: ingest SNAPSHOT_DIR/<koleksiyon>/ altına yazar (boş → kapalı);
+    # SNAPSHOT_PATH doluysa local backend etkin koleksiyonu oradan mmap'ler (soğuk başlangıç, ağsız CI)
+    snapshot_dir: str = Field("", alias="SNAPSHOT_DIR")
+    snapshot_path: str = Field("", alias="SNAPSHOT_PATH")
+    # Anahtar kelime kaçırınca sorgu embedding'iyle kategori: "off" | "centroid" | "knn" (LLM sınıflandırıcıdan önce)
+    category_router: Literal["off", "centroid", "knn"] = Field("off", alias="CATEGORY_ROUTER")
+    category_router_min_sim: float = Field(0.2, alias="CATEGORY_ROUTER_MIN_SIM")
+    category_router_margin: float = Field(0.02, alias="CATEGORY_ROUTER_MARGIN")
+    category_router_k: int = Field(20, alias="CATEGORY_ROUTER_K")
+    # Arama modu: "dense" (vektör), "lexical" (BM25), "hybrid" (BM25 + vektör, RRF)
+    search_mode: Literal["dense", "lexical", "hybrid"] = Field("dense", alias="SEARCH_MODE")
+    rrf_k: int = Field(60, alias="RRF_K")
+    # İki aşamalı arama: önce id/skor, metin sadece elenmeyen (bağlama girecek) sonuçlar için
+    lazy_text_fetch: bool = Field(False, alias="LAZY_TEXT_FETCH")
+    # false: chunk metinleri sadece yerel mmap depoda (LOCAL_INDEX_DIR/<koleksiyon>/text), Milvus'ta vektör + meta
+    milvus_store_text: bool = Field(True, alias="MILVUS_STORE_TEXT")
+    # Artımlı ingest manifest'i (URL/chunk hash'leri)
+    ingest_manifest_db: str = Field("./data/ingest_manifest.sqlite", alias="INGEST_MANIFEST_DB")
+    # Ingest embedding eşzamanlılığı ve API kotaları (0 → sınırsız)
+    embed_workers: int = Field(4, alias="EMBED_WORKERS")
+    embed_rpm: int = Field(3000, alias="EMBED_RPM")
+    embed_tpm: int = Field(1_000_000, alias="EMBED_TPM")
+    embed_max_retries: int = Field(5, alias="EMBED_MAX_RETRIES")
+    # Kalıcı (model, sha256(metin)) → vektör deposu; yeniden kurulumlarda API çağrısı yapılmaz
+    embed_store_enabled: bool = Field(True, alias="EMBED_STORE_ENABLED")
+    embed_store_dir: str = Field("./data/embed_store", alias="EMBED_STORE_DIR")
+    embed_store_dtype: Literal["float16", "float32"] = Field("float32", alias="EMBED_STORE_DTYPE")
+    # Akışlı ingest: yazım partisi, aşamalar arası kuyruk derinliği, kontrol noktası aralığı (sn; 0 → her partide)
+    ingest_insert_batch: int = Field(512, alias="INGEST_INSERT_BATCH")
+    ingest_queue_size: int = Field(4, alias="INGEST_QUEUE_SIZE")
+    ingest_checkpoint_seconds: float = Field(30.0, alias="INGEST_CHECKPOINT_SECONDS")
+    # --plan: API çağrısı başına varsayılan gecikme (sn)
+    ingest_plan_call_latency: float = Field(1.5, alias="INGEST_PLAN_CALL_LATENCY")
+    # Korpus okuma (src/json_reader.py): süreç sayısı (0 → CPU), parça boyutu ve seri/akış eşikleri (MB)
+    json_read_workers: int = Field(0, alias="JSON_READ_WORKERS")
+    json_read_chunk_mb: float = Field(16.0, alias="JSON_READ_CHUNK_MB")
+    json_stream_min_mb: float = Field(8.0, alias="JSON_STREAM_MIN_MB")
+    json_parallel_min_mb: float = Field(32.0, alias="JSON_PARALLEL_MIN_MB")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -40,7 +106,21 @@ class Settings(BaseSettings):
     max_context_docs: int = Field(6, alias="MAX_CONTEXT_DOCS")
     chunk_size: int = Field(1200, alias="CHUNK_SIZE")
     chunk_overlap: int = Field(200, alias="CHUNK_OVERLAP")
+    # "chars": sabit karakter pencereleri, "sentence": Türkçe cümle/paragraf sınırlı, token ölçülü (src/chunker.py)
+    chunker: Literal["chars", "sentence"] = Field("chars", alias="CHUNKER")
+    chunk_tokens: int = Field(350, alias="CHUNK_TOKENS")
+    chunk_overlap_tokens: int = Field(40, alias="CHUNK_OVERLAP_TOKENS")
+    # En az bu kadar sayfada birebir tekrar eden cümleler boilerplate sayılıp atılır (0 → kapalı)
+    chunk_boilerplate_min_pages: int = Field(50, alias="CHUNK_BOILERPLATE_MIN_PAGES")
+    # Ingest'te yakın-kopya chunk eleme (MinHash/LSH, src/dedup.py); aynı kategoride Jaccard ≥ eşik olanlardan
+    # ilki tutulur, diğer URL'ler manifest'te alternatif olarak saklanır
+    ingest_dedup: bool = Field(False, alias="INGEST_DEDUP")
+    dedup_threshold: float = Field(0.85, alias="DEDUP_THRESHOLD")
+    dedup_shingle: int = Field(5, alias="DEDUP_SHINGLE")
     score_threshold: float = 0.200
+    # ask() aşamalarını (geçmiş, sınıflandırma, embedding, arama) eşzamanlı çalıştır
+    ask_parallel: bool = Field(True, alias="ASK_PARALLEL")
+    ask_workers: int = Field(16, alias="ASK_WORKERS")
 
     # History
     history_enabled: bool = Field(True, alias="HISTORY_ENABLED")
@@ -48,6 +128,19 @@ class Settings(BaseSettings):
     history_max_turns: int = Field(6, alias="HISTORY_MAX_TURNS")
     session_ttl_days: int = Field(7, alias="SESSION_TTL_DAYS")
 
+    # Sorgu embedding önbelleği (LRU + SQLite)
+    embed_cache_enabled: bool = Field(True, alias="EMBED_CACHE_ENABLED")
+    embed_cache_size: int = Field(2048, alias="EMBED_CACHE_SIZE")
+    embed_cache_db: str = Field("./data/embed_cache.sqlite", alias="EMBED_CACHE_DB")
+
+    # Semantik yanıt önbelleği (benzer şikayetler için LLM üretimini atla)
+    answer_cache_enabled: bool = Field(True, alias="ANSWER_CACHE_ENABLED")
+    answer_cache_threshold: float = Field(0.95, alias="ANSWER_CACHE_THRESHOLD")
+    answer_cache_ttl_s: int = Field(6 * 3600, alias="ANSWER_CACHE_TTL_S")
+    answer_cache_size: int = Field(1000, alias="ANSWER_CACHE_SIZE")
+    # Ingest'in dokunduğu damga dosyası: mtime değişince tüm süreçlerdeki yanıt önbellekleri geçersiz
+    corpus_stamp_path: str = Field("data/corpus_version", alias="CORPUS_STAMP_PATH")
+
     # LangSmith (LangChain v2 tracing)
     langchain_tracing_v2: bool = Field(False, alias="LANGCHAIN_TRACING_V2")
     langchain_endpoint: Optional[str] = Field(None, alias="LANGCHAIN_ENDPOINT")
@@ -88,6 +181,21 @@ class Settings(BaseSettings):
             raise ValueError(f"MILVUS_METRIC must be one of {allowed}")
         return v
 
+    @field_validator("vector_backend", mode="before")
+    @classmethod
+    def backend_lower(cls, v: str) -> str:
+        return (v or "milvus").strip().lower()
+
+    @field_validator("search_mode", mode="before")
+    @classmethod
+    def search_mode_lower(cls, v: str) -> str:
+        return (v or "dense").strip().lower()
+
+    @field_validator("milvus_consistency", mode="before")
+    @classmethod
+    def consistency_title(cls, v: str) -> str:
+        return (v or "Bounded").strip().capitalize()
+
     @field_validator("milvus_index_type", mode="before")
     @classmethod
     def index_upper(cls, v: str) -> str:
@@ -130,21 +238,23 @@ class Settings(BaseSettings):
             return {"index_type": "AUTOINDEX", "metric_type": m, "params": {}}
 
         if t == "HNSW":
-            return {"index_type": "HNSW", "metric_type": m, "params": {"M": 16, "efConstruction": 200}}
+            return {"index_type": "HNSW", "metric_type": m,
+                    "params": {"M": self.milvus_hnsw_m, "efConstruction": self.milvus_hnsw_efconstruction}}
 
         if t == "IVF_FLAT":
-            return {"index_type": "IVF_FLAT", "metric_type": m, "params": {"nlist": 1024}}
+            return {"index_type": "IVF_FLAT", "metric_type": m, "params": {"nlist": self.milvus_nlist}}
 
         if t == "IVF_SQ8":
-            return {"index_type": "IVF_SQ8", "metric_type": m, "params": {"nlist": 1024}}
+            return {"index_type": "IVF_SQ8", "metric_type": m, "params": {"nlist": self.milvus_nlist}}
 
         if t == "IVF_PQ":
-            return {"index_type": "IVF_PQ", "metric_type": m, "params": {"m": 16, "nbits": 8, "nlist": 1024}}
+            return {"index_type": "IVF_PQ", "metric_type": m, "params": {"m": 16, "nbits": 8, "nlist": self.milvus_nlist}}
 
         # varsayılan
         return {"index_type": "AUTOINDEX", "metric_type": m, "params": {}}
 
-    def milvus_search_params(self) -> Dict[str, Any]:
+    def milvus_search_params(self, ef: Optional[int] = None, nprobe: Optional[int] = None) -> Dict[str, Any]:
+        """ef/nprobe verilirse (çağrı bazında recall ↔ gecikme tercihi) ayarlardaki değeri ezer."""
         m = self.milvus_metric
         t = self.milvus_index_type
 
@@ -152,10 +262,10 @@ class Settings(BaseSettings):
             return {"metric_type": m, "params": {}}
 
         if t == "HNSW":
-            return {"metric_type": m, "params": {"ef": 64}}
+            return {"metric_type": m, "params": {"ef": int(ef or self.milvus_search_ef)}}
 
-        # IVF ailesi için tipik nprobe
-        return {"metric_type": m, "params": {"nprobe": 32}}
+        # IVF ailesi
+        return {"metric_type": m, "params": {"nprobe": int(nprobe or self.milvus_nprobe)}}
 
     def openai_client_kwargs(self) -> Dict[str, str]:
         """OpenAI istemcisi için yapılandırma parametrelerini döndürür."""
@@ -177,8 +287,11 @@ class Settings(BaseSettings):
             "OPENAI_EMBED_MODEL": self.openai_embed_model,
             "MILVUS_URI": self.milvus_uri,
             "MILVUS_COLLECTION": self.milvus_collection,
+            "MILVUS_ALIAS": self.milvus_alias,
             "MILVUS_DIM": str(self.milvus_dim),
             "MILVUS_METRIC": self.milvus_metric,
+            "VECTOR_BACKEND": self.vector_backend,
+            "SNAPSHOT_PATH": self.snapshot_path,
             "LANGSMITH_ENABLED": str(self.langsmith_enabled),
             "HISTORY_ENABLED": str(self.history_enabled),
             "SERVER": f"{self.server_host}:{self.server_port}",
@@ -0,0 +1,103 @@
+"""
+Ingest için yakın-kopya (near-duplicate) chunk tespiti: MinHash + LSH.
+- Chunk metni normalize edilip kelime k-gram'larına (DEDUP_SHINGLE) bölünür, num_perm'lik MinHash imzası çıkar
+- LSH (bands x rows) aday bulur; aday, imzalardan tahmin edilen Jaccard ≥ DEDUP_THRESHOLD ise kopyadır
+- Yalnızca aynı kategori içinde karşılaştırılır (kategori filtreli arama kopyayı kaybetmesin)
+- Korpus sırasında ilk görülen chunk kanoniktir → aynı girdi için sonuç deterministiktir
+Bellek: kanonik chunk başına num_perm x 4 bayt imza + LSH kovaları.
+"""
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_PRIME = np.uint64((1 << 31) - 1)
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").replace("İ", "i").replace("I", "ı").lower())
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, shingle: int = 5, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = int(num_perm)
+        self.shingle = max(int(shingle), 1)
+        self.a = rng.randint(1, int(_PRIME), size=self.num_perm).astype(np.uint64)
+        self.b = rng.randint(0, int(_PRIME), size=self.num_perm).astype(np.uint64)
+
+    def shingles(self, text: str) -> List[str]:
+        w = _words(text)
+        k = self.shingle
+        if len(w) <= k:
+            return [" ".join(w)] if w else []
+        return [" ".join(w[i : i + k]) for i in range(len(w) - k + 1)]
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        sh = self.shingles(text)
+        if not sh:
+            return None
+        h = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in set(sh)), dtype=np.uint64) % _PRIME
+        return ((self.a[:, None] * h[None, :] + self.b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+class NearDupIndex:
+    """Kanonik imzaları tutar; add() kopya ise kanonik anahtarı, değilse None döner (ve kanonik olarak ekler)."""
+
+    def __init__(self, threshold: float = 0.85, bands: int = 16):
+        self.threshold = float(threshold)
+        self.bands = int(bands)
+        self._buckets: Dict[tuple, List[int]] = {}
+        self._keys: List[object] = []
+        self._sigs: List[np.ndarray] = []
+
+    def add(self, key, group: str, sig: np.ndarray):
+        rows = len(sig) // self.bands
+        bkeys = [(group, b, sig[b * rows : (b + 1) * rows].tobytes()) for b in range(self.bands)]
+        seen = set()
+        for bk in bkeys:
+            for idx in self._buckets.get(bk, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                if float(np.mean(self._sigs[idx] == sig)) >= self.threshold:
+                    return self._keys[idx]
+        idx = len(self._keys)
+        self._keys.append(key)
+        self._sigs.append(sig)
+        for bk in bkeys:
+            self._buckets.setdefault(bk, []).append(idx)
+        return None
+
+def find_duplicates(
+    pages: Iterable[Tuple[str, str, List[str]]],
+    threshold: float = 0.85,
+    shingle: int = 5,
+    num_perm: int = 64,
+    bands: int = 16,
+) -> Tuple[Dict[Tuple[str, int], Tuple[str, int]], Dict[str, object]]:
+    """
+    pages: (url, kategori, chunk listesi) korpus sırasıyla.
+    Döner: {(url, chunk_id): (kanonik_url, kanonik_chunk_id)} ve özet istatistik.
+    """
+    mh = MinHasher(num_perm=num_perm, shingle=shingle)
+    index = NearDupIndex(threshold=threshold, bands=bands)
+    dups: Dict[Tuple[str, int], Tuple[str, int]] = {}
+    total = 0
+    for url, cat, chunks in pages:
+        for i, ch in enumerate(chunks):
+            total += 1
+            sig = mh.signature(ch)
+            if sig is None:
+                continue
+            canon = index.add((url, i), cat or "", sig)
+            if canon is not None:
+                dups[(url, i)] = canon
+    groups = len(set(dups.values()))
+    return dups, {
+        "chunks": total,
+        "duplicates": len(dups),
+        "groups": groups,
+        "ratio": round(len(dups) / total, 4) if total else 0.0,
+    }
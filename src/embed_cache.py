@@ -0,0 +1,175 @@
+"""
+Sorgu embedding önbelleği.
+- 1. katman: süreç içi, boyutu sınırlı LRU (OrderedDict)
+- 2. katman: SQLite (float32 BLOB) → yeniden başlatmalarda korunur
+Anahtar: (embed modeli, normalize edilmiş sorgu metni). Normalizasyon çağıranın işidir.
+"""
+from __future__ import annotations
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from .config import settings
+
+# ---- Config ----
+_ENABLED: bool = bool(getattr(settings, "embed_cache_enabled", True))
+_DB_PATH: str = os.path.abspath(getattr(settings, "embed_cache_db", "./data/embed_cache.sqlite"))
+_MAX_ITEMS: int = int(getattr(settings, "embed_cache_size", 2048))
+
+def _key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+class EmbedCache:
+    def __init__(self, db_path: str = _DB_PATH, max_items: int = _MAX_ITEMS, enabled: bool = _ENABLED):
+        self.db_path = db_path
+        self.max_items = max(int(max_items), 0)
+        self.enabled = enabled
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_ready = False
+
+    # ---- SQLite ----
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False → FastAPI altında da rahat kullan
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _ensure_db(self) -> None:
+        if self._db_ready:
+            return
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as cx:
+            cx.execute("""
+            CREATE TABLE IF NOT EXISTS query_embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                query TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vec BLOB NOT NULL,     -- float32, little-endian
+                created_at INTEGER NOT NULL
+            )
+            """)
+            cx.commit()
+        self._db_ready = True
+
+    # ---- LRU ----
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._lru[key] = vec
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_items:
+                self._lru.popitem(last=False)
+
+    # ---- Public API ----
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        if not self.enabled:
+            return None
+        key = _key(model, text)
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                return vec
+        try:
+            self._ensure_db()
+            with self._connect() as cx:
+                row = cx.execute("SELECT vec FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+        except Exception as e:
+            print(f"[EMBED_CACHE] read failed: {e}")
+            row = None
+        if row is None:
+            return None
+        vec = np.frombuffer(row[0], dtype="<f4")
+        self._remember(key, vec)
+        return vec
+
+    def put(self, model: str, text: str, vec) -> None:
+        if not self.enabled:
+            return
+        arr = np.asarray(vec, dtype="<f4")
+        key = _key(model, text)
+        self._remember(key, arr)
+        try:
+            self._ensure_db()
+            with self._connect() as cx:
+                cx.execute(
+                    "INSERT OR REPLACE INTO query_embeddings(key, model, query, dim, vec, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, text, int(arr.shape[0]), arr.tobytes(), int(time.time())),
+                )
+                cx.commit()
+        except Exception as e:
+            print(f"[EMBED_CACHE] write failed: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        """Kalıcı (SQLite) katmanın özeti; süreç içi LRU sayaçları CLI'dan görülemeyeceği için raporlanmaz."""
+        disk_items = 0
+        per_model: Dict[str, int] = {}
+        if os.path.exists(self.db_path):
+            self._ensure_db()
+            with self._connect() as cx:
+                for model, n in cx.execute("SELECT model, COUNT(*) FROM query_embeddings GROUP BY model"):
+                    per_model[model] = int(n)
+                    disk_items += int(n)
+        return {
+            "db": self.db_path,
+            "mem_capacity": self.max_items,
+            "disk_items": disk_items,
+            "per_model": per_model,
+        }
+
+    def clear(self, model: Optional[str] = None) -> int:
+        """Önbelleği temizle (model verilirse sadece o modelin kayıtları). Silinen disk kaydı sayısını döner."""
+        with self._lock:
+            self._lru.clear()
+        if not os.path.exists(self.db_path):
+            return 0
+        self._ensure_db()
+        with self._connect() as cx:
+            if model:
+                cur = cx.execute("DELETE FROM query_embeddings WHERE model = ?", (model,))
+            else:
+                cur = cx.execute("DELETE FROM query_embeddings")
+            cx.commit()
+            return int(cur.rowcount)
+
+    def recent(self, limit: int = 20):
+        if not os.path.exists(self.db_path):
+            return []
+        self._ensure_db()
+        with self._connect() as cx:
+            return cx.execute(
+                "SELECT model, query, dim, created_at FROM query_embeddings ORDER BY created_at DESC LIMIT ?",
+                (int(limit),),
+            ).fetchall()
+
+# Tekil önbellek nesnemiz
+QUERY_CACHE = EmbedCache()
+
+# ----------------- CLI -----------------
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="Diyoloji - sorgu embedding önbelleği")
+    ap.add_argument("--stats", action="store_true", help="Önbellek istatistiklerini göster")
+    ap.add_argument("--list", type=int, default=0, help="Son N kaydı listele")
+    ap.add_argument("--clear", action="store_true", help="Önbelleği temizle")
+    ap.add_argument("--model", type=str, default=None, help="--clear için sadece bu modelin kayıtları")
+    args = ap.parse_args()
+
+    if args.clear:
+        print(f"Silinen kayıt sayısı: {QUERY_CACHE.clear(args.model)}")
+    if args.list:
+        for model, query, dim, ts in QUERY_CACHE.recent(args.list):
+            print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))} | {model} | dim={dim} | {query}")
+    if args.stats or not (args.clear or args.list):
+        print(json.dumps(QUERY_CACHE.stats(), ensure_ascii=False, indent=2))
@@ -0,0 +1,130 @@
+"""
+Eşzamanlı, rate-limit'e duyarlı embedding çalıştırıcısı.
+- EMBED_WORKERS kadar batch aynı anda API'ye gider
+- İki token bucket: istek/dakika (EMBED_RPM) ve token/dakika (EMBED_TPM); 0 → sınırsız
+- 429 / 5xx / bağlantı hatalarında jitter'lı üstel geri çekilme (Retry-After başlığına uyulur)
+- Sonuçlar gönderim sırasıyla döner (submit → Future, embed → sıralı liste ya da (n, dim) dizi)
+"""
+from __future__ import annotations
+
+import time
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+from .config import settings
+from .tokenizer import count_tokens
+
+class TokenBucket:
+    """Dakikalık kota; en fazla `burst_s` saniyelik birikim (ani patlamayı sınırlar)."""
+
+    def __init__(self, per_minute: float, burst_s: float = 10.0):
+        self.rate = max(float(per_minute), 0.0) / 60.0
+        self.capacity = max(self.rate * burst_s, 1.0)
+        self.tokens = self.capacity
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._t) * self.rate)
+                self._t = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+def _retry_after(e: BaseException) -> Optional[float]:
+    resp = getattr(e, "response", None)
+    try:
+        v = resp.headers.get("retry-after") if resp is not None else None
+        return float(v) if v else None
+    except Exception:
+        return None
+
+def _retryable(e: BaseException) -> bool:
+    if isinstance(e, (APIConnectionError, APITimeoutError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(e, APIStatusError):
+        return e.status_code == 429 or e.status_code >= 500
+    status = getattr(e, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+class EmbedExecutor:
+    def __init__(
+        self,
+        create: Callable[[List[str]], List[List[float]]],
+        max_workers: int = 4,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ):
+        """create: tek batch için API çağrısı (girdi sırasıyla vektör listesi döner)."""
+        self.create = create
+        self.max_workers = max(int(max_workers), 1)
+        self.max_retries = max(int(max_retries), 0)
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self._rpm = TokenBucket(rpm)
+        self._tpm = TokenBucket(tpm)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embed")
+        self.retries = 0
+
+    def _call(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(count_tokens(t) for t in texts)
+        attempt = 0
+        while True:
+            self._rpm.acquire(1)
+            self._tpm.acquire(tokens)
+            try:
+                return self.create(texts)
+            except Exception as e:
+                if attempt >= self.max_retries or not _retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                delay = max(delay, _retry_after(e) or 0.0)
+                attempt += 1
+                self.retries += 1
+                print(f"[embed] retry {attempt}/{self.max_retries} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def submit(self, texts: Sequence[str]) -> "Future[List[List[float]]]":
+        return self._pool.submit(self._call, list(texts))
+
+    def embed(self, texts: Sequence[str], batch_size: int) -> List[List[float]]:
+        """Tüm batch'leri eşzamanlı gönder, sonuçları sırayla birleştir; bir batch hata verirse yükselir."""
+        texts = list(texts)
+        if not texts:
+            return []
+        if len(texts) <= batch_size:
+            return self._call(texts)
+        futs = [self.submit(texts[i : i + batch_size]) for i in range(0, len(texts), batch_size)]
+        parts = [f.result() for f in futs]
+        # create() (n, dim) dizi döndürüyorsa tek bitişik diziye birleştir
+        if isinstance(parts[0], np.ndarray):
+            return np.concatenate(parts)
+        out: List[List[float]] = []
+        for p in parts:
+            out.extend(p)
+        return out
+
+def from_settings(create: Callable[[List[str]], List[List[float]]]) -> EmbedExecutor:
+    return EmbedExecutor(
+        create,
+        max_workers=int(getattr(settings, "embed_workers", 4)),
+        rpm=float(getattr(settings, "embed_rpm", 0)),
+        tpm=float(getattr(settings, "embed_tpm", 0)),
+        max_retries=int(getattr(settings, "embed_max_retries", 5)),
+    )
@@ -0,0 +1,295 @@
+"""
+İçerik adresli kalıcı embedding deposu (ingest için).
+Anahtar: (embed modeli, sha256(chunk metni)). Koleksiyon yeniden kurulurken (şema değişikliği,
+chunk_size/overlap denemesi, yeni metrik) aynı metin için API'ye tekrar gidilmez.
+
+Disk düzeni (EMBED_STORE_DIR):
+  - index.sqlite         : vectors(model, sha, file, offset, dim) + meta(active veri dosyası)
+  - vec-<sürüm>.<f16|f32>.bin : sadece sona eklenen ham vektörler (np.memmap ile okunur)
+Sıkıştırma (compact) sadece indeksin işaret ettiği satırları yeni bir dosyaya yazar (isteğe bağlı
+model filtresi / dtype dönüşümü); export bir modelin tüm vektörlerini .npz olarak dışa aktarır.
+"""
+from __future__ import annotations
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .config import settings
+
+try:
+    import fcntl  # süreçler arası ekleme kilidi (POSIX)
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# ---- Config ----
+_ENABLED: bool = bool(getattr(settings, "embed_store_enabled", True))
+_DIR: str = os.path.abspath(getattr(settings, "embed_store_dir", "./data/embed_store"))
+_DTYPE: str = getattr(settings, "embed_store_dtype", "float32")
+
+_TAGS = {"float16": "f16", "float32": "f32"}
+_DTYPES = {"f16": np.dtype("<f2"), "f32": np.dtype("<f4")}
+
+def text_sha(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+def _file_dtype(fname: str) -> np.dtype:
+    return _DTYPES[fname.rsplit(".", 2)[-2]]
+
+class EmbedStore:
+    def __init__(self, root: str = _DIR, dtype: str = _DTYPE, enabled: bool = _ENABLED):
+        self.root = root
+        self.tag = _TAGS.get(dtype, "f32")
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._maps: Dict[str, np.memmap] = {}
+        self._db_ready = False
+        self.hits = 0
+        self.misses = 0
+
+    # ---- SQLite ----
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(os.path.join(self.root, "index.sqlite"), check_same_thread=False)
+
+    def _ensure_db(self) -> None:
+        if self._db_ready:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with self._connect() as cx:
+            cx.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                model TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                file TEXT NOT NULL,
+                offset INTEGER NOT NULL,   -- bayt
+                dim INTEGER NOT NULL,
+                created_at INTEGER NOT NULL,
+                PRIMARY KEY (model, sha)
+            )
+            """)
+            cx.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            cx.commit()
+        self._db_ready = True
+
+    def _active_file(self, cx: sqlite3.Connection) -> str:
+        row = cx.execute("SELECT value FROM meta WHERE key = 'active'").fetchone()
+        if row and row[0].endswith(f".{self.tag}.bin"):
+            return row[0]
+        # İlk kullanım veya dtype değişti → yeni veri dosyası
+        fname = f"vec-{time.time_ns()}.{self.tag}.bin"
+        cx.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('active', ?)", (fname,))
+        cx.commit()
+        return fname
+
+    # ---- mmap ----
+    def _map(self, fname: str, need: int) -> np.memmap:
+        mm = self._maps.get(fname)
+        if mm is None or mm.shape[0] < need:
+            mm = np.memmap(os.path.join(self.root, fname), dtype=np.uint8, mode="r")
+            self._maps[fname] = mm
+        return mm
+
+    # ---- Public API ----
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Girdi sırasıyla float32 vektör ya da None (depoda yok)."""
+        out: List[Optional[np.ndarray]] = [None] * len(texts)
+        if not self.enabled or not texts:
+            return out
+        self._ensure_db()
+        shas = [text_sha(t) for t in texts]
+        pos: Dict[str, List[int]] = {}
+        for i, h in enumerate(shas):
+            pos.setdefault(h, []).append(i)
+        uniq = list(pos)
+        with self._connect() as cx:
+            for s in range(0, len(uniq), 500):
+                part = uniq[s : s + 500]
+                rows = cx.execute(
+                    f"SELECT sha, file, offset, dim FROM vectors WHERE model = ? AND sha IN ({','.join('?' * len(part))})",
+                    (model, *part),
+                ).fetchall()
+                for sha, fname, off, dim in rows:
+                    dt = _file_dtype(fname)
+                    end = int(off) + int(dim) * dt.itemsize
+                    with self._lock:
+                        mm = self._map(fname, end)
+                    vec = np.frombuffer(mm[int(off) : end], dtype=dt).astype(np.float32)
+                    for i in pos[sha]:
+                        out[i] = vec
+        with self._lock:
+            found = sum(v is not None for v in out)
+            self.hits += found
+            self.misses += len(out) - found
+        return out
+
+    def contains_many(self, model: str, texts: Sequence[str]) -> List[bool]:
+        """Vektör okumadan, girdi sırasıyla depoda olup olmadığı (ingest planı için)."""
+        if not self.enabled or not texts or not os.path.exists(os.path.join(self.root, "index.sqlite")):
+            return [False] * len(texts)
+        self._ensure_db()
+        shas = [text_sha(t) for t in texts]
+        uniq = list(dict.fromkeys(shas))
+        have = set()
+        with self._connect() as cx:
+            for s in range(0, len(uniq), 500):
+                part = uniq[s : s + 500]
+                have.update(r[0] for r in cx.execute(
+                    f"SELECT sha FROM vectors WHERE model = ? AND sha IN ({','.join('?' * len(part))})",
+                    (model, *part),
+                ))
+        return [h in have for h in shas]
+
+    def put_many(self, model: str, texts: Sequence[str], vecs) -> int:
+        """Yeni (model, sha) çiftlerini veri dosyasının sonuna ekler; zaten olanlar atlanır."""
+        if not self.enabled or not len(texts):
+            return 0
+        self._ensure_db()
+        arr = np.asarray(vecs, dtype=np.float32).reshape(len(texts), -1)
+        shas = [text_sha(t) for t in texts]
+        with self._lock, self._connect() as cx:
+            have = set()
+            uniq = list(dict.fromkeys(shas))
+            for s in range(0, len(uniq), 500):
+                part = uniq[s : s + 500]
+                have.update(r[0] for r in cx.execute(
+                    f"SELECT sha FROM vectors WHERE model = ? AND sha IN ({','.join('?' * len(part))})",
+                    (model, *part),
+                ))
+            keep, seen = [], set()
+            for i, h in enumerate(shas):
+                if h not in have and h not in seen:
+                    seen.add(h)
+                    keep.append(i)
+            if not keep:
+                return 0
+            fname = self._active_file(cx)
+            data = np.ascontiguousarray(arr[keep].astype(_DTYPES[self.tag]))
+            row_bytes = data.shape[1] * data.dtype.itemsize
+            with open(os.path.join(self.root, fname), "ab") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0, os.SEEK_END)
+                    base = f.tell()
+                    f.write(data.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+            now = int(time.time())
+            cx.executemany(
+                "INSERT OR IGNORE INTO vectors(model, sha, file, offset, dim, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(model, shas[i], fname, base + j * row_bytes, int(data.shape[1]), now) for j, i in enumerate(keep)],
+            )
+            cx.commit()
+            return len(keep)
+
+    def stats(self) -> Dict[str, object]:
+        per_model: Dict[str, int] = {}
+        files: Dict[str, int] = {}
+        if os.path.exists(os.path.join(self.root, "index.sqlite")):
+            self._ensure_db()
+            with self._connect() as cx:
+                for model, n in cx.execute("SELECT model, COUNT(*) FROM vectors GROUP BY model"):
+                    per_model[model] = int(n)
+        if os.path.isdir(self.root):
+            for fn in os.listdir(self.root):
+                if fn.endswith(".bin"):
+                    files[fn] = os.path.getsize(os.path.join(self.root, fn))
+        return {
+            "dir": self.root,
+            "dtype": self.tag,
+            "per_model": per_model,
+            "files": files,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def compact(self, keep_models: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        İndeksin işaret ettiği satırları (keep_models verilirse sadece o modellerinkini) tek bir yeni
+        veri dosyasına, mevcut dtype ile yazar; eski dosyalar ve artık (orphan) baytlar silinir.
+        """
+        self._ensure_db()
+        keep = set(keep_models or [])
+        with self._lock, self._connect() as cx:
+            if keep:
+                dropped = cx.execute(
+                    f"DELETE FROM vectors WHERE model NOT IN ({','.join('?' * len(keep))})", tuple(keep)
+                ).rowcount
+            else:
+                dropped = 0
+            rows = cx.execute("SELECT model, sha, file, offset, dim FROM vectors ORDER BY file, offset").fetchall()
+            fname = f"vec-{time.time_ns()}.{self.tag}.bin"
+            dt_out = _DTYPES[self.tag]
+            updates = []
+            off = 0
+            with open(os.path.join(self.root, fname), "wb") as f:
+                for model, sha, src, soff, dim in rows:
+                    dt = _file_dtype(src)
+                    end = int(soff) + int(dim) * dt.itemsize
+                    vec = np.frombuffer(self._map(src, end)[int(soff) : end], dtype=dt).astype(dt_out)
+                    f.write(vec.tobytes())
+                    updates.append((fname, off, model, sha))
+                    off += vec.nbytes
+                f.flush()
+                os.fsync(f.fileno())
+            cx.executemany("UPDATE vectors SET file = ?, offset = ? WHERE model = ? AND sha = ?", updates)
+            cx.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('active', ?)", (fname,))
+            cx.commit()
+            before = 0
+            self._maps.clear()
+            for fn in os.listdir(self.root):
+                if fn.endswith(".bin") and fn != fname:
+                    before += os.path.getsize(os.path.join(self.root, fn))
+                    os.remove(os.path.join(self.root, fn))
+            return {"rows": len(rows), "dropped_rows": int(dropped), "bytes_before": before, "bytes_after": off}
+
+    def export(self, out_path: str, model: str) -> int:
+        """Bir modelin vektörlerini .npz olarak yaz: sha (str), vectors (float32, N x dim)."""
+        self._ensure_db()
+        with self._connect() as cx:
+            rows = cx.execute(
+                "SELECT sha, file, offset, dim FROM vectors WHERE model = ? ORDER BY file, offset", (model,)
+            ).fetchall()
+        shas, vecs = [], []
+        for sha, fname, off, dim in rows:
+            dt = _file_dtype(fname)
+            end = int(off) + int(dim) * dt.itemsize
+            with self._lock:
+                mm = self._map(fname, end)
+            vecs.append(np.frombuffer(mm[int(off) : end], dtype=dt).astype(np.float32))
+            shas.append(sha)
+        mat = np.stack(vecs) if vecs else np.zeros((0, 0), dtype=np.float32)
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)) or ".", exist_ok=True)
+        np.savez(out_path, sha=np.asarray(shas), vectors=mat, model=np.asarray(model))
+        return len(shas)
+
+# Tekil depo nesnemiz
+EMBED_STORE = EmbedStore()
+
+# ----------------- CLI -----------------
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="Diyoloji - kalıcı embedding deposu")
+    ap.add_argument("--stats", action="store_true", help="Depo istatistiklerini göster")
+    ap.add_argument("--compact", action="store_true", help="Veri dosyalarını sıkıştır (artık baytları at); ingest çalışmıyorken")
+    ap.add_argument("--keep-model", action="append", default=None, help="--compact: sadece bu model(ler)i tut")
+    ap.add_argument("--export", type=str, default=None, help="Vektörleri .npz olarak bu yola yaz")
+    ap.add_argument("--model", type=str, default=settings.openai_embed_model, help="--export için model")
+    args = ap.parse_args()
+
+    if args.compact:
+        print(json.dumps(EMBED_STORE.compact(args.keep_model), ensure_ascii=False))
+    if args.export:
+        print(f"Dışa aktarılan vektör sayısı: {EMBED_STORE.export(args.export, args.model)}")
+    if args.stats or not (args.compact or args.export):
+        print(json.dumps(EMBED_STORE.stats(), ensure_ascii=False, indent=2))
@@ -1,8 +1,9 @@
 import os, csv, json
 from typing import List, Dict
 from statistics import mean
-from src.project_pipeline import search, route_category_from_text
+from src.project_pipeline import search_many, route_category_from_text, embed_queries, _map_category
 from src.config import settings
+from src import local_index, category_router
 
 def norm(s: str) -> str:
     return " ".join((s or "").lower().split())
@@ -33,19 +34,24 @@ def pick_answer(hits: List[Dict]) -> str:
         return ""
     return (hits[0].get("text") or "")[:600]
 
-def run_eval(path: str, k: int, save_errors: str = None):
+def run_eval(path: str, k: int, save_errors: str = None, ef: int = None, nprobe: int = None):
     data = load_eval(path)
     ems, subs, rec, route_acc = [], [], [], []
     errors = []
 
+    questions = [ex.get("question") or ex.get("query") or "" for ex in data]
+    # router (fallback)
+    routes = [(ex.get("category") or None) or route_category_from_text(q) for ex, q in zip(data, questions)]
+    # Tek toplu embedding + kategori grubu başına tek arama
+    all_hits = search_many(questions, routes, top_k=k, ef=ef, nprobe=nprobe)
+
     for i, ex in enumerate(data, 1):
-        q = ex.get("question") or ex.get("query") or ""
+        q = questions[i - 1]
         gold = ex.get("expected") or ex.get("answer") or ""
         gold_cat = ex.get("category") or None
 
-        # router (fallback)
-        routed = gold_cat or route_category_from_text(q)
-        hits = search(q, category=routed, top_k=k)
+        routed = routes[i - 1]
+        hits = all_hits[i - 1]
 
         pred = pick_answer(hits)
         ems.append(em(pred, gold))
@@ -83,11 +89,71 @@ def run_eval(path: str, k: int, save_errors: str = None):
             json.dump(errors, f, ensure_ascii=False, indent=2)
         print(f"Saved errors → {save_errors}")
 
+def _gold_tool(ex: Dict, url_cat: Dict[str, str]) -> str:
+    """Beklenen URL'nin indekslendiği kategori (aramanın onu bulabilmesi için gereken); yoksa ingest eşlemesi."""
+    url = (ex.get("url") or "").strip()
+    if url in url_cat:
+        return url_cat[url]
+    return _map_category(scraped_cat=ex.get("category"), title=ex.get("question") or "")
+
+def route_report(path: str, save: str = None) -> Dict[str, Dict[str, float]]:
+    """
+    Yönlendirme doğruluğu: anahtar kelime (rag._keyword_route → route_category_from_text, ask() sırası),
+    merkez / kNN (sorgu embedding'i, eşiksiz ve CATEGORY_ROUTER_* eşikleriyle) ve ask()'in
+    CATEGORY_ROUTER=centroid ile izleyeceği akış (anahtar kelime → merkez). "yanıt" = kategori döndü; kaçırılanlar üretimde LLM sınıflandırıcıya düşer.
+    """
+    from src.rag import _keyword_route
+
+    data = load_eval(path)
+    questions = [ex.get("question") or ex.get("query") or "" for ex in data]
+    idx = local_index.get_index()
+    url_cat = {u: str(c) for u, c in zip(idx.urls, idx.categories.tolist())}
+    gold = [_gold_tool(ex, url_cat) for ex in data]
+    qvs = embed_queries(questions)  # tek toplu istek (önbellekte olanlar hariç)
+
+    keyword = [_keyword_route(q) or route_category_from_text(q) for q in questions]
+    preds = {
+        "keyword": keyword,
+        "centroid (no threshold)": [category_router.route(v, mode="centroid", min_sim=-1, margin=0) for v in qvs],
+        "centroid": [category_router.route(v, mode="centroid") for v in qvs],
+        "knn": [category_router.route(v, mode="knn") for v in qvs],
+        "keyword → centroid": [k or category_router.route(v, mode="centroid") for k, v in zip(keyword, qvs)],
+    }
+    out: Dict[str, Dict[str, float]] = {}
+    print(f"\n==== Routing ({len(data)} questions, gold = indexed category of expected URL) ====")
+    print(f"{'router':<26}{'answered':>10}{'accuracy':>10}{'precision':>11}")
+    for name, p in preds.items():
+        answered = [i for i, x in enumerate(p) if x]
+        correct = sum(1 for i in answered if p[i] == gold[i])
+        out[name] = {
+            "answered": len(answered) / max(len(data), 1),
+            "accuracy": correct / max(len(data), 1),
+            "precision": correct / max(len(answered), 1),
+        }
+        print(f"{name:<26}{out[name]['answered']:>10.3f}{out[name]['accuracy']:>10.3f}{out[name]['precision']:>11.3f}")
+    if save:
+        rows = [
+            {"question": q, "gold": g, **{name: p[i] or "" for name, p in preds.items()}}
+            for i, (q, g) in enumerate(zip(questions, gold))
+        ]
+        with open(save, "w", encoding="utf-8") as f:
+            json.dump({"summary": out, "rows": rows}, f, ensure_ascii=False, indent=2)
+        print(f"Saved routing report → {save}")
+    return out
+
 if __name__ == "__main__":
     import argparse
     ap = argparse.ArgumentParser()
     ap.add_argument("--file", required=True)
     ap.add_argument("--k", type=int, default=int(getattr(settings, "max_context_docs", 6) or 6))
     ap.add_argument("--save-errors", type=str, default="eval_errors.json")
+    ap.add_argument("--ef", type=int, default=None, help="HNSW ef (varsayılan: MILVUS_SEARCH_EF)")
+    ap.add_argument("--nprobe", type=int, default=None, help="IVF nprobe (varsayılan: MILVUS_NPROBE)")
+    ap.add_argument("--routing", action="store_true",
+                    help="Sadece kategori yönlendirme doğruluğu: anahtar kelime vs. embedding merkezi/kNN")
+    ap.add_argument("--save-routing", type=str, default=None, help="Yönlendirme raporunu JSON olarak kaydet")
     args = ap.parse_args()
-    run_eval(args.file, k=args.k, save_errors=args.save_errors)
+    if args.routing:
+        route_report(args.file, save=args.save_routing)
+    else:
+        run_eval(args.file, k=args.k, save_errors=args.save_errors, ef=args.ef, nprobe=args.nprobe)
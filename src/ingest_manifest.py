@@ -0,0 +1,245 @@
+"""
+Artımlı ingest manifest'i (SQLite).
+Her URL için sayfa hash'i, her chunk için (row_id, chunk hash'i) tutulur; koleksiyon bazında ayrılır.
+ingest_from_json yalnızca yeni/değişen chunk'ları embed eder, sayfa kısaldığında artık
+var olmayan chunk id'lerini siler, hash'i aynı kalan URL'lere hiç dokunmaz.
+Yakın-kopya elemesinde yazılmayan chunk'ların kanonik satırı `duplicates` tablosunda tutulur (alt_urls).
+`jobs` tablosu ingest işlerinin kontrol noktalarını (kayıt ofseti, sayaçlar, durum) tutar (--resume).
+"""
+from __future__ import annotations
+
+import os
+import time
+import uuid
+import sqlite3
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import settings
+
+# ---- Config ----
+_DB_PATH: str = os.path.abspath(getattr(settings, "ingest_manifest_db", "./data/ingest_manifest.sqlite"))
+
+def content_hash(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update((p or "").encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+class IngestManifest:
+    def __init__(self, collection: str, db_path: str = _DB_PATH):
+        self.collection = collection
+        self.db_path = db_path
+        self._ensure_db()
+
+    # ---- SQLite ----
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _ensure_db(self) -> None:
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as cx:
+            cx.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                collection TEXT NOT NULL,
+                url TEXT NOT NULL,
+                category TEXT NOT NULL,
+                page_hash TEXT NOT NULL,
+                n_chunks INTEGER NOT NULL,
+                last_crawled_ts TEXT,
+                updated_at INTEGER NOT NULL,
+                PRIMARY KEY (collection, url)
+            )
+            """)
+            cx.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                collection TEXT NOT NULL,
+                url TEXT NOT NULL,
+                chunk_id INTEGER NOT NULL,
+                row_id INTEGER NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                PRIMARY KEY (collection, url, chunk_id)
+            )
+            """)
+            # Yakın-kopya olduğu için yazılmayan chunk'lar → kanonik satır (alternatif URL'ler için)
+            cx.execute("""
+            CREATE TABLE IF NOT EXISTS duplicates (
+                collection TEXT NOT NULL,
+                url TEXT NOT NULL,
+                chunk_id INTEGER NOT NULL,
+                canonical_row_id INTEGER NOT NULL,
+                canonical_url TEXT NOT NULL,
+                PRIMARY KEY (collection, url, chunk_id)
+            )
+            """)
+            cx.execute("CREATE INDEX IF NOT EXISTS idx_dup_canon ON duplicates(collection, canonical_row_id)")
+            # Ingest işleri: record_offset'ten önceki tüm kayıtlar işlendi (sayfaları manifest'te, vektörleri yazıldı)
+            cx.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                collection TEXT NOT NULL,
+                source TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                full INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                record_offset INTEGER NOT NULL,
+                pages INTEGER NOT NULL,
+                chunks INTEGER NOT NULL,
+                deleted INTEGER NOT NULL,
+                error TEXT,
+                started_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL
+            )
+            """)
+            cx.execute("CREATE INDEX IF NOT EXISTS idx_jobs_source ON jobs(collection, source, updated_at)")
+            cx.commit()
+
+    # ---- Okuma ----
+    def page_hashes(self) -> Dict[str, str]:
+        """Koleksiyondaki tüm URL → sayfa hash'i (ingest başında tek sorgu)."""
+        with self._connect() as cx:
+            rows = cx.execute("SELECT url, page_hash FROM pages WHERE collection = ?", (self.collection,))
+            return {u: h for u, h in rows}
+
+    def chunks(self, url: str) -> Dict[int, Tuple[int, str]]:
+        """chunk_id → (row_id, chunk_hash)"""
+        with self._connect() as cx:
+            rows = cx.execute(
+                "SELECT chunk_id, row_id, chunk_hash FROM chunks WHERE collection = ? AND url = ?",
+                (self.collection, url),
+            )
+            return {int(c): (int(r), h) for c, r, h in rows}
+
+    def alt_urls(self, row_ids: Iterable[int]) -> Dict[int, List[str]]:
+        """Kanonik row_id → aynı içeriği taşıyan diğer URL'ler (yakın-kopya elemesi)."""
+        ids = list(dict.fromkeys(int(r) for r in row_ids))
+        out: Dict[int, List[str]] = {}
+        if not ids:
+            return out
+        with self._connect() as cx:
+            rows = cx.execute(
+                f"SELECT canonical_row_id, url FROM duplicates WHERE collection = ? "
+                f"AND canonical_row_id IN ({','.join('?' * len(ids))}) ORDER BY url",
+                (self.collection, *ids),
+            )
+            for rid, url in rows:
+                urls = out.setdefault(int(rid), [])
+                if url not in urls:
+                    urls.append(url)
+        return out
+
+    # ---- Yazma (sadece vektör yazımı başarılı olduktan sonra) ----
+    def record_page(
+        self,
+        url: str,
+        category: str,
+        page_hash: str,
+        chunks: Iterable[Tuple[int, int, str]],
+        last_crawled_ts: Optional[str] = None,
+        duplicates: Iterable[Tuple[int, int, str]] = (),
+    ) -> None:
+        """
+        chunks: (chunk_id, row_id, chunk_hash); duplicates: (chunk_id, kanonik_row_id, kanonik_url).
+        URL'nin önceki chunk ve kopya kayıtlarının yerini alır.
+        """
+        rows = [(self.collection, url, int(c), int(r), h) for c, r, h in chunks]
+        dups = [(self.collection, url, int(c), int(r), cu) for c, r, cu in duplicates]
+        with self._connect() as cx:
+            cx.execute("DELETE FROM chunks WHERE collection = ? AND url = ?", (self.collection, url))
+            cx.execute("DELETE FROM duplicates WHERE collection = ? AND url = ?", (self.collection, url))
+            cx.executemany(
+                "INSERT INTO chunks(collection, url, chunk_id, row_id, chunk_hash) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            cx.executemany(
+                "INSERT INTO duplicates(collection, url, chunk_id, canonical_row_id, canonical_url) "
+                "VALUES (?, ?, ?, ?, ?)",
+                dups,
+            )
+            cx.execute(
+                "INSERT OR REPLACE INTO pages(collection, url, category, page_hash, n_chunks, last_crawled_ts, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.collection, url, category, page_hash, len(rows),
+                 None if last_crawled_ts is None else str(last_crawled_ts), int(time.time())),
+            )
+            cx.commit()
+
+    # ---- İş kontrol noktaları ----
+    _JOB_COLS = (
+        "job_id", "collection", "source", "signature", "full", "status", "record_offset",
+        "pages", "chunks", "deleted", "error", "started_at", "updated_at",
+    )
+
+    def _job(self, cx: sqlite3.Connection, where: str, args: tuple) -> Optional[Dict[str, object]]:
+        row = cx.execute(f"SELECT {', '.join(self._JOB_COLS)} FROM jobs WHERE {where}", args).fetchone()
+        return None if row is None else dict(zip(self._JOB_COLS, row))
+
+    def resumable_job(self, source: str) -> Optional[Dict[str, object]]:
+        """Bu kaynak için tamamlanmamış (running/failed/partial) en son iş."""
+        with self._connect() as cx:
+            return self._job(
+                cx,
+                "collection = ? AND source = ? AND status != 'done' AND status != 'abandoned' "
+                "ORDER BY updated_at DESC, rowid DESC LIMIT 1",
+                (self.collection, source),
+            )
+
+    def start_job(self, source: str, signature: str, full: bool) -> Dict[str, object]:
+        """Yeni iş aç; aynı kaynağın yarım kalmış işleri 'abandoned' olur."""
+        now = int(time.time())
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as cx:
+            cx.execute(
+                "UPDATE jobs SET status = 'abandoned', updated_at = ? "
+                "WHERE collection = ? AND source = ? AND status NOT IN ('done', 'abandoned')",
+                (now, self.collection, source),
+            )
+            cx.execute(
+                "INSERT INTO jobs(job_id, collection, source, signature, full, status, record_offset, "
+                "pages, chunks, deleted, error, started_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'running', 0, 0, 0, 0, NULL, ?, ?)",
+                (job_id, self.collection, source, signature, int(bool(full)), now, now),
+            )
+            cx.commit()
+            return self._job(cx, "job_id = ?", (job_id,))  # type: ignore[return-value]
+
+    def checkpoint(self, job_id: str, record_offset: int, pages: int, chunks: int, deleted: int,
+                   status: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Kontrol noktası: sayaçlar kümülatiftir (önceki çalıştırmalar dahil)."""
+        with self._connect() as cx:
+            cx.execute(
+                "UPDATE jobs SET record_offset = ?, pages = ?, chunks = ?, deleted = ?, "
+                "status = COALESCE(?, status), error = ?, updated_at = ? WHERE job_id = ?",
+                (int(record_offset), int(pages), int(chunks), int(deleted), status, error, int(time.time()), job_id),
+            )
+            cx.commit()
+
+    def jobs(self, limit: int = 10) -> List[Dict[str, object]]:
+        with self._connect() as cx:
+            rows = cx.execute(
+                f"SELECT {', '.join(self._JOB_COLS)} FROM jobs WHERE collection = ? "
+                "ORDER BY updated_at DESC, rowid DESC LIMIT ?",
+                (self.collection, int(limit)),
+            ).fetchall()
+        return [dict(zip(self._JOB_COLS, r)) for r in rows]
+
+    def clear(self) -> int:
+        with self._connect() as cx:
+            cx.execute("DELETE FROM chunks WHERE collection = ?", (self.collection,))
+            cx.execute("DELETE FROM duplicates WHERE collection = ?", (self.collection,))
+            cur = cx.execute("DELETE FROM pages WHERE collection = ?", (self.collection,))
+            cx.commit()
+            return int(cur.rowcount)
+
+    def stats(self) -> Dict[str, object]:
+        with self._connect() as cx:
+            pages, chunks = cx.execute(
+                "SELECT COUNT(*), COALESCE(SUM(n_chunks), 0) FROM pages WHERE collection = ?",
+                (self.collection,),
+            ).fetchone()
+            dups = cx.execute("SELECT COUNT(*) FROM duplicates WHERE collection = ?", (self.collection,)).fetchone()[0]
+        return {
+            "db": self.db_path, "collection": self.collection,
+            "pages": int(pages), "chunks": int(chunks), "duplicates": int(dups),
+        }
@@ -0,0 +1,249 @@
+"""
+Büyük .json / .jsonl korpuslar ve klasörler için paralel okuyucu (ingest).
+- Dosyalar ve büyük .jsonl dosyalarının satır aralıkları (JSON_READ_CHUNK_MB) bir süreç havuzunda
+  (JSON_READ_WORKERS; 0 → CPU sayısı, 1 → seri) ayrıştırılır
+- orjson kuruluysa JSONL satırları ve tam dokümanlar onunla çözülür; yoksa standart json
+- Büyük .json dizileri (JSON_STREAM_MIN_MB) ve {"records"|"data"|"items"|"docs": [...]} kapları
+  tamamı belleğe alınmadan eleman eleman okunur (raw_decode)
+- ordered=True → kayıtlar dosya (ad sırası) ve dosya içi sırayla döner; False → bitene göre
+Toplam boyut JSON_PARALLEL_MIN_MB'nin altındaysa havuz kurulmaz (küçük korpusta açılış maliyeti).
+"""
+from __future__ import annotations
+
+import os
+import re
+import json
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson  # opsiyonel, daha hızlı çözücü
+except ImportError:  # pragma: no cover
+    orjson = None
+
+from .config import settings
+
+# ---- Config ----
+_WORKERS = int(getattr(settings, "json_read_workers", 0) or 0)
+_CHUNK_BYTES = int(float(getattr(settings, "json_read_chunk_mb", 16) or 16) * 1024 * 1024)
+_STREAM_MIN_BYTES = int(float(getattr(settings, "json_stream_min_mb", 8) or 8) * 1024 * 1024)
+_PARALLEL_MIN_BYTES = int(float(getattr(settings, "json_parallel_min_mb", 32) or 32) * 1024 * 1024)
+_BLOCK = 1024 * 1024
+
+_EXTS = (".json", ".jsonl")
+_CONTAINER_KEYS = ("records", "data", "items", "docs")
+_CONTAINER_RE = re.compile(r'\s*\{\s*"(?:records|data|items|docs)"\s*:\s*\[')
+_BOM = b"\xef\xbb\xbf"
+
+def _loads(s):
+    return orjson.loads(s) if orjson is not None else json.loads(s)
+
+def records_from_obj(obj) -> Iterator[Dict]:
+    """Çözülmüş JSON değerinden kayıtlar: dict, dict listesi veya {records|data|items|docs: [...]} kabı."""
+    if isinstance(obj, dict):
+        for key in _CONTAINER_KEYS:
+            if isinstance(obj.get(key), list):
+                for rec in obj[key]:
+                    if isinstance(rec, dict):
+                        yield rec
+                return
+        yield obj
+    elif isinstance(obj, list):
+        for rec in obj:
+            if isinstance(rec, dict):
+                yield rec
+
+# ---- Görevler (süreç havuzunda çalışır; modül seviyesinde olmalı) ----
+def _iter_jsonl_range(path: str, start: int, end: int) -> Iterator[Dict]:
+    """[start, end) bayt aralığında *başlayan* satırlar; aralık başındaki yarım satır öncekine aittir."""
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            if line.startswith(_BOM):
+                line = line[len(_BOM):]
+            line = line.strip()
+            if not line or line.startswith(b"#"):
+                continue
+            try:
+                obj = _loads(line)
+            except Exception:
+                continue
+            yield from records_from_obj(obj)
+
+def _read_jsonl_range(path: str, start: int, end: int) -> List[Dict]:
+    return list(_iter_jsonl_range(path, start, end))
+
+def _read_json_file(path: str) -> List[Dict]:
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw.startswith(_BOM):
+        raw = raw[len(_BOM):]
+    try:
+        data = _loads(raw)
+    except Exception as e:
+        print(f"[warn] JSON parse failed ({path}): {e}")
+        return []
+    return list(records_from_obj(data))
+
+def _run_task(task: Tuple) -> List[Dict]:
+    kind, path = task[0], task[1]
+    if kind == "range":
+        return _read_jsonl_range(path, task[2], task[3])
+    return _read_json_file(path)
+
+# ---- Akış (ana süreçte) ----
+def _stream_start(path: str) -> Optional[int]:
+    """Dosya akışla okunabilecek bir diziyle başlıyorsa '[' sonrasının karakter konumu; değilse None."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        head = f.read(4096)
+    stripped = head.lstrip()
+    if stripped.startswith("["):
+        return len(head) - len(stripped) + 1
+    m = _CONTAINER_RE.match(head)
+    return m.end() if m else None
+
+def _stream_json_array(path: str, start: int) -> Iterator[Dict]:
+    """Dizinin elemanlarını tek tek çöz; bellekte bir blok + en fazla bir eleman tutulur."""
+    dec = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        buf = f.read(max(start, _BLOCK))
+        i, eof = start, False
+        while True:
+            while i < len(buf) and (buf[i].isspace() or buf[i] == ","):
+                i += 1
+            if i < len(buf):
+                if buf[i] == "]":
+                    return
+                try:
+                    obj, j = dec.raw_decode(buf, i)
+                except json.JSONDecodeError:
+                    obj, j = None, -1
+                # Tampon sonunda biten değer kesilmiş olabilir; dosya bitmeden kabul etme
+                if j != -1 and (j < len(buf) or eof):
+                    yield from records_from_obj(obj)
+                    i = j
+                    continue
+                if eof:
+                    print(f"[warn] JSON stream parse failed ({path}) near char {i}")
+                    return
+            elif eof:
+                return
+            block = f.read(_BLOCK)
+            eof = not block
+            buf = buf[i:] + block
+            i = 0
+
+# ---- Planlama ----
+def list_files(path: str) -> List[str]:
+    """Tek dosya ya da klasördeki .json/.jsonl dosyaları (ad sırasıyla, alt klasörlere inilmez)."""
+    if os.path.isdir(path):
+        return [
+            os.path.join(path, fn) for fn in sorted(os.listdir(path))
+            if fn.lower().endswith(_EXTS) and os.path.isfile(os.path.join(path, fn))
+        ]
+    return [path] if os.path.isfile(path) else []
+
+def _plan(files: List[str], chunk_bytes: int) -> List[Tuple]:
+    tasks: List[Tuple] = []
+    for fp in files:
+        size = os.path.getsize(fp)
+        if fp.lower().endswith(".jsonl"):
+            for s in range(0, max(size, 1), chunk_bytes):
+                tasks.append(("range", fp, s, min(s + chunk_bytes, size)))
+            continue
+        start = _stream_start(fp) if size >= _STREAM_MIN_BYTES else None
+        tasks.append(("stream", fp, start) if start is not None else ("json", fp))
+    return tasks
+
+def _resolve_workers(workers: Optional[int], total_bytes: int) -> int:
+    n = _WORKERS if workers is None else int(workers)
+    if n <= 0:
+        n = os.cpu_count() or 1
+    if workers is None and total_bytes < _PARALLEL_MIN_BYTES:
+        return 1
+    return max(n, 1)
+
+def iter_records(path: str, ordered: bool = True, workers: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Kayıtları üretir. workers=None → JSON_READ_WORKERS (küçük korpusta seri);
+    havuzdaki görev sayısı workers*2 ile sınırlıdır (bellek korpus boyutuyla büyümez).
+    """
+    files = list_files(path)
+    if not files:
+        return
+    n = _resolve_workers(workers, sum(os.path.getsize(fp) for fp in files))
+    tasks = _plan(files, _CHUNK_BYTES)
+
+    if n <= 1:
+        for t in tasks:
+            if t[0] == "stream":
+                yield from _stream_json_array(t[1], t[2])
+            elif t[0] == "range":
+                yield from _iter_jsonl_range(t[1], t[2], t[3])
+            else:
+                yield from _read_json_file(t[1])
+        return
+
+    window = n * 2
+    with ProcessPoolExecutor(max_workers=n) as pool:
+        if ordered:
+            # Gönderim sırasıyla (görev, future); akış görevleri sırası gelince ana süreçte okunur
+            pending: deque = deque()
+            submitted = 0
+            for t in tasks:
+                if t[0] == "stream":
+                    pending.append((t, None))
+                else:
+                    pending.append((t, pool.submit(_run_task, t)))
+                    submitted += 1
+                while submitted >= window:
+                    head, fut = pending.popleft()
+                    if fut is None:
+                        yield from _stream_json_array(head[1], head[2])
+                    else:
+                        submitted -= 1
+                        yield from fut.result()
+            for head, fut in pending:
+                yield from (_stream_json_array(head[1], head[2]) if fut is None else fut.result())
+            return
+
+        inflight = set()
+        streams: List[Tuple] = []
+        for t in tasks:
+            if t[0] == "stream":
+                streams.append(t)
+                continue
+            inflight.add(pool.submit(_run_task, t))
+            if len(inflight) >= window:
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield from fut.result()
+        # Havuz kalan görevleri işlerken akış dosyaları ana süreçte okunur
+        for t in streams:
+            yield from _stream_json_array(t[1], t[2])
+        for fut in inflight:
+            yield from fut.result()
+
+# ----------------- CLI -----------------
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Diyoloji - JSON/JSONL korpus okuma hızı")
+    ap.add_argument("path", help=".json / .jsonl dosyası veya klasör")
+    ap.add_argument("--workers", type=int, default=None, help="Süreç sayısı (0 → CPU, 1 → seri)")
+    ap.add_argument("--unordered", action="store_true", help="Sırayı koruma")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    n = sum(1 for _ in iter_records(args.path, ordered=not args.unordered, workers=args.workers))
+    dt = time.perf_counter() - t0
+    print(f"{n} kayıt, {dt:.2f}s ({n / max(dt, 1e-9):.0f} kayıt/s), orjson={'var' if orjson else 'yok'}")
@@ -0,0 +1,411 @@
+"""
+Süreç içi (NumPy) vektör indeksi — Milvus'a alternatif `local` arama backend'i.
+Küçük korpuslarda (birkaç bin chunk) brute-force dot product, uzak aramadan hızlıdır
+ve tüm RAG yığınının çevrimdışı çalışmasını sağlar.
+
+Disk düzeni (<LOCAL_INDEX_DIR>/<koleksiyon>/):
+  - vectors.npy : float32 (N, dim), bitişik
+  - meta.json   : {"ids", "category", "url", "chunk_id"} sütunları + metric/dim
+  - text/       : chunk metinleri (text_store); bellekte yalnızca son kayıttan beri yazılanlar tutulur
+SNAPSHOT_PATH doluysa etkin koleksiyon bunun yerine snapshot'tan mmap'lenerek açılır (bkz. snapshot.py).
+"""
+from __future__ import annotations
+
+import os
+import json
+import bisect
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+
+import numpy as np
+
+from .config import settings
+from . import collection_alias
+
+_VECTORS_FILE = "vectors.npy"
+_META_FILE = "meta.json"
+
+def index_path(name: Optional[str] = None) -> str:
+    base = getattr(settings, "local_index_dir", "./data/index") or "./data/index"
+    return os.path.abspath(os.path.join(base, collection_alias.physical_name(name)))
+
+class _TextColumn(Sequence):
+    """Satır sırasıyla metin sütunu (liste gibi); metinler bellekte değil, metin deposundan id ile okunur."""
+
+    _BATCH = 4096
+
+    def __init__(self, index: "LocalVectorIndex"):
+        self._index = index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self._index.text(int(self._index.ids[int(i)]))
+
+    def __iter__(self) -> Iterator[str]:
+        ids = self._index.ids.copy()
+        for s in range(0, ids.shape[0], self._BATCH):
+            yield from self._index.texts_for(ids[s : s + self._BATCH].tolist())
+
+class LocalVectorIndex:
+    def __init__(self, path: str, dim: int = 0):
+        self.path = path
+        self.dim = int(dim or settings.milvus_dim)
+        self.metric = settings.milvus_metric.upper()
+        self.urls: List[str] = []
+        # Metinler: snapshot örneğinde mmap'li satır sütunu, diğerlerinde metin deposu (bkz. text()).
+        # _pending/_deleted: son save()'den beri yazılan metinler / silinen id'ler (save depoya işler)
+        self.texts: Sequence[str] = _TextColumn(self)
+        self._pending: Dict[int, str] = {}
+        self._deleted: Set[int] = set()
+        self._rows: Dict[int, int] = {}
+        # Kategori → satırlar: _cat_lists yazımlarda artımlı güncellenir, _cat_rows aramada tembel dizi önbelleği
+        self._cat_lists: Dict[str, List[int]] = {}
+        self._cat_rows: Dict[str, np.ndarray] = {}
+        # vectors/norms/ids/categories/chunk_ids, kapasitesi katlanarak büyüyen tamponların [:n] görünümleridir;
+        # upsert yalnızca yeni satırları yazar (her çağrıda vstack + tam yeniden indeksleme yok)
+        self._lock = threading.RLock()
+        self._set_columns(
+            np.zeros((0, self.dim), dtype=np.float32), np.zeros((0,), dtype=np.int64),
+            np.zeros((0,), dtype=object), np.zeros((0,), dtype=np.int64),
+        )
+        # Snapshot'tan mmap'lenmiş örnek: diske kaydedilmez, ilk yazımda belleğe kopyalanır
+        self.read_only = False
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    # ---- Yükle / kaydet ----
+    @classmethod
+    def load(cls, path: str) -> "LocalVectorIndex":
+        idx = cls(path)
+        vpath, mpath = os.path.join(path, _VECTORS_FILE), os.path.join(path, _META_FILE)
+        if not (os.path.exists(vpath) and os.path.exists(mpath)):
+            return idx
+        with open(mpath, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        idx.dim = int(meta.get("dim") or idx.dim)
+        idx.metric = str(meta.get("metric") or idx.metric).upper()
+        idx._set_columns(
+            np.load(vpath), np.asarray(meta["ids"], dtype=np.int64),
+            np.asarray(meta["category"], dtype=object), np.asarray(meta["chunk_id"], dtype=np.int64),
+        )
+        idx.urls = list(meta["url"])
+        if "text" in meta:
+            # Eski düzen (metinler meta.json'da): ilk kayıtta metin deposuna taşınır
+            idx._pending = {int(r): t for r, t in zip(meta["ids"], meta["text"])}
+        idx._reindex()
+        return idx
+
+    def save(self) -> None:
+        if self.read_only:
+            print(f"[warn] local index opened from snapshot ({self.path}); changes kept in memory only")
+            return
+        from . import text_store
+
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            pending, deleted = dict(self._pending), set(self._deleted)
+            meta = {
+                "dim": self.dim,
+                "metric": self.metric,
+                "model": settings.openai_embed_model,
+                "ids": self.ids.tolist(),
+                "category": [str(c) for c in self.categories.tolist()],
+                "url": list(self.urls),
+                "chunk_id": self.chunk_ids.tolist(),
+            }
+            vectors = self.vectors.copy()
+        # Önce metinler: meta.json hiçbir zaman depoda olmayan bir satırı göstermesin
+        text_store.update(self._text_dir(), pending, deleted)
+        with self._lock:
+            for rid, t in pending.items():
+                if self._pending.get(rid) is t:
+                    del self._pending[rid]
+            self._deleted -= deleted
+        # Önce geçici dosyaya yaz, sonra atomik yer değiştir (okuyan süreçler yarım dosya görmesin)
+        vtmp = os.path.join(self.path, _VECTORS_FILE + ".tmp")
+        mtmp = os.path.join(self.path, _META_FILE + ".tmp")
+        with open(vtmp, "wb") as f:
+            np.save(f, vectors)
+        with open(mtmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(vtmp, os.path.join(self.path, _VECTORS_FILE))
+        os.replace(mtmp, os.path.join(self.path, _META_FILE))
+        with _CACHE_LOCK:
+            _CACHE[self.path] = (_mtime(self.path), self)
+
+    def _text_dir(self) -> str:
+        from . import text_store
+
+        return text_store.store_dir(self.path)
+
+    def text(self, row_id: int) -> str:
+        row_id = int(row_id)
+        t = self._pending.get(row_id)
+        if t is not None:
+            return t
+        if not isinstance(self.texts, _TextColumn):
+            i = self._rows.get(row_id)
+            return "" if i is None else self.texts[i]
+        from . import text_store
+
+        return text_store.get_store_at(self._text_dir()).get(row_id) or ""
+
+    def texts_for(self, row_ids: Sequence[int]) -> List[str]:
+        """Id sırasıyla metinler (bulunamayan → ""); depoya tek toplu okuma."""
+        if not isinstance(self.texts, _TextColumn):
+            return [self.text(r) for r in row_ids]
+        from . import text_store
+
+        pending = self._pending
+        rest = [int(r) for r in row_ids if int(r) not in pending]
+        stored = text_store.get_store_at(self._text_dir()).get_many(rest) if rest else {}
+        return [pending.get(int(r), stored.get(int(r), "")) for r in row_ids]
+
+    def _set_columns(self, vectors, ids, categories, chunk_ids, norms=None, capacity: int = 0) -> None:
+        """Sütunları kapasiteli yeni tamponlara kopyala; norms verilmezse sıfır (bkz. _reindex)."""
+        n = int(ids.shape[0])
+        cap = max(int(capacity), n)
+        self._vbuf = np.zeros((cap, self.dim), dtype=np.float32)
+        self._nbuf = np.zeros((cap,), dtype=np.float32)
+        self._ibuf = np.zeros((cap,), dtype=np.int64)
+        self._cbuf = np.empty((cap,), dtype=object)
+        self._kbuf = np.zeros((cap,), dtype=np.int64)
+        if n:
+            self._vbuf[:n] = np.asarray(vectors, dtype=np.float32).reshape(n, -1)
+            if norms is not None:
+                self._nbuf[:n] = norms
+            self._ibuf[:n] = ids
+            self._cbuf[:n] = [str(c) for c in np.asarray(categories).tolist()]
+            self._kbuf[:n] = chunk_ids
+        self._views(n)
+
+    def _views(self, n: int) -> None:
+        self.vectors = self._vbuf[:n]
+        self.norms = self._nbuf[:n]
+        self.ids = self._ibuf[:n]
+        self.categories = self._cbuf[:n]
+        self.chunk_ids = self._kbuf[:n]
+
+    def _grow(self, need: int) -> None:
+        if need <= self._ibuf.shape[0]:
+            return
+        cap = max(need, 2 * self._ibuf.shape[0], 1024)
+        self._set_columns(self.vectors, self.ids, self.categories, self.chunk_ids, self.norms, capacity=cap)
+
+    def _materialize(self) -> None:
+        """mmap'li sütunları yazılabilir bellek kopyalarına çevir (yalnızca snapshot örneklerinde)."""
+        if isinstance(self.urls, list) and isinstance(self.texts, _TextColumn) and isinstance(self._rows, dict):
+            return
+        self._set_columns(self.vectors, self.ids, self.categories, self.chunk_ids)
+        self.urls = list(self.urls)
+        self._pending.update(zip(self.ids.tolist(), self.texts))
+        self.texts = _TextColumn(self)
+        self._reindex()
+
+    def _reindex(self) -> None:
+        n = len(self)
+        if n:
+            self._nbuf[:n] = np.linalg.norm(self.vectors, axis=1)
+        self._rows = {int(rid): i for i, rid in enumerate(self.ids.tolist())}
+        self._cat_lists = {}
+        for i, c in enumerate(self.categories.tolist()):
+            self._cat_lists.setdefault(str(c), []).append(i)
+        self._cat_rows = {}
+
+    # ---- Yazma ----
+    def upsert(
+        self,
+        ids: Sequence[int],
+        categories: Sequence[str],
+        urls: Sequence[str],
+        chunk_ids: Sequence[int],
+        texts: Sequence[str],
+        vectors,
+    ) -> int:
+        if not len(ids):
+            return 0
+        vecs = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(vecs, axis=1).astype(np.float32)
+        with self._lock:
+            self._materialize()
+            for rid, t in zip(ids, texts):
+                self._pending[int(rid)] = t
+                self._deleted.discard(int(rid))
+            n = len(self)
+            new_rows: Dict[int, int] = {}
+            for j, rid in enumerate(ids):
+                rid = int(rid)
+                i = self._rows.get(rid)
+                if i is None:
+                    # Aynı çağrıda tekrar eden id: son değer kazanır
+                    i = new_rows.setdefault(rid, n + len(new_rows))
+                    if i >= n:
+                        continue
+                self._vbuf[i] = vecs[j]
+                self._nbuf[i] = norms[j]
+                old, cat = str(self._cbuf[i]), str(categories[j])
+                if old != cat:
+                    self._cat_lists[old].remove(i)
+                    bisect.insort(self._cat_lists.setdefault(cat, []), i)
+                    self._cat_rows.pop(old, None)
+                    self._cat_rows.pop(cat, None)
+                    self._cbuf[i] = cat
+                self.urls[i] = urls[j]
+                self._kbuf[i] = int(chunk_ids[j])
+            if new_rows:
+                self._grow(n + len(new_rows))
+                last = {int(rid): j for j, rid in enumerate(ids)}
+                order = sorted(new_rows.items(), key=lambda kv: kv[1])
+                js = [last[rid] for rid, _ in order]
+                m = n + len(js)
+                self._vbuf[n:m] = vecs[js]
+                self._nbuf[n:m] = norms[js]
+                self._ibuf[n:m] = [rid for rid, _ in order]
+                self._kbuf[n:m] = [int(chunk_ids[j]) for j in js]
+                for k, j in enumerate(js):
+                    cat = str(categories[j])
+                    self._cbuf[n + k] = cat
+                    self._cat_lists.setdefault(cat, []).append(n + k)
+                    self._cat_rows.pop(cat, None)
+                self.urls.extend(urls[j] for j in js)
+                self._rows.update(new_rows)
+                self._views(m)
+        return len(ids)
+
+    def delete(self, ids: Sequence[int]) -> int:
+        with self._lock:
+            drop = {self._rows[int(r)] for r in ids if int(r) in self._rows}
+            if not drop:
+                return 0
+            self._materialize()
+            for i in drop:
+                rid = int(self.ids[i])
+                self._pending.pop(rid, None)
+                self._deleted.add(rid)
+            keep = np.asarray([i for i in range(len(self)) if i not in drop], dtype=np.int64)
+            self._set_columns(
+                self.vectors[keep], self.ids[keep], self.categories[keep], self.chunk_ids[keep],
+                capacity=self._ibuf.shape[0],
+            )
+            self.urls = [self.urls[i] for i in keep.tolist()]
+            self._reindex()
+        return len(drop)
+
+    # ---- Okuma ----
+    def rows_for_category(self, category: str) -> np.ndarray:
+        with self._lock:
+            rows = self._cat_rows.get(category)
+            if rows is None:
+                lst = self._cat_lists.get(category)
+                if not lst:
+                    return np.zeros((0,), dtype=np.int64)
+                rows = self._cat_rows[category] = np.asarray(lst, dtype=np.int64)
+            return rows
+
+    def _columns(self, category: Optional[str]):
+        """Aramanın tutarlı gördüğü sütunlar: yazımlarla yarışta uyumsuz diziler okunmasın diye kilit altında."""
+        with self._lock:
+            rows = self.rows_for_category(category) if category else None
+            return (self.vectors, self.norms, self.ids, self.categories, self.urls, self.chunk_ids), rows
+
+    def _hits_from(self, cols, pairs) -> List[Dict]:
+        """(satır, skor) çiftlerinden sonuçlar; metinler id ile tek toplu okumada (bkz. texts_for)."""
+        _, _, ids, categories, urls, chunk_ids = cols
+        out = [
+            {
+                "id": int(ids[i]),
+                "url": urls[i],
+                "text": None,
+                "category": str(categories[i]),
+                "chunk_id": int(chunk_ids[i]),
+                "score": float(score),
+            }
+            for i, score in pairs
+        ]
+        for h, t in zip(out, self.texts_for([h["id"] for h in out])):
+            h["text"] = t
+        return out
+
+    def hit(self, row_id: int) -> Optional[Dict]:
+        """Satır kimliğine (id) göre arama sonucu şeklinde kayıt; skor 0."""
+        with self._lock:
+            i = self._rows.get(int(row_id))
+            if i is None:
+                return None
+            cols = self._columns(None)[0]
+        return self._hits_from(cols, [(i, 0.0)])[0]
+
+    # ---- Arama ----
+    def search(self, qv, category: Optional[str], top_k: int) -> List[Dict]:
+        """Milvus search() ile aynı çıktı şekli: id, url, text, category, chunk_id, score."""
+        return self.search_many([qv], category, top_k)[0]
+
+    def search_many(self, qvs, category: Optional[str], top_k: int) -> List[List[Dict]]:
+        """Aynı kategori filtresindeki sorgular için tek matris çarpımı (nq x N)."""
+        nq = len(qvs)
+        cols, rows = self._columns(category)
+        vectors, all_norms = cols[0], cols[1]
+        if rows is not None and not rows.size:
+            return [[] for _ in range(nq)]
+        if not vectors.shape[0] or top_k <= 0 or not nq:
+            return [[] for _ in range(nq)]
+
+        Q = np.asarray(qvs, dtype=np.float32).reshape(nq, -1)
+        V = vectors if rows is None else vectors[rows]
+        norms = all_norms if rows is None else all_norms[rows]
+        dots = Q @ V.T
+        if self.metric == "L2":
+            # Milvus L2 → kare uzaklık, küçük DAHA İYİ
+            scores = norms[None, :] ** 2 - 2.0 * dots + np.einsum("ij,ij->i", Q, Q)[:, None]
+        elif self.metric == "COSINE":
+            qn = np.linalg.norm(Q, axis=1)
+            denom = qn[:, None] * norms[None, :]
+            scores = dots / np.where(denom > 0, denom, 1.0)
+        else:
+            scores = dots
+
+        cand = rows if rows is not None else np.arange(vectors.shape[0])
+        k = min(int(top_k), cand.shape[0])
+        keys = scores if self.metric == "L2" else -scores
+        part = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        out: List[List[Dict]] = []
+        for qi in range(nq):
+            p = part[qi][np.argsort(keys[qi, part[qi]], kind="stable")]
+            out.append(self._hits_from(cols, [(int(cand[j]), scores[qi, j]) for j in p.tolist()]))
+        return out
+
+# ---- Süreç içi önbellek: dosya değişince (yeni ingest) otomatik yeniden yükle ----
+_CACHE: Dict[str, "tuple[float, LocalVectorIndex]"] = {}
+_CACHE_LOCK = threading.Lock()
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(os.path.join(path, _META_FILE)).st_mtime
+    except OSError:
+        return 0.0
+
+def get_index(name: Optional[str] = None, writable: bool = False) -> LocalVectorIndex:
+    """
+    Koleksiyonun yerel indeksi (dosya değişince yeniden yüklenir). SNAPSHOT_PATH doluysa etkin koleksiyon
+    (name=None) salt-okunur snapshot'tan açılır. writable=True: yazma yolları ve diskteki türetilmiş yapılar
+    (BM25, metin deposu, kategori merkezleri) snapshot'ı atlar, LOCAL_INDEX_DIR'deki indeksi alır.
+    """
+    snap = (getattr(settings, "snapshot_path", "") or "").strip()
+    if snap and name is None and not writable:
+        from . import snapshot
+
+        return snapshot.get_snapshot(snap)
+    path = index_path(name)
+    mtime = _mtime(path)
+    with _CACHE_LOCK:
+        hit = _CACHE.get(path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+        idx = LocalVectorIndex.load(path)
+        _CACHE[path] = (mtime, idx)
+        return idx
@@ -10,13 +10,21 @@ import os
 import re
 import html as ihtml
 import json
+import base64
 import time
 import hashlib
-from typing import Dict, List, Tuple, Optional, Iterable
+import queue
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple, Optional, Iterable, Iterator, Set, Union
 from urllib.parse import urlparse
 
 # Third-party imports
+import grpc
 import numpy as np
+from tqdm import tqdm
 from openai import OpenAI
 from dotenv import load_dotenv
 from pymilvus import (
@@ -27,6 +35,7 @@ from pymilvus import (
     CollectionSchema,
     DataType
 )
+from pymilvus.exceptions import ConnectionNotExistException, MilvusException, MilvusUnavailableException
 from langchain.callbacks.manager import CallbackManagerForChainRun
 from langsmith import traceable
 
@@ -34,6 +43,21 @@ from langsmith import traceable
 from src.config import settings
 
 from src.debug_logger import debug_log
+from src.embed_cache import QUERY_CACHE
+from src import local_index
+from src import bm25_index
+from src import text_store
+from src.answer_cache import bump_corpus_stamp
+from src.ingest_manifest import IngestManifest, content_hash
+from src import embed_executor
+from src import chunker
+from src import json_reader
+from src import dedup
+from src import collection_alias
+from src import snapshot
+from src import category_router
+from src.tokenizer import count_tokens
+from src.embed_store import EMBED_STORE
 # --- Memory / Retrieval logging flags (ENV üzerinden) ---
 MEM_HISTORY_TO_INDEX = str(os.getenv("MEMORY_HISTORY_TO_INDEX", "true")).lower() in ("1","true","yes","on")
 MEM_HISTORY_PENALTY = float(os.getenv("MEMORY_HISTORY_PENALTY", "0.05") or 0.0)  # 0..0.5
@@ -132,19 +156,24 @@ _CLIENT = OpenAI(
 
 # -------- Parametreler --------
 _EMBED_BATCH = 64
+_INGEST_INSERT_BATCH = int(getattr(settings, "ingest_insert_batch", 512) or 512)
+_INGEST_QUEUE_SIZE = int(getattr(settings, "ingest_queue_size", 4) or 4)
+# Kontrol noktası aralığı: yerel indeks kaydı + manifest + iş ofseti (0 → her yazım partisinde)
+_INGEST_CHECKPOINT_S = float(getattr(settings, "ingest_checkpoint_seconds", 30) or 0)
 _TEXT_MAX = 32760
 _VALID_TOOLS = {"billing", "roaming", "package", "coverage", "app"}
 
 # ----------------- Yardımcılar -----------------
-def _maybe_normalize(v: List[float]) -> List[float]:
-    """Milvus metric 'IP' ise cosine eşdeğeri için normalize et; diğerlerinde dokunma."""
-    if settings.milvus_metric.upper() == "IP":
-        arr = np.array(v, dtype=np.float32)
-        n = np.linalg.norm(arr)
-        if n > 0:
-            arr = arr / n
-        return arr.tolist()
-    return v
+def _maybe_normalize(vecs) -> np.ndarray:
+    """
+    (n, dim) float32 dizi döner. Milvus metric 'IP' ise cosine eşdeğeri için tüm satırlar tek işlemde
+    (yerinde) normalize edilir; diğerlerinde dokunulmaz. Verilen float32 dizi değiştirilebilir.
+    """
+    arr = np.asarray(vecs, dtype=np.float32)
+    if settings.milvus_metric.upper() == "IP" and arr.size:
+        n = np.linalg.norm(arr, axis=-1, keepdims=True)
+        np.divide(arr, n, out=arr, where=n > 0)
+    return arr
 
 def _hash_row_id(url: str, category: str, chunk_id: int) -> int:
     h = hashlib.md5(f"{url}|{category}|{chunk_id}".encode()).hexdigest()[:16]
@@ -160,74 +189,33 @@ def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
         i += step
     return chunks
 
-def _iter_json_records(path: str) -> Iterable[Dict]:
+def _iter_json_records(path: str, ordered: bool = True) -> Iterable[Dict]:
     """
     Tek .json / .jsonl dosyası veya bu uzantıları içeren bir klasör desteklenir.
     Kayıt şemaları:
       - {"url": str, "category": str?, "content_text"/"content_html"/"text": ..., "chunks"?: [...]}
       - Üst seviye {records|data|items|docs: [...]} kapları da desteklenir.
+    Ayrıştırma json_reader'dadır (süreç havuzu, orjson, büyük dizilerde akış).
     """
-    def _yield_from_obj(obj):
-        if isinstance(obj, dict):
-            for key in ("records", "data", "items", "docs"):
-                if isinstance(obj.get(key), list):
-                    for rec in obj[key]:
-                        if isinstance(rec, dict):
-                            yield rec
-                    return
-            yield obj
-        elif isinstance(obj, list):
-            for rec in obj:
-                if isinstance(rec, dict):
-                    yield rec
-
-    if os.path.isdir(path):
-        for fn in os.listdir(path):
-            if fn.lower().endswith((".json", ".jsonl")):
-                yield from _iter_json_records(os.path.join(path, fn))
-        return
+    yield from json_reader.iter_records(path, ordered=ordered)
 
-    if path.lower().endswith(".jsonl"):
-        with open(path, "r", encoding="utf-8-sig") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    continue
-                yield from _yield_from_obj(obj)
-        return
-
-    with open(path, "r", encoding="utf-8-sig") as f:
-        try:
-            data = json.load(f)
-        except Exception:
-            return
-    yield from _yield_from_obj(data)
-
-def _extract_chunks_from_record(rec: Dict) -> List[str]:
+def _record_text(rec: Dict) -> str:
     """
-    Kayıttan metin parçası çıkar.
-    Öncelik: chunks -> content_text -> content_html -> diğer text benzeri alanlar.
+    Kayıttan başlık + düz metin çıkar.
+    Öncelik: content_text -> content_html -> diğer text benzeri alanlar.
     """
-    if isinstance(rec.get("chunks"), list):
-        return [str(c or "") for c in rec["chunks"]]
-
     title = (rec.get("title") or "").strip()
+    prefix = title + "\n" if title else ""
 
     if rec.get("content_text"):
-        full = (title + "\n" if title else "") + str(rec["content_text"])
-        return chunk_text(full, settings.chunk_size, settings.chunk_overlap)
+        return prefix + str(rec["content_text"])
 
     if rec.get("content_html"):
         html_str = str(rec["content_html"])
         txt = re.sub(r"<[^>]+>", " ", html_str)
         txt = ihtml.unescape(txt)
         txt = " ".join(txt.split())
-        full = (title + "\n" if title else "") + txt
-        return chunk_text(full, settings.chunk_size, settings.chunk_overlap)
+        return prefix + txt
 
     text_candidates = [
         "text", "content", "body", "page_text", "clean_text",
@@ -242,10 +230,32 @@ def _extract_chunks_from_record(rec: Dict) -> List[str]:
                 merged = str(v.get("text") or v.get("content") or "")
             else:
                 merged = str(v)
-            full = (title + "\n" if title else "") + merged
-            return chunk_text(full, settings.chunk_size, settings.chunk_overlap)
+            return prefix + merged
 
-    return []
+    return ""
+
+def _extract_chunks_from_record(rec: Dict, drop: Optional[Set[str]] = None) -> List[str]:
+    """
+    Kayıttan metin parçası çıkar.
+    Öncelik: chunks -> content_text -> content_html -> diğer text benzeri alanlar.
+    CHUNKER=chars    : sabit karakter pencereleri (CHUNK_SIZE / CHUNK_OVERLAP)
+    CHUNKER=sentence : cümle/paragraf sınırlı, token ölçülü (CHUNK_TOKENS / CHUNK_OVERLAP_TOKENS);
+                       drop → sayfalar arası tekrar eden boilerplate cümle anahtarları
+    """
+    if isinstance(rec.get("chunks"), list):
+        return [str(c or "") for c in rec["chunks"]]
+
+    full = _record_text(rec)
+    if not full:
+        return []
+    if getattr(settings, "chunker", "chars") == "sentence":
+        return chunker.chunk_sentences(
+            full,
+            max_tokens=int(settings.chunk_tokens),
+            overlap_tokens=int(settings.chunk_overlap_tokens),
+            drop=drop,
+        )
+    return chunk_text(full, settings.chunk_size, settings.chunk_overlap)
 
 def _map_category(scraped_cat: Optional[str], slug: Optional[str] = None, title: str = "", breadcrumb: str = "") -> str:
     text = " ".join([scraped_cat or "", slug or "", title or "", breadcrumb or ""]).lower()
@@ -262,23 +272,159 @@ def _map_category(scraped_cat: Optional[str], slug: Optional[str] = None, title:
         return "package"
     return "package"
 
+def _decode_embeddings(data) -> np.ndarray:
+    """API yanıtı → (n, dim) float32. base64 (ham little-endian float32) doğrudan çözülür; float listesi
+    dönen (base64 desteklemeyen) uyumlu sunucular için liste yolu da kabul edilir."""
+    if not data:
+        return np.zeros((0, settings.milvus_dim), dtype=np.float32)
+    first = data[0].embedding
+    if isinstance(first, str):
+        raw = b"".join(base64.b64decode(d.embedding) for d in data)
+        return np.frombuffer(raw, dtype="<f4").reshape(len(data), -1).astype(np.float32, copy=True)
+    return np.asarray([d.embedding for d in data], dtype=np.float32)
+
+def _embed_batch(batch: List[str]) -> np.ndarray:
+    """Ham (normalize edilmemiş) API vektörleri, (n, dim) float32; JSON float listesi ayrıştırılmaz."""
+    resp = _CLIENT.embeddings.create(model=settings.openai_embed_model, input=batch, encoding_format="base64")
+    return _decode_embeddings(resp.data)
+
+# Eşzamanlı batch'ler + RPM/TPM token bucket + 429/5xx retry (EMBED_WORKERS / EMBED_RPM / EMBED_TPM)
+_EMBEDDER = embed_executor.from_settings(_embed_batch)
+
 @t_ingest(name="embed_texts")
-def embed_texts(texts: List[str]) -> List[List[float]]:
-    vectors: List[List[float]] = []
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """(len(texts), dim) float32; metric IP ise satırlar normalize."""
     if not texts:
-        return vectors
-    for start in range(0, len(texts), _EMBED_BATCH):
-        batch = texts[start : start + _EMBED_BATCH]
-        resp = _CLIENT.embeddings.create(model=settings.openai_embed_model, input=batch)
-        for d in resp.data:
-            vectors.append(_maybe_normalize(d.embedding))
-    return vectors
+        return np.zeros((0, settings.milvus_dim), dtype=np.float32)
+    return _maybe_normalize(_EMBEDDER.embed(texts, _EMBED_BATCH))
+
+def _embed_chunks_async(texts: List[str]) -> Future:
+    """
+    Ingest için: önce kalıcı embedding deposu (model + sha256(metin)), eksikler eşzamanlı API
+    çağrısıyla tamamlanıp depoya eklenir. Future sonucu girdi sırasıyla (n, dim) float32 dizidir.
+    """
+    model = settings.openai_embed_model
+    out: Future = Future()
+    found = EMBED_STORE.get_many(model, texts)
+    miss = [i for i, v in enumerate(found) if v is None]
+    if not miss:
+        out.set_result(_maybe_normalize(np.stack(found)))
+        return out
+
+    def _done(f: Future) -> None:
+        try:
+            vecs = f.result()
+        except Exception as e:
+            out.set_exception(e)
+            return
+        try:
+            EMBED_STORE.put_many(model, [texts[i] for i in miss], vecs)
+        except Exception as e:
+            print(f"[warn] embed store write failed: {e}")
+        arr = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+        arr[miss] = vecs
+        for i, v in enumerate(found):
+            if v is not None:
+                arr[i] = v
+        out.set_result(_maybe_normalize(arr))
+
+    _EMBEDDER.submit([texts[i] for i in miss]).add_done_callback(_done)
+    return out
 
 # --- TR lowercase helper (İ/ı sorunlarını önle)
 def _tr_lower(s: str) -> str:
     if not s: return ""
     return (s.replace("İ","i").replace("I","ı")).lower()
 
+def _query_cache_key(query: str) -> str:
+    """Önbellek anahtarı: TR-küçük harf + boşluk katlama ("Paketim  BİTTİ" == "paketim bitti")."""
+    return " ".join(_tr_lower(query).split())
+
+_INFLIGHT: Dict[str, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+def embed_query(query: str) -> List[float]:
+    """
+    Tek sorgu embedding'i; aynı (normalize) sorgular önbellekten döner, API çağrısı yapılmaz.
+    Aynı sorgu için eşzamanlı çağrılar (ör. ask() içindeki arama + yanıt önbelleği) tek isteği paylaşır.
+    """
+    model = settings.openai_embed_model
+    key = _query_cache_key(query)
+    cached = QUERY_CACHE.get(model, key)
+    if cached is not None:
+        return cached.tolist()
+
+    with _INFLIGHT_LOCK:
+        fut = _INFLIGHT.get(key)
+        owner = fut is None
+        if owner:
+            fut = Future()
+            _INFLIGHT[key] = fut
+    if not owner:
+        return fut.result()
+
+    try:
+        vec = embed_texts([query])[0].tolist()
+        QUERY_CACHE.put(model, key, vec)
+        fut.set_result(vec)
+        return vec
+    except Exception as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.pop(key, None)
+
+def embed_queries(queries: List[str]) -> List[List[float]]:
+    """
+    Çoklu sorgu: önbellekte olmayanlar tek (64'lük) toplu embedding isteğiyle alınır.
+    embed_query ile aynı uçuştaki istek tablosunu kullanır: başka bir çağrının hâlihazırda istediği sorgu
+    (ör. ask() içinde yanıt önbelleği için embed_query) yeniden istenmez, onun sonucu beklenir.
+    """
+    model = settings.openai_embed_model
+    keys = [_query_cache_key(q) for q in queries]
+    out: List[Optional[List[float]]] = [None] * len(queries)
+    missing: Dict[str, List[int]] = {}
+    for i, key in enumerate(keys):
+        cached = QUERY_CACHE.get(model, key)
+        if cached is not None:
+            out[i] = cached.tolist()
+        else:
+            missing.setdefault(key, []).append(i)
+    if not missing:
+        return out  # type: ignore[return-value]
+
+    owned: Dict[str, Future] = {}
+    waiting: Dict[str, Future] = {}
+    with _INFLIGHT_LOCK:
+        for key in missing:
+            fut = _INFLIGHT.get(key)
+            if fut is None:
+                owned[key] = _INFLIGHT[key] = Future()
+            else:
+                waiting[key] = fut
+    if owned:
+        todo = list(owned)
+        try:
+            vecs = embed_texts([queries[missing[key][0]] for key in todo]).tolist()
+            for key, vec in zip(todo, vecs):
+                QUERY_CACHE.put(model, key, vec)
+                owned[key].set_result(vec)
+        except Exception as e:
+            for fut in owned.values():
+                if not fut.done():
+                    fut.set_exception(e)
+            raise
+        finally:
+            with _INFLIGHT_LOCK:
+                for key in todo:
+                    _INFLIGHT.pop(key, None)
+    for key, fut in {**waiting, **owned}.items():
+        vec = fut.result()
+        for i in missing[key]:
+            out[i] = vec
+    return out  # type: ignore[return-value]
+
 # --- Runtime kategori router (sorgu için)
 def route_category_from_text(text: str) -> Optional[str]:
     t = _tr_lower(text)
@@ -312,34 +458,33 @@ def route_category_from_text(text: str) -> Optional[str]:
     return None
 
 # ----------------- Milvus -----------------
+_MILVUS_CONN = "default"
+# Sağlık kontrolü en fazla bu aralıkla yapılır (saniye); arada bağlantı sağlam kabul edilir.
+_MILVUS_HEALTH_INTERVAL = float(getattr(settings, "milvus_health_interval", 30) or 30)
+
 def _connect_milvus():
     """
     Connect to Milvus/Zilliz Cloud instance using the configured settings.
+    Var olan "default" bağlantısı kapatılıp yeniden açılır; yalnızca oturum kurulurken
+    veya hata sonrası yeniden bağlanırken çağrılmalı.
     """
+    uri = settings.milvus_uri
+    token = settings.milvus_token
+    db_name = settings.milvus_db
+
+    # Ensure URI has https:// prefix and no trailing port
+    clean_uri = (uri or "").rstrip('/')
+    if ':19530' in clean_uri:
+        clean_uri = clean_uri.replace(':19530', '')
+    if not clean_uri.startswith(('http://', 'https://')):
+        clean_uri = 'https://' + clean_uri
+
     try:
-        # Close any existing connections first
-        if connections.has_connection("default"):
-            connections.remove_connection("default")
-
-        uri = settings.milvus_uri
-        token = settings.milvus_token
-        db_name = settings.milvus_db
-
-        # Ensure URI has https:// prefix and no trailing port
-        clean_uri = uri.rstrip('/')
-        if ':19530' in clean_uri:
-            clean_uri = clean_uri.replace(':19530', '')
-        if not clean_uri.startswith(('http://', 'https://')):
-            clean_uri = 'https://' + clean_uri
-
-        print(f"Debug - Connecting to Zilliz Cloud:")
-        print(f"URI: {clean_uri}")
-        print(f"DB: {db_name}")
-        print(f"Token length: {len(token) if token else 0}")
-
-        # Connect using the cleaned URI
+        if connections.has_connection(_MILVUS_CONN):
+            connections.remove_connection(_MILVUS_CONN)
+        print(f"[milvus] connecting: {clean_uri} (db={db_name})")
         connections.connect(
-            alias="default",
+            alias=_MILVUS_CONN,
             uri=clean_uri,
             token=token,
             db_name=db_name,
@@ -347,23 +492,19 @@ def _connect_milvus():
             timeout=30
         )
     except Exception as e:
-        print(f"Milvus Connection Error: {str(e)}")
-        raise
-    
-        # Verify connection with health check
-        _ = utility.get_server_version()
-    except Exception as e:
-        print(f"Milvus Connection Error - URI: {uri}, DB: {db_name}")
+        print(f"Milvus Connection Error - URI: {clean_uri}, DB: {db_name}")
         print(f"Error Details: {e}")
         raise
 
-def _ensure_collection() -> Collection:
-    _connect_milvus()
-    name = settings.milvus_collection
+def _open_collection(name: str) -> Collection:
+    """Koleksiyonu (yoksa şema + index ile) oluşturur ve belleğe yükler."""
     TEXT_F = getattr(settings, "milvus_text_field", "text")
     VEC_F  = getattr(settings, "milvus_vector_field", "embedding")
 
     if not utility.has_collection(name):
+        if name == collection_alias.alias_name():
+            # Alias henüz bir sürüme bağlanmamış; aynı adla koleksiyon yaratmak alias'ı kalıcı olarak engeller
+            raise RuntimeError(f"Milvus alias '{name}' is not set; run 'python -m src.server rebuild --file ...' first")
         fields = [
             FieldSchema(name="id",        dtype=DataType.INT64,  is_primary=True, auto_id=False),
             FieldSchema(name="category",  dtype=DataType.VARCHAR, max_length=32),
@@ -400,33 +541,240 @@ def _ensure_collection() -> Collection:
 
     return col
 
+# Oturumu düşürüp yeniden denemeye değer hatalar: sunucuya ulaşılamıyor / bağlantı yok / hazır değil
+_MILVUS_RETRY_GRPC = {grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED}
+_MILVUS_RETRY_CODES = {2, 56, 57}  # common.ErrorCode: ConnectFailed, NotReadyServe, NotReadyCoordActivating
+
+def _milvus_retryable(e: BaseException) -> bool:
+    if isinstance(e, (MilvusUnavailableException, ConnectionNotExistException)):
+        return True
+    if isinstance(e, grpc.RpcError):
+        return e.code() in _MILVUS_RETRY_GRPC
+    if isinstance(e, MilvusException):
+        # pymilvus kendi yeniden denemesi tükenince gRPC durum kodunu MilvusException.code'a koyar
+        return e.code in _MILVUS_RETRY_GRPC or getattr(e, "compatible_code", None) in _MILVUS_RETRY_CODES
+    return False
+
+class _MilvusSession:
+    """
+    Süreç başına uzun ömürlü Milvus oturumu.
+    - Bağlantı bir kez kurulur; yüklenmiş Collection nesneleri isimle önbelleklenir.
+    - Sıcak yolda yalnızca _MILVUS_HEALTH_INTERVAL aralıkla ucuz bir sağlık kontrolü yapılır.
+    - Yeniden bağlanma sadece sağlık kontrolü veya bir işlem hata verdiğinde olur.
+    """
+
+    def __init__(self, health_interval: float = _MILVUS_HEALTH_INTERVAL):
+        self._lock = threading.RLock()
+        self._connected = False
+        self._cols: Dict[str, Collection] = {}
+        self._parts: Dict[str, set] = {}
+        self._checked_at = 0.0
+        self._health_interval = max(float(health_interval), 0.0)
+
+    def _healthy(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at < self._health_interval:
+            return True
+        try:
+            utility.get_server_version(using=_MILVUS_CONN, timeout=5)
+        except Exception as e:
+            print(f"[milvus] health check failed: {e}")
+            return False
+        self._checked_at = now
+        return True
+
+    def collection(self, name: Optional[str] = None) -> Collection:
+        name = name or collection_alias.serving_name()
+        with self._lock:
+            if self._connected and not self._healthy():
+                self._reset()
+            if not self._connected:
+                _connect_milvus()
+                self._connected = True
+                self._checked_at = time.monotonic()
+            col = self._cols.get(name)
+            if col is None:
+                col = _open_collection(name)
+                self._cols[name] = col
+            return col
+
+    def _reset(self) -> None:
+        self._cols.clear()
+        self._parts.clear()
+        self._connected = False
+
+    def partitions(self, col: Collection, refresh: bool = False) -> set:
+        """Koleksiyondaki partition isimleri (önbellekli; bilinmeyen isimde bir kez tazelenir)."""
+        with self._lock:
+            known = self._parts.get(col.name)
+            if known is None or refresh:
+                known = {p.name for p in col.partitions}
+                self._parts[col.name] = known
+            return known
+
+    def ensure_partitions(self, col: Collection, names: Iterable[str]) -> None:
+        """Eksik partition'ları oluştur ve koleksiyonu yeniden yükle (yeni partition'lar aranabilsin)."""
+        with self._lock:
+            missing = [n for n in set(names) if n not in self.partitions(col)]
+            if missing:
+                missing = [n for n in missing if n not in self.partitions(col, refresh=True)]
+            if not missing:
+                return
+            for n in missing:
+                col.create_partition(n)
+                self._parts[col.name].add(n)
+            col.load()
+
+    def invalidate(self) -> None:
+        """Bir sonraki erişimde yeniden bağlanmaya zorla."""
+        with self._lock:
+            self._reset()
+
+    def run(self, fn, name: Optional[str] = None):
+        """
+        fn(col) çalıştırır. Bağlantı/RPC erişilebilirlik hatasında oturumu düşürür, bir kez yeniden bağlanıp
+        tekrar dener; diğer hatalar (şema, ifade, veri) olduğu gibi yükseltilir.
+        """
+        try:
+            return fn(self.collection(name))
+        except Exception as e:
+            if not _milvus_retryable(e):
+                raise
+            print(f"[milvus] operation failed, reconnecting: {e}")
+            self.invalidate()
+            return fn(self.collection(name))
+
+_MILVUS = _MilvusSession()
+
+def _ensure_collection(name: Optional[str] = None) -> Collection:
+    return _MILVUS.collection(name)
+
+def _partition_mode() -> bool:
+    return getattr(settings, "milvus_partition_mode", "filter") == "partition"
+
+def _partition_name(category: Optional[str]) -> str:
+    """Kategori → partition adı (Milvus: harf/rakam/altçizgi)."""
+    return "cat_" + re.sub(r"[^0-9A-Za-z_]", "_", category or "other")
+
+def _local_mirror() -> bool:
+    """Yazımlar yerel NumPy indeksine de gider mi: local backend ya da LOCAL_INDEX_MIRROR=true (+ LOCAL_INDEX_DIR)."""
+    if not getattr(settings, "local_index_dir", ""):
+        return False
+    return settings.vector_backend == "local" or bool(getattr(settings, "local_index_mirror", False))
+
+def _milvus_stores_text() -> bool:
+    # Yerel depo yoksa metin Milvus'ta kalmak zorunda
+    return bool(getattr(settings, "milvus_store_text", True)) or not _local_mirror()
+
+def _upsert_rows(col: Collection, ids, cats, urls, cids, texts, vecs) -> None:
+    """
+    Upsert sırası schema’daki alan sıranızla eşleşmeli.
+    MILVUS_PARTITION_MODE=partition ise satırlar kategori partition'larına dağıtılır
+    (row id kategoriyi içerdiğinden aynı id hep aynı partition'a düşer).
+    """
+    # pymilvus FLOAT_VECTOR sütunu float listesi ister: dönüşüm yazım partisi başına tek tolist() çağrısı
+    V = np.asarray(vecs, dtype=np.float32).reshape(len(ids), -1)
+    if not _partition_mode():
+        col.upsert([ids, cats, urls, cids, texts, V.tolist()])
+        return
+    groups: Dict[str, List[int]] = {}
+    for i, c in enumerate(cats):
+        groups.setdefault(_partition_name(c), []).append(i)
+    _MILVUS.ensure_partitions(col, groups.keys())
+    for part, rows in groups.items():
+        col.upsert(
+            [[x[i] for i in rows] for x in (ids, cats, urls, cids, texts)] + [V[rows].tolist()],
+            partition_name=part,
+        )
+
 def _milvus_delete_ids(col: Collection, ids: List[int]) -> None:
     if not ids:
         return
     CHUNK = 2000
     for i in range(0, len(ids), CHUNK):
         sub = ids[i : i + CHUNK]
-        expr = f"id in {sub}"
         try:
-            col.delete(expr)
-        except Exception:
-            pass
+            col.delete(f"id in {sub}")
+        except Exception as e:
+            print(f"[milvus] delete failed ({len(sub)} ids): {e}")
+            raise
+
+_MILVUS_WRITE_BATCH = int(getattr(settings, "milvus_write_batch", 1000) or 1000)
+_MILVUS_FLUSH_INTERVAL = float(getattr(settings, "milvus_flush_interval", 300) or 0)
+
+class _MilvusWriter:
+    """
+    Milvus yazma yolu: delete+insert yerine upsert (yeniden bağlanıp tekrar denemek güvenli),
+    MILVUS_WRITE_BATCH'lik parçalar. Flush segment mühürler ve pahalıdır; çağrı başına yapılmaz:
+    iş sonunda seal() ya da arka planda MILVUS_FLUSH_INTERVAL saniyede bir (0 → sadece seal()).
+    Upsert edilen satırlar flush beklemeden aramada görünür.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty: set = set()  # flush bekleyen koleksiyonlar
+        self._timer: Optional[threading.Timer] = None
+
+    def upsert(self, ids, cats, urls, cids, texts, vecs, name: Optional[str] = None) -> int:
+        B = _MILVUS_WRITE_BATCH
+        for s in range(0, len(ids), B):
+            part = [x[s : s + B] for x in (ids, cats, urls, cids, texts, vecs)]
+            _MILVUS.run(lambda col, part=part: _upsert_rows(col, *part), name)
+        self._mark(name)
+        return len(ids)
+
+    def delete(self, ids: List[int], name: Optional[str] = None) -> int:
+        _MILVUS.run(lambda col: _milvus_delete_ids(col, ids), name)
+        self._mark(name)
+        return len(ids)
+
+    def _mark(self, name: Optional[str]) -> None:
+        with self._lock:
+            self._dirty.add(name or collection_alias.serving_name())
+            if _MILVUS_FLUSH_INTERVAL > 0 and self._timer is None:
+                self._timer = threading.Timer(_MILVUS_FLUSH_INTERVAL, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.seal()
+        except Exception as e:
+            print(f"[milvus] periodic flush failed: {e}")
+
+    def seal(self, name: Optional[str] = None) -> None:
+        """Bekleyen koleksiyon(lar)ı flush et."""
+        with self._lock:
+            if name is not None:
+                names = [name] if name in self._dirty else []
+            else:
+                names = list(self._dirty)
+            self._dirty.difference_update(names)
+        for n in names:
+            _MILVUS.run(lambda col: col.flush(), n)
+
+_WRITER = _MilvusWriter()
 
 @t_ingest(name="upsert_docs")
 def upsert_docs(
-    docs: List[Tuple[str, str, str, int, List[float]]]
+    docs: List[Tuple[str, str, str, int, "np.ndarray"]],
+    save_local: bool = True,
+    flush: bool = True,
+    collection: Optional[str] = None,
+    index: Optional[local_index.LocalVectorIndex] = None,
 ) -> int:
     """
-    docs: List[(category, url, chunk_text_val, chunk_id, embedding_vec)]
+    docs: List[(category, url, chunk_text_val, chunk_id, embedding_vec)]; vektörler float32 dizi (satır) ya da liste
+    save_local/flush=False: toplu (akışlı) ingest'te yerel indeks kaydı ve Milvus flush'ı iş sonunda bir kez yapılır.
+    Milvus'a upsert yazılır (önce silmeye gerek yok).
+    collection: hedef koleksiyon/sürüm (rebuild); None → canlı (MILVUS_ALIAS veya MILVUS_COLLECTION).
+    index: yazılacak yerel indeks nesnesi (ingest işi boyunca aynı nesne); None → get_index(collection, writable=True).
     """
     if not docs:
         return 0
 
-    col = _ensure_collection()
-
-    TEXT_F = getattr(settings, "milvus_text_field", "text")
-    VEC_F  = getattr(settings, "milvus_vector_field", "embedding")
-
     ids, cats, urls, cids, texts, vecs = [], [], [], [], [], []
     for category, url, chunk_text_val, chunk_id, emb in docs:
         rid = _hash_row_id(url, category, chunk_id)
@@ -436,67 +784,563 @@ def upsert_docs(
         cids.append(int(chunk_id))
         texts.append((chunk_text_val or "")[:_TEXT_MAX])
         vecs.append(emb)
+    # Embed batch satırları tek bitişik (n, dim) float32 matris: yerel indeks ve Milvus yazımı bunu paylaşır
+    vecs = np.asarray(vecs, dtype=np.float32).reshape(len(ids), -1)
+
+    # Yerel NumPy indeksi: VECTOR_BACKEND=local ya da LOCAL_INDEX_MIRROR=true ise (bkz. _local_mirror)
+    if _local_mirror():
+        idx = index if index is not None else local_index.get_index(collection, writable=True)
+        idx.upsert(ids, cats, urls, cids, texts, vecs)
+        if save_local:
+            idx.save()
+    if settings.vector_backend == "local":
+        return len(ids)
+
+    # MILVUS_STORE_TEXT=false: metin yerel mmap depoda (text_store); Milvus'a boş metin yazılır
+    milvus_texts = texts if _milvus_stores_text() else [""] * len(ids)
+
+    name = collection or collection_alias.serving_name()
+    _WRITER.upsert(ids, cats, urls, cids, milvus_texts, vecs, name=name)
+    if flush:
+        _WRITER.seal(name)
+    return len(ids)
 
-    _milvus_delete_ids(col, ids)
-
-    # Insert sırası schema’daki alan sıranızla eşleşmeli
-    col.insert([
-        ids,
-        cats,
-        urls,
-        cids,
-        texts,   # TEXT_F
-        vecs,    # VEC_F
-    ])
-    col.flush()
+def delete_docs(
+    ids: List[int],
+    save_local: bool = True,
+    collection: Optional[str] = None,
+    index: Optional[local_index.LocalVectorIndex] = None,
+) -> int:
+    """Verilen row id'leri yerel indeksten ve Milvus'tan sil (index: bkz. upsert_docs)."""
+    if not ids:
+        return 0
+    if _local_mirror():
+        idx = index if index is not None else local_index.get_index(collection, writable=True)
+        if idx.delete(ids) and save_local:
+            idx.save()
+    if settings.vector_backend != "local":
+        _WRITER.delete(list(ids), name=collection)
     return len(ids)
 
 # ----------------- JSON Ingest -----------------
-@t_ingest(name="ingest_from_json")
-def ingest_from_json(path: str) -> Dict[str, int]:
-    per_cat: Dict[str, int] = {}
-    total = 0
-    payload_texts: List[Tuple[str, str, str, int]] = []
-
-    for rec in _iter_json_records(path):
-        url = (rec.get("url") or "").strip()
-        if not url:
-            continue
-
-        mapped_cat = _map_category(
-            scraped_cat = rec.get("category"),
-            slug        = rec.get("subcategory") or rec.get("sub_category"),
-            title       = rec.get("title") or "",
-            breadcrumb  = rec.get("breadcrumb") or "",
+_STREAM_END = object()
+
+def _ingest_items(
+    path: str,
+    manifest: IngestManifest,
+    full: bool,
+    stats: Dict[str, int],
+    observe: Optional[Callable[[str, str, List[str]], None]] = None,
+    start: int = 0,
+) -> Iterator[Tuple[str, tuple]]:
+    """
+    Kayıtları akış hâlinde okur ve manifest'e göre farkı üretir:
+      ("chunk", (category, url, text, chunk_id))                      → embed edilecek chunk
+      ("page",  (url, category, page_hash, entries, ts, stale_ids, duplicates, record_no))
+                                                                      → sayfanın tüm chunk'larından SONRA gelir
+    observe(url, category, chunks): değişmemiş olanlar dahil her sayfa için çağrılır (ingest planı).
+    start: bu sıradan önceki kayıtlar chunk'lanmadan atlanır (--resume; okuma sırası deterministiktir).
+    INGEST_DEDUP: yakın-kopya chunk'lar yazılmaz; (chunk_id, kanonik_row_id, kanonik_url) olarak manifest'e girer.
+    """
+    known = {} if full else manifest.page_hashes()
+    model = settings.openai_embed_model
+
+    # CHUNKER=sentence: önce korpusta çok sayfada tekrar eden cümleleri bul (ayrı, hafif bir geçiş)
+    drop: Set[str] = set()
+    min_pages = int(getattr(settings, "chunk_boilerplate_min_pages", 0) or 0)
+    if getattr(settings, "chunker", "chars") == "sentence" and min_pages > 0:
+        drop = chunker.repeated_sentences(
+            (_record_text(r) for r in _iter_json_records(path) if not isinstance(r.get("chunks"), list)),
+            min_pages,
+        )
+        if drop:
+            print(f"[ingest] {len(drop)} boilerplate sentences repeated on >= {min_pages} pages will be dropped")
+
+    def _pages(skip: int = 0) -> Iterator[Tuple[int, Dict, str, str, List[str]]]:
+        seen_urls = set()
+        for rec_no, rec in enumerate(_iter_json_records(path)):
+            url = (rec.get("url") or "").strip()
+            if not url or url in seen_urls:
+                continue
+            seen_urls.add(url)
+            if rec_no < skip:
+                continue
+            mapped_cat = _map_category(
+                scraped_cat = rec.get("category"),
+                slug        = rec.get("subcategory") or rec.get("sub_category"),
+                title       = rec.get("title") or "",
+                breadcrumb  = rec.get("breadcrumb") or "",
+            )
+            chunks = _extract_chunks_from_record(rec, drop)
+            if chunks:
+                yield rec_no, rec, url, mapped_cat, chunks
+
+    # INGEST_DEDUP: kopya kararları tüm korpusa bakılarak verilir (ikinci hafif geçiş; vektör gerekmez)
+    dups: Dict[Tuple[str, int], Tuple[str, int]] = {}
+    if getattr(settings, "ingest_dedup", False):
+        dups, d = dedup.find_duplicates(
+            ((url, cat, chunks) for _, _, url, cat, chunks in _pages()),
+            threshold=float(getattr(settings, "dedup_threshold", 0.85)),
+            shingle=int(getattr(settings, "dedup_shingle", 5)),
+        )
+        stats["dedup_chunks"] = d["duplicates"]
+        stats["dedup_groups"] = d["groups"]
+        print(
+            f"[ingest] near-duplicates: {d['duplicates']}/{d['chunks']} chunks ({100 * d['ratio']:.1f}%) "
+            f"folded into {d['groups']} canonical chunks; index shrinks to {d['chunks'] - d['duplicates']} rows"
         )
 
-        chunks = _extract_chunks_from_record(rec)
-        if not chunks:
+    for rec_no, rec, url, mapped_cat, chunks in _pages(start):
+        if observe is not None:
+            observe(url, mapped_cat, chunks)
+
+        # Kanonik chunk'lar aynı kategoridedir (dedup kategori içinde çalışır)
+        dup_entries: List[Tuple[int, int, str]] = []
+        for i in range(len(chunks)):
+            canon = dups.get((url, i))
+            if canon is not None:
+                dup_entries.append((i, _hash_row_id(canon[0], mapped_cat, canon[1]), canon[0]))
+
+        # Model/kategori değişimi de sayfayı "değişmiş" yapar (row id ve vektörler değişir); kopya kararları da
+        page_hash = content_hash(model, mapped_cat, *chunks, *(f"dup:{i}:{rid}" for i, rid, _ in dup_entries))
+        if known.get(url) == page_hash:
+            stats["unchanged_pages"] += 1
             continue
 
+        skip = {i for i, _, _ in dup_entries}
+        old = {} if full else manifest.chunks(url)
+        entries: List[Tuple[int, int, str]] = []
         for i, ch in enumerate(chunks):
-            payload_texts.append((mapped_cat, url, ch, i))
-
-    if not payload_texts:
-        return {"total_chunks": 0}
+            if i in skip:
+                continue
+            rid = _hash_row_id(url, mapped_cat, i)
+            h = content_hash(model, ch)
+            entries.append((i, rid, h))
+            if old.get(i) != (rid, h):
+                yield "chunk", (mapped_cat, url, ch, i)
+        new_ids = {rid for _, rid, _ in entries}
+        stale = [rid for rid, _ in old.values() if rid not in new_ids]
+        stats["changed_pages"] += 1
+        yield "page", (url, mapped_cat, page_hash, entries, rec.get("last_crawled_ts"), stale, dup_entries, rec_no)
+
+def _source_signature(path: str) -> str:
+    """Girdi dosyaları (yol, boyut, mtime) → kısa hash; değiştiyse kayıt ofseti geçersizdir."""
+    parts: List[str] = []
+    for fp in json_reader.list_files(path):
+        st = os.stat(fp)
+        parts += [os.path.abspath(fp), str(st.st_size), str(st.st_mtime_ns)]
+    return content_hash(*parts)[:16]
 
-    vectors = embed_texts([p[2] for p in payload_texts])
-    docs = [
-        (cat, url, ch, cid, vectors[i])
-        for i, (cat, url, ch, cid) in enumerate(payload_texts)
-    ]
+@t_ingest(name="ingest_from_json")
+def ingest_from_json(
+    path: str, full: bool = False, collection: Optional[str] = None, resume: bool = False
+) -> Dict[str, int]:
+    """
+    Akışlı, artımlı ingest: oku/chunk'la → embed (_EMBED_BATCH) → yaz (INGEST_INSERT_BATCH).
+    Aşamalar sınırlı kuyruklarla (INGEST_QUEUE_SIZE) eşzamanlı çalışır; bellek korpus boyutundan bağımsızdır.
+    Manifest'e göre hash'i değişmeyen URL'ler atlanır, değişen sayfalarda yalnızca yeni/değişen chunk'lar
+    embed edilir, sayfa kısaldıysa artakalan chunk id'leri silinir. Bir sayfa manifest'e ancak tüm chunk'ları
+    yazıldıktan sonra işlenir → yarıda kalan ingest tekrar çalıştırıldığında kaldığı yerden devam eder.
+    full=True: manifest yok sayılır, tüm chunk'lar yeniden embed edilip yazılır.
+    collection: canlı olmayan bir sürüme yaz (rebuild_collection); None → canlı koleksiyon/alias.
+    Her INGEST_CHECKPOINT_SECONDS'ta kontrol noktası: yerel indeks kaydedilir, yazılan sayfalar manifest'e ve
+    işlenen kayıt ofseti iş kaydına (manifest `jobs`) geçer. resume=True: aynı girdinin yarım kalan işine
+    bu ofsetten devam edilir; önceki kayıtlar okunur ama chunk'lanmaz, vektörler embed deposundan gelir.
+    Yerel indeks iş başında bir kez alınır ve iş boyunca aynı nesneye yazılır: başka bir süreç indeksi arada
+    kaydederse get_index'in yeniden yüklemesi bu işin henüz kaydedilmemiş satırlarını düşürmez.
+    """
+    milvus_name = collection or collection_alias.serving_name()
+    local_name = collection_alias.physical_name(collection)
+    live = collection is None or collection == collection_alias.serving_name()
+    manifest = IngestManifest(local_name)
+    local_idx = local_index.get_index(local_name, writable=True) if _local_mirror() else None
+    if local_idx is None and settings.vector_backend != "local" and (
+        settings.search_mode != "dense" or settings.category_router != "off" or getattr(settings, "snapshot_dir", "")
+    ):
+        print(
+            "[warn] SEARCH_MODE/CATEGORY_ROUTER/SNAPSHOT_DIR need the local index; "
+            "set LOCAL_INDEX_MIRROR=true to build it during ingest"
+        )
+    stats: Dict[str, int] = {
+        "total_chunks": 0, "changed_pages": 0, "unchanged_pages": 0, "deleted_chunks": 0,
+        "failed_chunks": 0, "failed_pages": 0,
+    }
+
+    source, signature = os.path.abspath(path), _source_signature(path)
+    job = manifest.resumable_job(source) if resume else None
+    if resume and job is None:
+        print("[ingest] no unfinished job for this input; starting a new one")
+    elif job is not None and job["signature"] != signature:
+        print(f"[ingest] input changed since job {job['job_id']}; starting a new one (manifest still skips finished pages)")
+        job = None
+    if job is None:
+        job = manifest.start_job(source, signature, full)
+    else:
+        full = full or bool(job["full"])
+        print(
+            f"[ingest] resuming job {job['job_id']} at record {job['record_offset']} "
+            f"({job['pages']} pages / {job['chunks']} chunks written before)"
+        )
+    job_id, start = str(job["job_id"]), int(job["record_offset"])
+    prior = {k: int(job[k]) for k in ("pages", "chunks", "deleted")}
+    manifest.checkpoint(job_id, start, prior["pages"], prior["chunks"], prior["deleted"], status="running")
+    # committed: vektörleri yazılmış, manifest'e henüz işlenmemiş sayfalar; hole: embed'i başarısız ilk kayıt
+    committed: List[tuple] = []
+    ckpt: Dict[str, object] = {"offset": start, "hole": None, "pages": 0, "at": time.monotonic()}
+
+    def _checkpoint(status: Optional[str] = None, error: Optional[str] = None, save: bool = False) -> None:
+        # Sıra önemli: yerel indeks → manifest sayfaları → iş ofseti (arada çökme veri kaybettirmez)
+        if (committed or save) and local_idx is not None:
+            local_idx.save()
+        for url, cat, page_hash, entries, ts, _, dup_entries, _ in committed:
+            manifest.record_page(url, cat, page_hash, entries, ts, duplicates=dup_entries)
+        if committed:
+            ckpt["offset"] = committed[-1][7] + 1
+            ckpt["pages"] += len(committed)
+            committed.clear()
+        offset = ckpt["offset"] if ckpt["hole"] is None else min(ckpt["offset"], ckpt["hole"])
+        manifest.checkpoint(
+            job_id, offset, prior["pages"] + ckpt["pages"], prior["chunks"] + stats["total_chunks"],
+            prior["deleted"] + stats["deleted_chunks"], status=status, error=error,
+        )
+        ckpt["at"] = time.monotonic()
+    per_cat: Dict[str, int] = {}
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    embed_q: "queue.Queue" = queue.Queue(maxsize=_INGEST_QUEUE_SIZE * _EMBED_BATCH)
+    write_q: "queue.Queue" = queue.Queue(maxsize=_INGEST_QUEUE_SIZE)
+    progress = tqdm(desc="ingest", unit="chunk", dynamic_ncols=True)
+
+    def _put(q: "queue.Queue", item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(q: "queue.Queue"):
+        while True:
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                if stop.is_set():
+                    return _STREAM_END
+
+    def _embed_stage() -> None:
+        # Batch'ler eşzamanlı embed edilir (_EMBEDDER); yazıcıya gönderim sırası korunur.
+        # Başarısız batch atlanır: chunk'ları yazılmaz, sayfaları manifest'e işlenmez (sonraki çalıştırma tekrar dener).
+        pending: List[Tuple[str, tuple]] = []
+        inflight: "deque[Tuple[List[Tuple[str, tuple]], Optional[Future]]]" = deque()
+        failed_urls = set()
+        max_inflight = 2 * _EMBEDDER.max_workers
+
+        def _submit() -> None:
+            texts = [val[2] for kind, val in pending if kind == "chunk"]
+            inflight.append((list(pending), _embed_chunks_async(texts) if texts else None))
+
+        def _emit(limit: int) -> None:
+            while inflight and (len(inflight) > limit or inflight[0][1] is None or inflight[0][1].done()):
+                group, fut = inflight.popleft()
+                try:
+                    vecs = iter(fut.result() if fut is not None else [])
+                except Exception as e:
+                    n = sum(1 for kind, _ in group if kind == "chunk")
+                    print(f"[warn] embed batch failed, skipping {n} chunks: {e}")
+                    stats["failed_chunks"] += n
+                    failed_urls.update(val[1] for kind, val in group if kind == "chunk")
+                    vecs = None
+                out = []
+                for kind, val in group:
+                    if kind == "chunk":
+                        if vecs is not None:
+                            out.append(("doc", (*val, next(vecs))))
+                    elif val[0] in failed_urls:
+                        stats["failed_pages"] += 1
+                        # Ofset bu sayfayı geçmesin: --resume onu yeniden dener
+                        if ckpt["hole"] is None:
+                            ckpt["hole"] = val[7]
+                    else:
+                        out.append((kind, val))
+                _put(write_q, out)
 
-    wrote = upsert_docs(docs)
-    total += wrote
-    for cat, _, _, _, _ in docs:
-        per_cat[cat] = per_cat.get(cat, 0) + 1
+        try:
+            n_chunks = 0
+            while True:
+                item = _get(embed_q)
+                if item is _STREAM_END:
+                    break
+                pending.append(item)
+                if item[0] == "chunk":
+                    n_chunks += 1
+                if n_chunks >= _EMBED_BATCH:
+                    _submit()
+                    pending, n_chunks = [], 0
+                    _emit(max_inflight)
+            if pending and not stop.is_set():
+                _submit()
+            if not stop.is_set():
+                _emit(0)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(write_q, _STREAM_END)
+
+    def _write_stage() -> None:
+        docs: List[tuple] = []
+        pages: List[tuple] = []
+
+        def _flush() -> None:
+            if docs:
+                stats["total_chunks"] += upsert_docs(
+                    docs, save_local=False, flush=False, collection=collection, index=local_idx
+                )
+                for d in docs:
+                    per_cat[d[0]] = per_cat.get(d[0], 0) + 1
+                progress.update(len(docs))
+            # Bu noktaya kadar gelen sayfaların tüm chunk'ları yazıldı; manifest'e kontrol noktasında geçer
+            stale = [rid for p in pages for rid in p[5]]
+            stats["deleted_chunks"] += delete_docs(stale, save_local=False, collection=collection, index=local_idx)
+            committed.extend(pages)
+            if time.monotonic() - ckpt["at"] >= _INGEST_CHECKPOINT_S:
+                _checkpoint()
+            progress.set_postfix(pages=stats["changed_pages"], unchanged=stats["unchanged_pages"], refresh=False)
+            docs.clear()
+            pages.clear()
 
-    return {"total_chunks": total, **per_cat}
+        try:
+            while True:
+                msgs = _get(write_q)
+                if msgs is _STREAM_END:
+                    break
+                for kind, val in msgs:
+                    (docs if kind == "doc" else pages).append(val)
+                if len(docs) >= _INGEST_INSERT_BATCH:
+                    _flush()
+            if not stop.is_set():
+                _flush()
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    workers = [
+        threading.Thread(target=_embed_stage, name="ingest-embed", daemon=True),
+        threading.Thread(target=_write_stage, name="ingest-write", daemon=True),
+    ]
+    for t in workers:
+        t.start()
+    try:
+        for item in _ingest_items(path, manifest, full, stats, start=start):
+            if not _put(embed_q, item):
+                break
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(embed_q, _STREAM_END)
+        for t in workers:
+            t.join()
+        progress.close()
+
+    wrote_any = stats["total_chunks"] > 0 or stats["deleted_chunks"] > 0
+    # Hata olsa bile yazılanlar kalıcı olsun: son kontrol noktası (yerel indeks + manifest + iş durumu)
+    status = "failed" if errors else ("partial" if stats["failed_pages"] else "done")
+    _checkpoint(status=status, error=repr(errors[0])[:500] if errors else None, save=wrote_any)
+    if wrote_any and settings.vector_backend != "local":
+        _WRITER.seal(milvus_name)
+    if status != "done":
+        print(f"[ingest] job {job_id} {status}; rerun with --resume to continue")
+    if errors:
+        raise errors[0]
+    if start:
+        stats["resumed_from"] = start
+    # Devam edilen işte değişiklikler önceki çalıştırmada yazılmış olabilir → türetilmiş yapılar yine kurulur
+    if not stats["changed_pages"] and not prior["pages"]:
+        return {"total_chunks": 0, "unchanged_pages": stats["unchanged_pages"]}
+
+    # Sözcüksel (BM25) indeks ve mmap metin deposu: yerel indeksteki tüm chunk'lardan yeniden üret
+    if local_idx is not None:
+        bm25_index.rebuild(local_name, local_idx)
+        category_router.build(local_name, local_idx)
+        if getattr(settings, "snapshot_dir", ""):
+            snap = snapshot.publish(os.path.join(settings.snapshot_dir, local_name), local_idx, local_name)
+            print(f"[snapshot] {snap}")
+
+    # Korpus değişti → semantik yanıt önbellekleri (tüm süreçlerde) geçersiz (rebuild'de alias geçişinde)
+    if live:
+        bump_corpus_stamp()
+
+    return {**stats, **per_cat}
+
+_PLAN_CALL_LATENCY_S = float(getattr(settings, "ingest_plan_call_latency", 1.5) or 1.5)
+_PLAN_TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 8191)
+
+def _token_histogram(counts: List[int]) -> Dict[str, int]:
+    hist: Dict[str, int] = {}
+    lo = 0
+    for hi in _PLAN_TOKEN_BUCKETS:
+        hist[f"{lo}-{hi}"] = sum(1 for c in counts if lo < c <= hi)
+        lo = hi
+    hist[f">{lo}"] = sum(1 for c in counts if c > lo)
+    return hist
+
+def plan_ingest(path: str, full: bool = False) -> Dict[str, object]:
+    """
+    Dry-run: ingest_from_json'un okuma/kategori/chunk adımlarını çalıştırır, dış servise (OpenAI, Milvus)
+    gitmez. Yalnızca yerel manifest ve embedding deposu okunur.
+    Döner: kategori bazında sayfa/chunk/token, chunk token histogramı, manifest'e göre fark,
+    API çağrısı sayısı ve mevcut eşzamanlılık/rate limit ayarlarıyla tahmini süre.
+    """
+    model = settings.openai_embed_model
+    manifest = IngestManifest(collection_alias.physical_name())
+    stats: Dict[str, int] = {"changed_pages": 0, "unchanged_pages": 0}
+    per_cat: Dict[str, Dict[str, int]] = {}
+    all_tokens: List[int] = []
+    seen_urls: Set[str] = set()
+
+    def _observe(url: str, cat: str, chunks: List[str]) -> None:
+        seen_urls.add(url)
+        c = per_cat.setdefault(cat, {"pages": 0, "chunks": 0, "tokens": 0, "embed_chunks": 0, "embed_tokens": 0})
+        c["pages"] += 1
+        c["chunks"] += len(chunks)
+        for ch in chunks:
+            t = count_tokens(ch)
+            c["tokens"] += t
+            all_tokens.append(t)
+
+    to_embed: List[Tuple[str, str]] = []  # (kategori, metin) ingest'in göndereceği sırayla
+    stale = 0
+    for kind, val in _ingest_items(path, manifest, full, stats, observe=_observe):
+        if kind == "chunk":
+            to_embed.append((val[0], val[2]))
+        else:
+            stale += len(val[5])
+
+    embed_tokens: List[int] = []
+    for cat, text in to_embed:
+        t = count_tokens(text)
+        embed_tokens.append(t)
+        per_cat[cat]["embed_chunks"] += 1
+        per_cat[cat]["embed_tokens"] += t
+
+    # Embed aşaması _EMBED_BATCH'lik gruplar yapar; grupta depoda olmayan en az bir chunk varsa 1 API çağrısı
+    cached = EMBED_STORE.contains_many(model, [t for _, t in to_embed]) if to_embed else []
+    api_calls = api_chunks = api_tokens = 0
+    for s in range(0, len(to_embed), _EMBED_BATCH):
+        miss = [i for i in range(s, min(s + _EMBED_BATCH, len(to_embed))) if not cached[i]]
+        if miss:
+            api_calls += 1
+            api_chunks += len(miss)
+            api_tokens += sum(embed_tokens[i] for i in miss)
+
+    workers = _EMBEDDER.max_workers
+    rpm = float(getattr(settings, "embed_rpm", 0) or 0)
+    tpm = float(getattr(settings, "embed_tpm", 0) or 0)
+    bounds = {
+        "latency": api_calls * _PLAN_CALL_LATENCY_S / workers,
+        "rpm": api_calls / rpm * 60.0 if rpm > 0 else 0.0,
+        "tpm": api_tokens / tpm * 60.0 if tpm > 0 else 0.0,
+    }
+    bottleneck = max(bounds, key=bounds.get)
+
+    n_dups = int(stats.get("dedup_chunks", 0))
+    known_urls = set(manifest.page_hashes()) if not full else set()
+    m = manifest.stats()
+    return {
+        "file": path,
+        "collection": manifest.collection,
+        "model": model,
+        "chunker": getattr(settings, "chunker", "chars"),
+        "full": full,
+        "corpus": {
+            "pages": sum(c["pages"] for c in per_cat.values()),
+            "chunks": len(all_tokens),
+            "tokens": sum(all_tokens),
+            "max_chunk_tokens": max(all_tokens, default=0),
+        },
+        "dedup": {
+            "enabled": bool(getattr(settings, "ingest_dedup", False)),
+            "duplicates": n_dups,
+            "groups": int(stats.get("dedup_groups", 0)),
+            "rows_after": len(all_tokens) - n_dups,
+        },
+        "per_category": dict(sorted(per_cat.items())),
+        "token_histogram": _token_histogram(all_tokens),
+        "delta": {
+            "manifest_pages": m["pages"],
+            "manifest_chunks": m["chunks"],
+            "changed_pages": stats["changed_pages"],
+            "unchanged_pages": stats["unchanged_pages"],
+            "upsert_rows": len(to_embed),
+            "delete_rows": stale,
+            "manifest_only_pages": len(known_urls - seen_urls),
+        },
+        "embed": {
+            "chunks": len(to_embed),
+            "tokens": sum(embed_tokens),
+            "store_hits": sum(cached),
+            "api_chunks": api_chunks,
+            "api_tokens": api_tokens,
+            "api_calls": api_calls,
+        },
+        "projection": {
+            "workers": workers,
+            "rpm": rpm,
+            "tpm": tpm,
+            "call_latency_s": _PLAN_CALL_LATENCY_S,
+            "embed_seconds": round(max(bounds.values()), 1),
+            "bottleneck": bottleneck if api_calls else None,
+        },
+    }
+
+def format_ingest_plan(plan: Dict[str, object]) -> str:
+    c, d, e, p = plan["corpus"], plan["delta"], plan["embed"], plan["projection"]
+    lines = [
+        f"Ingest planı: {plan['file']} → {plan['collection']} (model={plan['model']}, chunker={plan['chunker']}"
+        f"{', full' if plan['full'] else ''})",
+        f"Korpus: {c['pages']} sayfa, {c['chunks']} chunk, {c['tokens']} token (en uzun chunk {c['max_chunk_tokens']})",
+        "",
+        f"{'kategori':<10} {'sayfa':>7} {'chunk':>7} {'token':>10} {'embed':>7} {'embed_tok':>10}",
+    ]
+    for cat, v in plan["per_category"].items():
+        lines.append(
+            f"{cat:<10} {v['pages']:>7} {v['chunks']:>7} {v['tokens']:>10} {v['embed_chunks']:>7} {v['embed_tokens']:>10}"
+        )
+    dd = plan["dedup"]
+    if dd["enabled"]:
+        pct = 100.0 * dd["duplicates"] / c["chunks"] if c["chunks"] else 0.0
+        lines.append(
+            f"Yakın-kopya: {dd['duplicates']} chunk ({pct:.1f}%) {dd['groups']} kanonik chunk'a katlanır → "
+            f"{dd['rows_after']} satır"
+        )
+    lines += ["", "Chunk token histogramı:"]
+    hist = plan["token_histogram"]
+    top = max(hist.values(), default=0) or 1
+    for k, n in hist.items():
+        lines.append(f"  {k:>10} {n:>7} {'#' * int(round(40 * n / top))}")
+    lines += [
+        "",
+        f"Manifest farkı: {d['changed_pages']} değişen / {d['unchanged_pages']} aynı sayfa "
+        f"(manifest'te {d['manifest_pages']} sayfa, {d['manifest_chunks']} chunk; "
+        f"dosyada olmayan {d['manifest_only_pages']})",
+        f"Milvus: {d['upsert_rows']} upsert, {d['delete_rows']} silme",
+        f"Embed: {e['chunks']} chunk / {e['tokens']} token; depoda {e['store_hits']} → "
+        f"API {e['api_calls']} çağrı, {e['api_chunks']} chunk, {e['api_tokens']} token",
+        f"Tahmini embed süresi: ~{p['embed_seconds']}s (workers={p['workers']}, rpm={p['rpm']:g}, tpm={p['tpm']:g}, "
+        f"çağrı ~{p['call_latency_s']}s; darboğaz={p['bottleneck']})",
+    ]
+    return "\n".join(lines)
 
-def upsert_history_qa(session_id: str, turn_id: int, question: str, answer: str, intent: str = "other") -> int:
+def upsert_history_qa(
+    session_id: str, turn_id: int, question: str, answer: str, intent: str = "other", save_local: bool = False
+) -> int:
     """
     Bir turdaki (soru+cevap) çiftini 'history' kategorisiyle vektör indekse ekler.
     Benzer sorularda recall amaçlı geri çağrılır.
+    VECTOR_BACKEND=local: satır bellekteki indekse eklenir; tüm indeksi yeniden yazan kayıt her turda yapılmaz,
+    upsert_docs(save_local=False) gibi çağırana bırakılır (save_local=True → hemen kaydet).
     """
     if not MEM_HISTORY_TO_INDEX:
         return 0
@@ -509,74 +1353,523 @@ def upsert_history_qa(session_id: str, turn_id: int, question: str, answer: str,
     text = f"SORU: {q}\nCEVAP: {a}"
 
     vecs = embed_texts([text])
-    if not vecs:
+    if vecs.shape[0] == 0:
         return 0
 
-    col = _ensure_collection()
-    TEXT_F = getattr(settings, "milvus_text_field", "text")
-    VEC_F  = getattr(settings, "milvus_vector_field", "embedding")
-
     # Tekil kimlik: session+turn’dan deterministik int64
     url = f"history://{session_id}#{turn_id}"
     chunk_id = 0
     rid = _hash_row_id(url, "history", chunk_id)
 
+    if settings.vector_backend == "local":
+        idx = local_index.get_index(writable=True)
+        idx.upsert([rid], ["history"], [url], [chunk_id], [text[:_TEXT_MAX]], [vecs[0]])
+        if save_local:
+            idx.save()
+        return 1
+
+    # Tek satır upsert; flush her turda değil, yazıcının zamanlayıcısıyla
     try:
-        _milvus_delete_ids(col, [rid])
-        col.insert([
+        _WRITER.upsert(
             [rid],               # id
             ["history"],         # category
             [url],               # url
             [chunk_id],          # chunk_id
             [text[:_TEXT_MAX]],  # TEXT_F
             [vecs[0]],           # VEC_F
-        ])
-        col.flush()
+        )
         return 1
     except Exception as e:
         print(f"[MEM] upsert_history_qa failed: {e}")
         return 0
 
 # ----------------- Arama -----------------
-@t_any(name="search")
-@debug_log(prefix="Search")
-def search(query: str, category: Optional[str], top_k: int = 6):
+def _milvus_hits(row) -> List[Dict]:
+    TEXT_F = getattr(settings, "milvus_text_field", "text")
+    hits = []
+    for h in row:
+        ent = h.entity or {}
+        hits.append({
+            "id": int(h.id),
+            "url": ent.get("url"),
+            "text": ent.get(TEXT_F),
+            "category": ent.get("category"),
+            "chunk_id": int(ent.get("chunk_id")),
+            "score": float(h.distance),
+        })
+    return hits
+
+def _dense_search_many(
+    queries: List[str],
+    categories: List[Optional[str]],
+    top_k: int,
+    with_text: bool = True,
+    ef: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    consistency: Optional[str] = None,
+    collection: Optional[str] = None,
+) -> List[List[Dict]]:
     """
     Hem HNSW hem IVF için doğru arama paramlarını kullanır.
     output_fields ENV’den gelen metin/başlık alanlarıyla eşleşir.
+    VECTOR_BACKEND=local ise Milvus'a gitmeden süreç içi NumPy indeksinde arar.
+    Sorgular kategori filtresine göre gruplanır; her grup için tek arama (nq > 1) yapılır.
+    with_text=False: Milvus'tan metin alanı istenmez (text=None); sonra hydrate_texts() ile doldurulur.
+    ef/nprobe/consistency: çağrı bazında MILVUS_SEARCH_EF / MILVUS_NPROBE / MILVUS_CONSISTENCY'yi ezer.
+    collection: canlı alias yerine belirli bir sürümde ara (rebuild smoke testi).
     """
     TEXT_F = getattr(settings, "milvus_text_field", "text")
     VEC_F  = getattr(settings, "milvus_vector_field", "embedding")
 
-    qv = embed_texts([query])[0]
-    col = _ensure_collection()
+    qvs = embed_queries(queries)
+
+    groups: Dict[Optional[str], List[int]] = {}
+    for i, cat in enumerate(categories):
+        groups.setdefault(cat, []).append(i)
+
+    out: List[List[Dict]] = [[] for _ in queries]
+
+    if settings.vector_backend == "local":
+        idx = local_index.get_index(collection)
+        for category, idxs in groups.items():
+            for i, hits in zip(idxs, idx.search_many([qvs[i] for i in idxs], category, top_k)):
+                out[i] = hits
+        return out
+
+    search_params = settings.milvus_search_params(ef=ef, nprobe=nprobe)
+    if "ef" in search_params["params"]:
+        # HNSW: ef < limit kabul edilmez
+        search_params["params"]["ef"] = max(search_params["params"]["ef"], int(top_k))
+    consistency = consistency or settings.milvus_consistency
+
+    def _run(col: Collection, data, category: Optional[str]):
+        expr, parts = None, None
+        if category and _partition_mode():
+            # Sadece ilgili partition taranır; partition yoksa filtreyle aynı sonuç: boş
+            part = _partition_name(category)
+            if part not in _MILVUS.partitions(col) and part not in _MILVUS.partitions(col, refresh=True):
+                return [[] for _ in data]
+            parts = [part]
+        elif category:
+            expr = f'category == "{category}"'
+        return col.search(
+            data=data,
+            anns_field=VEC_F,
+            param=search_params,
+            limit=top_k,
+            expr=expr,
+            partition_names=parts,
+            output_fields=out_fields,
+            consistency_level=consistency,
+        )
 
-    search_params = settings.milvus_search_params()
+    from_milvus = with_text and _milvus_stores_text()
+    out_fields = ["url", TEXT_F, "category", "chunk_id"] if from_milvus else ["url", "category", "chunk_id"]
+    for category, idxs in groups.items():
+        data = [qvs[i] for i in idxs]
+        res = _MILVUS.run(lambda col: _run(col, data, category), collection)
+        for i, row in zip(idxs, res):
+            out[i] = _milvus_hits(row)
+    if with_text and not from_milvus:
+        # Metin Milvus'ta tutulmuyor → tüm sonuçlar için yerel depodan tek geçişte çöz
+        hydrate_texts([h for hits in out for h in hits])
+    return out
+
+def _rrf_fuse(ranked_lists: List[List[Dict]], top_k: int, k: int) -> List[Dict]:
+    """
+    Reciprocal Rank Fusion: skor = Σ 1/(k + rank). Çıktıdaki 'score' en iyi olası RRF'ye
+    bölünerek 0..1 aralığına çekilir; dense/bm25 ham skorları ayrı alanlarda korunur.
+    """
+    fused: Dict[int, Dict] = {}
+    for hits in ranked_lists:
+        for rank, h in enumerate(hits, 1):
+            key = h.get("id")
+            if key is None:
+                key = _hash_row_id(h.get("url") or "", h.get("category") or "", int(h.get("chunk_id") or 0))
+            cur = fused.get(key)
+            if cur is None:
+                cur = dict(h)
+                cur["_rrf"] = 0.0
+                fused[key] = cur
+            cur["_rrf"] += 1.0 / (k + rank)
+            if cur.get("text") is None and h.get("text") is not None:
+                cur["text"] = h["text"]
+            if "bm25_score" in h:
+                cur["bm25_score"] = h["bm25_score"]
+            else:
+                cur["dense_score"] = h.get("score")
+    best = len(ranked_lists) / (k + 1.0)
+    out = sorted(fused.values(), key=lambda x: x["_rrf"], reverse=True)[:top_k]
+    for h in out:
+        h["score"] = h.pop("_rrf") / best
+    return out
+
+def score_metric() -> str:
+    """search() skorlarının yorumlanacağı metrik (hybrid/lexical modda skorlar benzerlik gibidir)."""
+    if getattr(settings, "search_mode", "dense") != "dense":
+        return "COSINE"
+    return settings.milvus_metric
+
+def _search_many(
+    queries: List[str],
+    categories: List[Optional[str]],
+    top_k: int,
+    with_text: bool = True,
+    **params,
+) -> List[List[Dict]]:
+    mode = getattr(settings, "search_mode", "dense")
+    if mode == "dense":
+        return _dense_search_many(queries, categories, top_k, with_text=with_text, **params)
+
+    lex = [bm25_index.search(q, c, top_k) for q, c in zip(queries, categories)]
+    if mode == "lexical":
+        return lex
 
-    expr = f'category == "{category}"' if category else None
+    try:
+        dense = _dense_search_many(queries, categories, top_k, with_text=with_text, **params)
+    except Exception as e:
+        if not any(lex):
+            raise
+        print(f"[warn] dense search unavailable, serving BM25 only: {e}")
+        return lex
+    rrf_k = int(getattr(settings, "rrf_k", 60))
+    return [_rrf_fuse([d, l], top_k, k=rrf_k) for d, l in zip(dense, lex)]
 
-    res = col.search(
-        data=[qv],
-        anns_field=VEC_F,
-        param=search_params,
-        limit=top_k,
-        expr=expr,
-        output_fields=["url", TEXT_F, "category", "chunk_id"],
-        consistency_level="Strong",
-    )
+@t_any(name="search")
+@debug_log(prefix="Search")
+def search(
+    query: str,
+    category: Optional[str],
+    top_k: int = 6,
+    with_text: bool = True,
+    ef: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    consistency: Optional[str] = None,
+):
+    """
+    SEARCH_MODE:
+      - dense   : sadece vektör arama (Milvus veya yerel NumPy)
+      - lexical : sadece BM25 (embedding çağrısı yok)
+      - hybrid  : BM25 + vektör sıraları RRF ile birleştirilir; vektör tarafı
+                  (embedding/Milvus) hata verirse BM25 sonuçları tek başına döner.
+    with_text=False: iki aşamalı arama — önce id/skor/url/kategori, metin yalnızca
+    elenmeyen sonuçlar için hydrate_texts() ile çekilir.
+    ef/nprobe/consistency: çağrı bazında Milvus arama ayarları (None → settings).
+    """
+    return _search_many([query], [category], top_k, with_text=with_text,
+                        ef=ef, nprobe=nprobe, consistency=consistency)[0]
+
+@t_any(name="search_many")
+def search_many(
+    queries: List[str],
+    categories: Union[None, str, List[Optional[str]]] = None,
+    top_k: int = 6,
+    with_text: bool = True,
+    ef: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    consistency: Optional[str] = None,
+) -> List[List[Dict]]:
+    """
+    Toplu arama: tüm sorgular tek toplu embedding isteğiyle vektörleştirilir, kategori
+    filtresine göre gruplanıp grup başına tek Milvus araması (nq > 1) yapılır.
+    categories: tek kategori (hepsi için), None veya sorgu başına liste.
+    Sonuçlar girdi sırasıyla döner. ef/nprobe/consistency search() ile aynı.
+    """
+    if not queries:
+        return []
+    if categories is None or isinstance(categories, str):
+        cats: List[Optional[str]] = [categories] * len(queries)
+    else:
+        cats = list(categories)
+        if len(cats) != len(queries):
+            raise ValueError("categories uzunluğu queries ile aynı olmalı")
+    return _search_many(list(queries), cats, top_k, with_text=with_text,
+                        ef=ef, nprobe=nprobe, consistency=consistency)
 
-    hits = []
-    for h in res[0]:
-        ent = h.entity or {}
-        hits.append({
-            "url": ent.get("url"),
-            "text": ent.get(TEXT_F),
-            "category": ent.get("category"),
-            "chunk_id": int(ent.get("chunk_id")),
-            "score": float(h.distance),
-        })
+def hydrate_texts(hits: List[Dict]) -> List[Dict]:
+    """
+    with_text=False aramalarından gelen (text=None) sonuçların metnini doldurur.
+    Sıra: mmap metin deposu (text_store; yerel indeksin metinleri yalnızca orada) → kalanlar için
+    tek Milvus query (id in [...]).
+    Sonuçlar yerinde güncellenir ve aynı liste döner.
+    """
+    need = [int(h["id"]) for h in hits if h.get("text") is None and h.get("id") is not None]
+    if not need:
+        return hits
+    texts: Dict[int, str] = {}
+    if _local_mirror():
+        texts.update(text_store.get_store().get_many(need))
+    missing = [rid for rid in need if rid not in texts]
+    if missing and settings.vector_backend != "local":
+        TEXT_F = getattr(settings, "milvus_text_field", "text")
+        try:
+            rows = _MILVUS.run(lambda col: col.query(
+                expr=f"id in {missing}",
+                output_fields=["id", TEXT_F],
+                consistency_level=settings.milvus_consistency,
+            ))
+            for r in rows:
+                texts[int(r["id"])] = r.get(TEXT_F) or ""
+        except Exception as e:
+            print(f"[warn] hydrate_texts failed: {e}")
+    for h in hits:
+        if h.get("text") is None:
+            h["text"] = texts.get(h.get("id"), "")
     return hits
 
+def attach_alt_urls(hits: List[Dict]) -> List[Dict]:
+    """
+    INGEST_DEDUP ile elenen yakın-kopyaların URL'lerini kanonik hit'e `alt_urls` olarak ekler
+    (aynı içerik başka sayfalarda da var → atıf o sayfalara da yapılabilir). Manifest yoksa dokunmaz.
+    """
+    db = getattr(settings, "ingest_manifest_db", None)
+    if not hits or not db or not os.path.exists(db):
+        return hits
+    ids = []
+    for h in hits:
+        rid = h.get("id")
+        if rid is None and h.get("url"):
+            rid = _hash_row_id(h.get("url") or "", h.get("category") or "", int(h.get("chunk_id") or 0))
+        ids.append(rid)
+    try:
+        alts = IngestManifest(collection_alias.physical_name()).alt_urls(r for r in ids if r is not None)
+    except Exception as e:
+        print(f"[warn] alt_urls lookup failed: {e}")
+        return hits
+    for h, rid in zip(hits, ids):
+        urls = [u for u in alts.get(rid, []) if u != h.get("url")]
+        if urls:
+            h["alt_urls"] = urls
+    return hits
+
+# ----------------- Partition göçü -----------------
+def migrate_to_partitions(name: Optional[str] = None, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Var olan (tek partition'lı, filtreyle aranan) koleksiyondaki satırları kategori
+    partition'larına taşır: _default'tan oku → cat_<kategori>'ye upsert → _default'tan sil.
+    Tekrar çalıştırılabilir; yarıda kalırsa kaldığı yerden devam eder (yazım ile silme arasında çökmede
+    satır hedefte zaten vardır; upsert onu yeniden yazar, aynı birincil anahtar iki kez oluşmaz).
+    """
+    TEXT_F = getattr(settings, "milvus_text_field", "text")
+    VEC_F  = getattr(settings, "milvus_vector_field", "embedding")
+    col = _ensure_collection(name)
+    fields = ["id", "category", "url", "chunk_id", TEXT_F, VEC_F]
+    moved: Dict[str, int] = {}
+
+    it = col.query_iterator(
+        batch_size=batch_size,
+        output_fields=fields,
+        partition_names=["_default"],
+    )
+    try:
+        while True:
+            rows = it.next()
+            if not rows:
+                break
+            groups: Dict[str, List[Dict]] = {}
+            for r in rows:
+                groups.setdefault(_partition_name(r.get("category")), []).append(r)
+            _MILVUS.ensure_partitions(col, groups.keys())
+            for part, grp in groups.items():
+                col.upsert([[r[f] for r in grp] for f in fields], partition_name=part)
+                moved[part] = moved.get(part, 0) + len(grp)
+            ids = [int(r["id"]) for r in rows]
+            for i in range(0, len(ids), 2000):
+                col.delete(f"id in {ids[i : i + 2000]}", partition_name="_default")
+            print(f"[MIGRATE] moved {sum(moved.values())} rows")
+    finally:
+        it.close()
+    col.flush()
+    return {"total_rows": sum(moved.values()), **moved}
+
+# ----------------- Blue/green sürümler -----------------
+_REBUILD_SMOKE_FILE = getattr(settings, "rebuild_smoke_file", "./data/eval_dataset.jsonl")
+_REBUILD_SMOKE_N = int(getattr(settings, "rebuild_smoke_n", 20))
+_REBUILD_MAX_RECALL_DROP = float(getattr(settings, "rebuild_max_recall_drop", 0.1))
+
+def _smoke_queries(path: Optional[str], n: int) -> List[Tuple[str, Optional[str]]]:
+    """(soru, beklenen_url) çiftleri; eval veri kümesi şeması (question/query, url)."""
+    if not path or not os.path.exists(path) or n <= 0:
+        return []
+    out: List[Tuple[str, Optional[str]]] = []
+    for rec in _iter_json_records(path):
+        q = (rec.get("question") or rec.get("query") or "").strip()
+        if q:
+            out.append((q, (rec.get("url") or "").strip() or None))
+        if len(out) >= n:
+            break
+    return out
+
+def _smoke_check(
+    version: str,
+    live: Optional[str],
+    queries: List[Tuple[str, Optional[str]]],
+    max_drop: float,
+    top_k: int = 5,
+) -> Dict[str, object]:
+    """
+    Yeni sürümde: her sorgu sonuç döndürmeli; beklenen URL'si olan sorgularda URL isabet oranı
+    canlı sürümünkinden max_drop'tan fazla düşmemeli.
+    """
+    qs = [q for q, _ in queries]
+    cats: List[Optional[str]] = [None] * len(qs)
+
+    def _hit_rate(results: List[List[Dict]]) -> Optional[float]:
+        pairs = [(u, hits) for (_, u), hits in zip(queries, results) if u]
+        if not pairs:
+            return None
+        return sum(1 for u, hits in pairs if any(h.get("url") == u for h in hits)) / len(pairs)
+
+    new = _dense_search_many(qs, cats, top_k, with_text=False, collection=version) if qs else []
+    report: Dict[str, object] = {
+        "queries": len(qs),
+        "empty": sum(1 for hits in new if not hits),
+        "url_hit": _hit_rate(new),
+    }
+    ok = report["empty"] == 0
+    if live and qs:
+        old = _dense_search_many(qs, cats, top_k, with_text=False, collection=live)
+        report["live_url_hit"] = _hit_rate(old)
+        if report["url_hit"] is not None and report["live_url_hit"] is not None:
+            ok = ok and report["url_hit"] >= report["live_url_hit"] - max_drop
+    report["ok"] = bool(ok)
+    return report
+
+def _copy_history_rows(src: str, dst: str, batch_size: int = 1000) -> int:
+    """Canlı sürümdeki konuşma hafızası (category == "history") satırlarını yeni sürüme taşı."""
+    if settings.vector_backend == "local":
+        old = local_index.get_index(src)
+        rows = old.rows_for_category("history")
+        if not rows.size:
+            return 0
+        new = local_index.get_index(dst, writable=True)
+        ids = [int(old.ids[i]) for i in rows]
+        new.upsert(
+            ids, ["history"] * len(rows), [old.urls[i] for i in rows],
+            [int(old.chunk_ids[i]) for i in rows], old.texts_for(ids), old.vectors[rows],
+        )
+        new.save()
+        return int(rows.size)
+
+    TEXT_F = getattr(settings, "milvus_text_field", "text")
+    VEC_F  = getattr(settings, "milvus_vector_field", "embedding")
+    fields = ["id", "category", "url", "chunk_id", TEXT_F, VEC_F]
+    it = _ensure_collection(src).query_iterator(
+        batch_size=batch_size, expr='category == "history"', output_fields=fields,
+    )
+    n = 0
+    try:
+        while True:
+            rows = it.next()
+            if not rows:
+                break
+            _WRITER.upsert(*[[r[f] for r in rows] for f in fields], name=dst)
+            n += len(rows)
+    finally:
+        it.close()
+    _WRITER.seal(dst)
+    return n
+
+def _point_alias(alias: str, version: str) -> None:
+    """Milvus alias'ını sürüme çevir (sunucu tarafında atomik); sürüm yüklü olmalı."""
+    _ensure_collection(version)
+    try:
+        utility.alter_alias(collection_name=version, alias=alias, using=_MILVUS_CONN)
+    except Exception:
+        # Alias henüz yok (ilk rebuild)
+        utility.create_alias(collection_name=version, alias=alias, using=_MILVUS_CONN)
+    _MILVUS.invalidate()
+
+def _drop_version(alias: str, version: str) -> None:
+    if not version.startswith(f"{alias}_v"):
+        return
+    if settings.vector_backend != "local":
+        try:
+            utility.drop_collection(version, using=_MILVUS_CONN)
+        except Exception as e:
+            print(f"[warn] drop_collection {version} failed: {e}")
+    if getattr(settings, "local_index_dir", None):
+        shutil.rmtree(local_index.index_path(version), ignore_errors=True)
+    IngestManifest(version).clear()
+
+def rebuild_collection(
+    path: str,
+    smoke_file: Optional[str] = None,
+    smoke_n: Optional[int] = None,
+    max_drop: Optional[float] = None,
+    keep: Optional[int] = None,
+    swap: bool = True,
+) -> Dict[str, object]:
+    """
+    Blue/green yeniden kurulum (MILVUS_ALIAS gerekli):
+      1) <alias>_v<zaman> koleksiyonuna tam ingest (şema + index + load; embedding deposu sayesinde ucuz)
+      2) canlı sürümdeki konuşma hafızası satırlarını kopyala, index kurulumunun bitmesini bekle
+      3) smoke sorguları (REBUILD_SMOKE_FILE'ın ilk REBUILD_SMOKE_N sorusu); başarısızsa alias'a dokunulmaz
+      4) alias'ı yeni sürüme çevir, etkin sürümü MILVUS_ALIAS_STATE'e yaz, yanıt önbelleklerini geçersiz kıl
+      5) en yeni `keep` (MILVUS_KEEP_VERSIONS) eski sürüm geri dönüş için tutulur, daha eskileri silinir
+    Canlı trafik bu sırada eski sürümden okur; yazımlar ve flush/compaction yeni koleksiyonu etkiler.
+    """
+    alias = collection_alias.alias_name()
+    if not alias:
+        raise RuntimeError("MILVUS_ALIAS is not set; blue/green rebuild needs an alias to serve from")
+    if alias == settings.milvus_collection:
+        raise RuntimeError("MILVUS_ALIAS must differ from MILVUS_COLLECTION (Milvus forbids an alias named like a collection)")
+    keep = int(settings.milvus_keep_versions if keep is None else keep)
+    smoke_file = _REBUILD_SMOKE_FILE if smoke_file is None else smoke_file
+    smoke_n = _REBUILD_SMOKE_N if smoke_n is None else int(smoke_n)
+    max_drop = _REBUILD_MAX_RECALL_DROP if max_drop is None else float(max_drop)
+    st = collection_alias.state(alias)
+    live = st["current"]
+    version = collection_alias.new_version_name(alias)
+
+    print(f"[rebuild] ingesting {path} into {version} (live: {live or '-'})")
+    stats = ingest_from_json(path, full=True, collection=version)
+    history = _copy_history_rows(live, version) if live else 0
+    if settings.vector_backend != "local":
+        try:
+            utility.wait_for_index_building_complete(version, using=_MILVUS_CONN)
+        except Exception as e:
+            print(f"[warn] wait_for_index_building_complete: {e}")
+        _MILVUS.run(lambda col: col.load(), version)
+
+    smoke = _smoke_check(version, live, _smoke_queries(smoke_file, smoke_n), max_drop)
+    smoke["ok"] = bool(smoke["ok"]) and stats.get("total_chunks", 0) > 0
+    out: Dict[str, object] = {
+        "alias": alias, "version": version, "previous": live, "ingest": stats,
+        "history_rows": history, "smoke": smoke, "swapped": False, "dropped": [],
+    }
+    if not smoke["ok"] or not swap:
+        print(f"[rebuild] {version} not promoted (smoke ok={smoke['ok']}, swap={swap}); live stays {live or '-'}")
+        return out
+
+    if settings.vector_backend != "local":
+        _point_alias(alias, version)
+    previous = ([live] if live else []) + [v for v in st["previous"] if v not in (live, version)]
+    dropped = previous[keep:]
+    collection_alias.record_switch(version, previous[:keep], alias)
+    bump_corpus_stamp()
+    for v in dropped:
+        _drop_version(alias, v)
+    out.update(swapped=True, dropped=dropped)
+    print(f"[rebuild] alias {alias} → {version}")
+    return out
+
+def rollback_collection() -> Dict[str, object]:
+    """Alias'ı bir önceki sürüme geri çevir; şimdiki sürüm 'previous' listesinin başına geçer (ileri dönülebilir)."""
+    alias = collection_alias.alias_name()
+    if not alias:
+        raise RuntimeError("MILVUS_ALIAS is not set")
+    st = collection_alias.state(alias)
+    if not st["previous"]:
+        raise RuntimeError(f"no previous version to roll back to for alias '{alias}'")
+    target, current = st["previous"][0], st["current"]
+    if settings.vector_backend != "local":
+        _point_alias(alias, target)
+    collection_alias.record_switch(target, ([current] if current else []) + st["previous"][1:], alias)
+    bump_corpus_stamp()
+    print(f"[rollback] alias {alias} → {target} (was {current})")
+    return {"alias": alias, "current": target, "previous": current}
+
 # ----------------- CLI -----------------
 if __name__ == "__main__":
     import argparse
@@ -585,13 +1878,33 @@ if __name__ == "__main__":
     ap.add_argument("--file", type=str, help="JSON/JSONL (content_text/content_html/text/chunks)", required=False)
     ap.add_argument("--query", type=str, help="Hızlı arama sorgusu (test için)", required=False)
     ap.add_argument("--category", type=str, help="Arama kategorisi (billing/roaming/package/coverage/app)", required=False)
+    ap.add_argument("--full", action="store_true", help="Manifest'i yok say, tüm chunk'ları yeniden embed et")
+    ap.add_argument("--resume", action="store_true", help="Yarım kalan ingest işine son kontrol noktasından devam et")
+    ap.add_argument("--plan", action="store_true",
+                    help="--file için dry-run: chunk/token/API çağrısı/süre tahmini (OpenAI/Milvus'a gitmez)")
+    ap.add_argument("--rebuild", action="store_true",
+                    help="--file'ı yeni bir koleksiyon sürümüne ingest et, smoke testten geçerse MILVUS_ALIAS'ı çevir")
+    ap.add_argument("--rollback", action="store_true", help="MILVUS_ALIAS'ı bir önceki sürüme geri çevir")
     ap.add_argument("--check-milvus", action="store_true", help="Koleksiyonda kaç kayıt var, örnek satırları göster")
+    ap.add_argument("--migrate-partitions", action="store_true",
+                    help="Var olan koleksiyonu kategori partition'larına taşı (MILVUS_PARTITION_MODE=partition için)")
     args = ap.parse_args()
 
     # 1) İçerik ingestion
-    if args.file:
-        stats = ingest_from_json(args.file)
-        print("[INGEST CONTENT DONE]" if stats.get("total_chunks", 0) > 0 else "[NO CONTENT FOUND]", stats)
+    if args.rollback:
+        print("[ROLLBACK DONE]", rollback_collection())
+    if args.file and args.rebuild:
+        print("[REBUILD DONE]", json.dumps(rebuild_collection(args.file), ensure_ascii=False, default=str))
+    elif args.file and args.plan:
+        print(format_ingest_plan(plan_ingest(args.file, full=args.full)))
+    elif args.file:
+        stats = ingest_from_json(args.file, full=args.full, resume=args.resume)
+        if stats.get("total_chunks", 0) > 0 or stats.get("deleted_chunks", 0) > 0:
+            print("[INGEST CONTENT DONE]", stats)
+        elif stats.get("unchanged_pages", 0) > 0:
+            print("[NO CHANGES]", stats)
+        else:
+            print("[NO CONTENT FOUND]", stats)
 
     # 2) Hızlı arama
     if args.query:
@@ -599,7 +1912,11 @@ if __name__ == "__main__":
         for i, h in enumerate(out, 1):
             print(f"[{i}] {h['score']:.4f} | {h['category']} | {h['url']}\n{h['text'][:220]}\n")
 
-    # 3) Milvus kontrol
+    # 3) Partition göçü
+    if args.migrate_partitions:
+        print("[MIGRATE DONE]", migrate_to_partitions())
+
+    # 4) Milvus kontrol
     if args.check_milvus:
         col = _ensure_collection()
         print("num_entities:", col.num_entities)
@@ -3,15 +3,18 @@ from __future__ import annotations
 import json
 import os
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Literal, Optional, Tuple, Dict
 
 from openai import OpenAI
 from pydantic import BaseModel
 
 from .config import settings
-from .project_pipeline import search, route_category_from_text
+from .project_pipeline import search, route_category_from_text, score_metric, embed_query, hydrate_texts, attach_alt_urls
 from . import history as hist
+from . import category_router
 from .debug_logger import debug_log
+from .answer_cache import ANSWER_CACHE
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Helpers
@@ -164,6 +167,7 @@ class GenOut(BaseModel):
     tool: Literal["billing", "roaming", "package", "coverage", "app", "other"]
     intent: Literal["billing", "roaming", "package", "coverage", "app", "other"]
     sentiment: Literal["negative", "neutral", "positive"]
+    cached: bool = False  # semantik yanıt önbelleğinden mi geldi
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Router & yardımcılar
@@ -206,12 +210,13 @@ def _keyword_route(q: str) -> Optional[str]:
 # Intent sınıflandırması
 @debug_log(prefix="Classifier")
 @traceable(name="classify")
-def classify(query: str) -> Tuple[str, str]:
+def classify(query: str, route_hint: Optional[str] = None) -> Tuple[str, str]:
     # hızlı yol (ucuz) + basit sentiment kuralları
+    # route_hint: anahtar kelime kaçırdığında sorgu vektöründen gelen kategori (CATEGORY_ROUTER) → LLM çağrısı yok
     neg_terms = ["şikayet","sikayet","yüksek geldi","yuksek geldi","haksız","sorun","çalışmıyor","calismiyor","iptal etmek istiyorum","memnun değilim"]
     pos_terms = ["teşekkür","tesekkur","harika","çalıştı","calisti","super","süper","super"]
 
-    kw = _keyword_route(query)
+    kw = _keyword_route(query) or route_hint
     ql = _tr_lower(query)
 
     if any(t in ql for t in neg_terms):
@@ -246,47 +251,120 @@ def classify(query: str) -> Tuple[str, str]:
         return _keyword_route(query) or "other", "neutral"
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Ana RAG
-@debug_log(prefix="RAG")
-@traceable(name="ask")
-def ask(query: str, force_tool: Optional[str] = None, session_id: Optional[str] = None) -> GenOut:
-    print("\n=== RAG Pipeline Debug ===")
-    print(f"Input query: {query}")
-    print(f"Force tool: {force_tool}")
-    print(f"Session ID: {session_id}")
+# ask() aşamaları için eşzamanlılık
+ASK_PARALLEL = bool(getattr(settings, "ask_parallel", True))
+_ASK_POOL = ThreadPoolExecutor(
+    max_workers=int(getattr(settings, "ask_workers", 16) or 16),
+    thread_name_prefix="ask",
+)
+
+def _submit(fn, *args, **kwargs) -> Future:
+    """ASK_PARALLEL açıksa havuzda çalıştır; kapalıysa aynı arayüzle hemen (sıralı) çalıştır."""
+    if ASK_PARALLEL:
+        return _ASK_POOL.submit(fn, *args, **kwargs)
+    fut: Future = Future()
+    try:
+        fut.set_result(fn(*args, **kwargs))
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
 
-    # 0) Eski oturumları temizle (best-effort)
+def _purge_old_sessions() -> None:
+    """Eski oturumları temizle (best-effort)."""
     try:
         hist_ttl = int(getattr(settings, "session_ttl_days", 7))
         hist.purge_old(hist_ttl)
     except Exception as e:
         print(f"Warning - Could not purge old sessions: {str(e)}")
 
-    # 1) Güvenlik kontrolü (Guardrails varsa önce o; yoksa TR kaba filtre) — SOFT-FAIL
-    refused = False
-    refusal_msg = "Üzgünüm, uygunsuz veya hakaret içeren taleplere yanıt veremem."
-    guard_notes = ""
-
+def _input_guard(query: str) -> bool:
+    """
+    Güvenlik kontrolü (Guardrails varsa önce o; yoksa TR kaba filtre) — SOFT-FAIL.
+    Reddedilmesi gerekiyorsa True döner.
+    """
     if _HAS_GUARDS and INPUT_GUARD is not None:
         try:
             r = INPUT_GUARD.validate(query)
             if not r.validation_passed:
                 guard_notes = str(getattr(r, "validated_output", "")) or "Input guard flagged."
                 print(f"[GUARD][INPUT] flagged: {guard_notes}")
-                if not GUARD_SOFT_FAIL:
-                    refused = True
+                return not GUARD_SOFT_FAIL
         except Exception as e:
             print(f"[GUARD][INPUT] error: {e}")
-    else:
-        ql = query.lower()
-        if any(w in ql for w in HARASSMENT_TR):
-            guard_notes = "Local harassment keyword match."
-            print(f"[GUARD][INPUT] flagged: {guard_notes}")
-            if not GUARD_SOFT_FAIL:
-                refused = True
+        return False
+    ql = query.lower()
+    if any(w in ql for w in HARASSMENT_TR):
+        print("[GUARD][INPUT] flagged: Local harassment keyword match.")
+        return not GUARD_SOFT_FAIL
+    return False
+
+def _vector_route(query: str, qvec: Optional[Future]) -> Optional[str]:
+    """Anahtar kelime kaçırdıysa sorgu embedding'inden (zaten hesaplanıyor) kategori; kapalı/kararsızsa None."""
+    if qvec is None or getattr(settings, "category_router", "off") == "off" or _keyword_route(query):
+        return None
+    try:
+        tool = category_router.route(qvec.result())
+    except Exception as e:
+        print(f"[warn] category router failed: {e}")
+        return None
+    print(f"[router] {settings.category_router}: {tool}")
+    return tool
+
+def _classify_safe(query: str, qvec: Optional[Future] = None) -> Tuple[str, str]:
+    try:
+        return classify(query, route_hint=_vector_route(query, qvec))
+    except Exception as e:
+        print(f"Error in classification: {str(e)}")
+        return "other", "neutral"
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Ana RAG
+@debug_log(prefix="RAG")
+@traceable(name="ask")
+def ask(query: str, force_tool: Optional[str] = None, session_id: Optional[str] = None) -> GenOut:
+    print("\n=== RAG Pipeline Debug ===")
+    print(f"Input query: {query}")
+    print(f"Force tool: {force_tool}")
+    print(f"Session ID: {session_id}")
+
+    history_enabled = bool(getattr(settings, "history_enabled", True))
+    history_max_turns = int(getattr(settings, "history_max_turns", 4))
+    max_docs = int(getattr(settings, "max_context_docs", 6) or 6)
+    initial_k = max(2 * max_docs, 12)
+    # LAZY_TEXT_FETCH: aramada metin taşınmaz; sadece bağlama girecek sonuçlar için çekilir
+    lazy_text = bool(getattr(settings, "lazy_text_fetch", False))
+
+    # Tool seçimi için ucuz (yerel) sinyaller: classifier beklenmeden arama başlatılabilsin
+    kw_tool = _keyword_route(query)
+    route_tool = route_category_from_text(query)
+    early_tool: Optional[str] = force_tool or kw_tool or route_tool
+
+    # 0-6) Birbirinden bağımsız aşamalar eşzamanlı: purge, guard, classify, arama (veya
+    #      sadece sorgu embedding'i), geçmiş okuma. Üretimden önce birleştirilir.
+    jobs: Dict[str, Future] = {}
+    jobs["purge"] = _submit(_purge_old_sessions)
+    jobs["guard"] = _submit(_input_guard, query)
+    if early_tool is None or ANSWER_CACHE.enabled:
+        # Sorgu embedding'i: yanıt önbelleği araması için; kategori classifier'a bağlıysa
+        # arama da sonradan önbellekten okur (eşzamanlı çağrılar tek isteği paylaşır)
+        jobs["embed"] = _submit(embed_query, query)
+    # Kategori sinyali yoksa classifier önce aynı sorgu vektörüyle merkez yönlendirmesini dener (CATEGORY_ROUTER)
+    jobs["classify"] = _submit(_classify_safe, query, jobs.get("embed") if early_tool is None else None)
+    if early_tool is not None:
+        print(f"Searching with initial_k={initial_k} (category={early_tool})")
+        jobs["search"] = _submit(search, query, early_tool, initial_k, with_text=not lazy_text)
+    if history_enabled and session_id:
+        jobs["history"] = _submit(hist.get_last_turns, session_id, 2 * history_max_turns)
+
+    # 1) Güvenlik kontrolü — red varsa kalan işleri iptal et ve erken dön
+    refused = jobs["guard"].result()
+    refusal_msg = "Üzgünüm, uygunsuz veya hakaret içeren taleplere yanıt veremem."
 
     if refused:
-        if bool(getattr(settings, "history_enabled", True)) and session_id:
+        for name, fut in jobs.items():
+            if name != "purge":
+                fut.cancel()
+        if history_enabled and session_id:
             try:
                 hist.add_user_message(session_id, query, intent="other", sentiment="negative")
                 hist.add_assistant_message(session_id, refusal_msg, tool="other", intent="other",
@@ -297,85 +375,114 @@ def ask(query: str, force_tool: Optional[str] = None, session_id: Optional[str]
 
     # 2) Classify & store
     print("\n=== Classification Step ===")
-    try:
-        intent, sentiment = classify(query)
-        print(f"Classified intent: {intent}")
-        print(f"Classified sentiment: {sentiment}")
-        history_enabled = bool(getattr(settings, "history_enabled", True))
-        if history_enabled and session_id:
-            try:
-                hist.add_user_message(session_id, query, intent=intent, sentiment=sentiment)
-            except Exception as e:
-                print(f"Warning - Could not add user message to history: {str(e)}")
-    except Exception as e:
-        print(f"Error in classification: {str(e)}")
-        intent, sentiment = "other", "neutral"
+    intent, sentiment = jobs["classify"].result()
+    print(f"Classified intent: {intent}")
+    print(f"Classified sentiment: {sentiment}")
+    # Önceki turlar bu turun kullanıcı mesajı yazılmadan ÖNCE okunmuş olmalı (okuma eşzamanlı başladı;
+    # yazımdan sonra tamamlanırsa soru geçmişte ve aşağıda iki kez görünür, yanıt önbelleği de kapanır)
+    prior_history: List[Dict] = []
+    if "history" in jobs:
+        try:
+            prior_history = list(jobs["history"].result())
+        except Exception:
+            prior_history = []
+    user_logged = False
+    if history_enabled and session_id:
+        try:
+            hist.add_user_message(session_id, query, intent=intent, sentiment=sentiment)
+            user_logged = True
+        except Exception as e:
+            print(f"Warning - Could not add user message to history: {str(e)}")
 
-    # 3) Tool seçimi (classifier → keyword → route fallback)
+    # 3) Tool seçimi (force → keyword → route → classifier)
     print("\n=== Tool Selection & Search ===")
-    kw_tool = _keyword_route(query)
-    route_tool = route_category_from_text(query)
     print(f"Keyword-based tool: {kw_tool}")
     print(f"Route-based tool: {route_tool}")
 
-    chosen: Optional[str] = (
-    force_tool
-    or kw_tool
-    or route_tool
-    or (intent if intent in VALID_TOOLS else None)
-)
+    chosen: Optional[str] = early_tool or (intent if intent in VALID_TOOLS else None)
     print(f"Final chosen tool: {chosen}")
 
-    max_docs = int(getattr(settings, "max_context_docs", 6) or 6)
-    initial_k = max(2 * max_docs, 12)
-    print(f"Searching with initial_k={initial_k}")
-
-    # 4) Arama
-    try:
-        hits = search(query, category=chosen, top_k=initial_k)
-        print(f"Found {len(hits)} initial hits")
-    except Exception as e:
-        print(f"Error in search: {str(e)}")
-        raise
+    # 3b) Semantik yanıt önbelleği — sadece önceki konuşma bağlamı yokken (yanıt geçmişe bağlı değilse)
+    outs: Optional[GenOut] = None
+    cache_vec: Optional[List[float]] = None
+    use_answer_cache = ANSWER_CACHE.enabled and not prior_history
+    if use_answer_cache:
+        try:
+            cache_vec = jobs["embed"].result()
+            cache_hit = ANSWER_CACHE.lookup(cache_vec, chosen)
+        except Exception as e:
+            print(f"Warning - Answer cache lookup failed: {str(e)}")
+            cache_hit = None
+        if cache_hit is not None:
+            payload, sim = cache_hit
+            print(f"[CACHE] semantic answer hit (sim={sim:.3f}, tool={chosen})")
+            payload["intent"] = intent if intent in VALID_TOOLS.union({"other"}) else payload.get("intent", "other")
+            payload["sentiment"] = sentiment
+            payload["cached"] = True
+            outs = GenOut(**payload)
+            if "search" in jobs:
+                jobs["search"].cancel()
+
+    # 4) Arama (önbellekten yanıt geldiyse atlanır)
+    hits: List[Dict] = []
+    if outs is None:
+        try:
+            if "search" in jobs:
+                hits = jobs["search"].result()
+            else:
+                try:
+                    jobs["embed"].result()
+                except Exception as e:
+                    print(f"Warning - Query embedding prefetch failed: {str(e)}")
+                print(f"Searching with initial_k={initial_k}")
+                hits = search(query, category=chosen, top_k=initial_k, with_text=not lazy_text)
+            print(f"Found {len(hits)} initial hits")
+        except Exception as e:
+            print(f"Error in search: {str(e)}")
+            raise
 
-    # 5) Heuristik re-rank + normalize + threshold
+    # 5) Heuristik re-rank + normalize + threshold (lazy modda metin yok → bonus sadece URL'den)
     hits = _heuristic_boost(hits, query)
     score_thr = float(getattr(settings, "score_threshold", 0.20) or 0.0)
     use_hits = _normalize_and_filter_scores(
         hits=hits,
-        metric=getattr(settings, "milvus_metric", "COSINE"),
+        metric=score_metric(),
         keep_top=max_docs,
         threshold=score_thr,
     )
-
-    # 6) Geçmiş özeti
-    history_msgs = []
-    history_enabled = bool(getattr(settings, "history_enabled", True))
-    history_max_turns = int(getattr(settings, "history_max_turns", 4))
-    if history_enabled and session_id:
-        try:
-            history_msgs = hist.get_last_turns(session_id, limit_msgs=2 * history_max_turns)
-        except Exception:
-            history_msgs = []
+    if lazy_text and use_hits:
+        hydrate_texts(use_hits)
+    # Yakın-kopya elemesinde yazılmayan sayfaların URL'leri (aynı metin) → atıf için context'e girer
+    attach_alt_urls(use_hits)
+
+    # 6) Geçmiş özeti (eşzamanlı okunduğu için bu turun kullanıcı mesajı sona eklenir)
+    history_msgs = list(prior_history)
+    if "history" in jobs:
+        if user_logged:
+            history_msgs.append({"role": "user", "content": query})
+            history_msgs = history_msgs[-2 * history_max_turns:]
     hist_str = "\n".join(f"{m['role'].upper()}: {_truncate(m['content'], 400)}" for m in history_msgs)
     hist_str = _truncate(hist_str, 1500) if hist_str else ""
 
     # 7) Context
-    context_blocks, seen_urls = [], []
+    context_blocks, seen_urls, alt_seen = [], [], []
     for h in use_hits:
         url = (h.get("url") or "").strip()
         txt = (h.get("text") or "").strip()
         if url:
             seen_urls.append(url)
+            alts = (h.get("alt_urls") or [])[:3]
+            alt_seen.extend(alts)
+            alt_line = f"\nAYNI İÇERİK: {', '.join(alts)}" if alts else ""
             context_blocks.append(
-                f"[Kategori: {h.get('category', 'unknown')} | Benzerlik≈{h.get('_norm', 0.0):.2f}] URL: {url}\nTEXT: {_truncate(txt, 1400)}"
+                f"[Kategori: {h.get('category', 'unknown')} | Benzerlik≈{h.get('_norm', 0.0):.2f}] URL: {url}{alt_line}\nTEXT: {_truncate(txt, 1400)}"
             )
-    citations = _dedup(seen_urls)
+    citations = _dedup(seen_urls + alt_seen)
     context_str = "\n\n---\n\n".join(context_blocks) if context_blocks else "(no context)"
 
     # 8) Üretim (Guardrails STRUCT_GUARD → yoksa JSON fallback + retry + rules)
     model = getattr(settings, "openai_chat_model", "gpt-4o-mini")
-    outs: Optional[GenOut] = None
+    fallback_used = False
 
     # Context'i güvenli boyuta indir: ilk 4 blok
     MAX_BLOCKS = 4
@@ -483,7 +590,7 @@ def ask(query: str, force_tool: Optional[str] = None, session_id: Optional[str]
         )
 
     # Guardrails yolu (varsa)
-    if _HAS_GUARDS and STRUCT_GUARD is not None and SafeGenOut is not None:
+    if outs is None and _HAS_GUARDS and STRUCT_GUARD is not None and SafeGenOut is not None:
         try:
             sys = (
                 "You are Diyoloji. Yanıtını **yalnızca Türkçe** ver.\n"
@@ -546,6 +653,7 @@ def ask(query: str, force_tool: Optional[str] = None, session_id: Optional[str]
             except Exception as e2:
                 print(f"[GEN][json_retry] error: {e2}")
                 outs = _rules_fallback_answer(query, use_hits, small_citations,chosen)
+                fallback_used = True
 
         if outs is None and isinstance(obj, dict):
             # defaults
@@ -564,6 +672,11 @@ def ask(query: str, force_tool: Optional[str] = None, session_id: Optional[str]
             except Exception as e3:
                 print(f"[GEN][construct] error: {e3}")
                 outs = _rules_fallback_answer(query, use_hits, small_citations, chosen)
+                fallback_used = True
+
+    # 8b) Yeni üretilen (kural tabanlı olmayan) yanıtı semantik önbelleğe koy
+    if use_answer_cache and cache_vec is not None and not outs.cached and not fallback_used:
+        ANSWER_CACHE.store(cache_vec, chosen, outs.model_dump(exclude={"cached"}))
 
     # 9) Geçmişe yaz (sadece SQLite history; indekse upsert KALDIRILDI)
     history_enabled = bool(getattr(settings, "history_enabled", True))
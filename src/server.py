@@ -34,7 +34,7 @@ from openai import OpenAI
 
 from .rag import ask as rag_ask
 from . import history as hist
-from .project_pipeline import ingest_from_json
+from .project_pipeline import ingest_from_json, plan_ingest, format_ingest_plan, rebuild_collection, rollback_collection
 from .config import settings
 
 from .config import settings as _cfg
@@ -42,6 +42,15 @@ from . import history as hist
 if getattr(_cfg, "history_enabled", True):
     hist.init_db()
 
+# Snapshot'tan soğuk başlangıç: indeksi ilk istekten önce mmap'le (manifest/model uyumsuzsa burada patlar)
+if _cfg.vector_backend == "local" and getattr(_cfg, "snapshot_path", ""):
+    import time as _time
+    from . import local_index as _local_index
+
+    _t0 = _time.perf_counter()
+    _n = len(_local_index.get_index())
+    print(f"[snapshot] {_cfg.snapshot_path}: {_n} rows mapped in {1000 * (_time.perf_counter() - _t0):.1f} ms")
+
 app = FastAPI(title="Diyoloji API")
 
 # Yerel/önyüz denemeleri için CORS (prod'da domain kısıtla)
@@ -91,6 +100,7 @@ def chat(req: ChatReq):
             "tool": out.tool,
             "intent": out.intent,
             "sentiment": out.sentiment,
+            "cached": out.cached,
         }
     except ValueError as ve:
         error_trace = traceback.format_exc()
@@ -194,7 +204,7 @@ def ui():
             body: JSON.stringify({ text, session_id: sid })
           });
           const data = await res.json();
-          const meta = `(tool=${data.tool} | intent=${data.intent} | sentiment=${data.sentiment})`;
+          const meta = `(tool=${data.tool} | intent=${data.intent} | sentiment=${data.sentiment}${data.cached ? " | cache" : ""})`;
           const node = add("assistant", data.answer || "(boş yanıt)", meta);
           addCitations(node, data.citations || []);
         } catch (err) {
@@ -212,10 +222,31 @@ def _cmd_ingest(args: argparse.Namespace) -> int:
     if not args.file:
         print("Hata: --file gerekli (JSON/JSONL).")
         return 2
-    stats = ingest_from_json(args.file)
+    if args.plan:
+        print(format_ingest_plan(plan_ingest(args.file, full=args.full)))
+        return 0
+    stats = ingest_from_json(args.file, full=args.full, resume=args.resume)
     print("Ingest tamam:", stats)
     return 0
 
+def _cmd_rebuild(args: argparse.Namespace) -> int:
+    import json as _json
+    out = rebuild_collection(
+        args.file,
+        smoke_file=args.smoke,
+        smoke_n=args.smoke_n,
+        max_drop=args.max_drop,
+        keep=args.keep,
+        swap=not args.no_swap,
+    )
+    print(_json.dumps(out, ensure_ascii=False, indent=2, default=str))
+    return 0 if out["swapped"] or (args.no_swap and out["smoke"]["ok"]) else 1
+
+def _cmd_rollback(args: argparse.Namespace) -> int:
+    out = rollback_collection()
+    print(f"Alias {out['alias']} → {out['current']} (önceki: {out['previous']})")
+    return 0
+
 def _cmd_ask(args: argparse.Namespace) -> int:
     sid: str = args.session or str(uuid4())
     out = rag_ask(args.query, force_tool=args.tool, session_id=sid)
@@ -228,11 +259,12 @@ def _cmd_ask(args: argparse.Namespace) -> int:
             "tool": out.tool,
             "intent": out.intent,
             "sentiment": out.sentiment,
+            "cached": out.cached,
         }, ensure_ascii=False, indent=2))
     else:
         print("\nCEVAP:\n", out.answer)
         print("\nKAYNAKLAR:", *out.citations, sep="\n - ")
-        print(f"\n(tool={out.tool} | intent={out.intent} | sentiment={out.sentiment} | session_id={sid})")
+        print(f"\n(tool={out.tool} | intent={out.intent} | sentiment={out.sentiment} | cached={out.cached} | session_id={sid})")
     return 0
 
 def _cmd_history(args: argparse.Namespace) -> int:
@@ -292,8 +324,25 @@ def main() -> int:
     # ingest (JSON/JSONL)
     sp = sub.add_parser("ingest", help="JSON/JSONL → chunk/embed → Milvus'a yaz")
     sp.add_argument("--file", type=str, required=True, help="JSON/JSONL dosya veya klasör")
+    sp.add_argument("--full", action="store_true", help="Manifest'i yok say, tüm chunk'ları yeniden embed et")
+    sp.add_argument("--plan", action="store_true", help="Dry-run: chunk/token/API çağrısı/süre tahmini, hiçbir şey yazmaz")
+    sp.add_argument("--resume", action="store_true", help="Bu girdinin yarım kalan işine son kontrol noktasından devam et")
     sp.set_defaults(func=_cmd_ingest)
 
+    # rebuild (blue/green, MILVUS_ALIAS)
+    sp = sub.add_parser("rebuild", help="Yeni koleksiyon sürümüne tam ingest → smoke test → alias'ı çevir")
+    sp.add_argument("--file", type=str, required=True, help="JSON/JSONL dosya veya klasör")
+    sp.add_argument("--smoke", type=str, default=None, help="Smoke sorguları (question/url alanlı JSON/JSONL; REBUILD_SMOKE_FILE)")
+    sp.add_argument("--smoke-n", type=int, default=None, help="Kullanılacak smoke sorgusu sayısı (REBUILD_SMOKE_N)")
+    sp.add_argument("--max-drop", type=float, default=None,
+                    help="Canlı sürüme göre izin verilen URL isabet düşüşü (REBUILD_MAX_RECALL_DROP)")
+    sp.add_argument("--keep", type=int, default=None, help="Saklanacak eski sürüm sayısı (MILVUS_KEEP_VERSIONS)")
+    sp.add_argument("--no-swap", action="store_true", help="Sürümü kur ve test et, alias'ı çevirme")
+    sp.set_defaults(func=_cmd_rebuild)
+
+    sp = sub.add_parser("rollback", help="Alias'ı bir önceki koleksiyon sürümüne geri çevir")
+    sp.set_defaults(func=_cmd_rollback)
+
     # ask
     sp = sub.add_parser("ask", help="Soru sor ve RAG yanıtı al")
     sp.add_argument("query", type=str, help="Kullanıcı sorusu")
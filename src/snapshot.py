@@ -0,0 +1,284 @@
+"""
+Taşınabilir indeks snapshot'ı (soğuk başlangıç, ağsız CI).
+Tek klasör, kendi kendine yeter; VECTOR_BACKEND=local + SNAPSHOT_PATH ile mmap'lenerek açılır
+(vektörler okunmaz/kopyalanmaz, sayfalar ilk aramada OS önbelleğine gelir).
+
+Klasör düzeni:
+  - manifest.json              : format, model, dim, metric, count, kategori adları, dosya boyutları/sha256
+  - vectors.npy / norms.npy    : float32 (N, dim) / (N,)
+  - ids.npy / chunk_id.npy     : int64 (N,)
+  - category.npy               : uint16 (N,) kategori kodu (adlar manifest'te)
+  - url.bin + url.offsets.npy  : UTF-8 sütun + int64 (N+1) bayt sınırları
+  - text.bin + text.offsets.npy: aynı şekilde chunk metinleri
+Ingest, SNAPSHOT_DIR doluysa <SNAPSHOT_DIR>/<koleksiyon>/v<zaman>/ altına yazar ve CURRENT'ı çevirir
+(text_store ile aynı düzen; SNAPSHOT_PATH bu köke veya doğrudan bir snapshot klasörüne işaret edebilir).
+"""
+from __future__ import annotations
+
+import os
+import json
+import mmap
+import time
+import shutil
+import hashlib
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .config import settings
+from . import local_index
+
+FORMAT = "diyoloji-snapshot/1"
+_MANIFEST = "manifest.json"
+_CURRENT = "CURRENT"
+_ARRAYS = ("vectors", "norms", "ids", "chunk_id", "category")
+_STRINGS = ("url", "text")
+
+# ---- Sütunlar ----
+class _Strings(Sequence):
+    """mmap'li UTF-8 sütun; eleman erişiminde çözülür (liste gibi davranır, bellekte kopya tutmaz)."""
+
+    def __init__(self, blob, offsets: np.ndarray):
+        self._blob = blob
+        self._view = memoryview(blob)
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return int(self.offsets.shape[0]) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        return str(self._view[int(self.offsets[i]) : int(self.offsets[i + 1])], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+class _RowMap:
+    """row id → satır; dict ilk erişimde kurulur (açılış O(1) kalsın)."""
+
+    def __init__(self, ids: np.ndarray):
+        self._ids = ids
+        self._map: Optional[Dict[int, int]] = None
+
+    def _m(self) -> Dict[int, int]:
+        if self._map is None:
+            self._map = {int(r): i for i, r in enumerate(self._ids.tolist())}
+        return self._map
+
+    def get(self, key, default=None):
+        return self._m().get(key, default)
+
+    def __getitem__(self, key):
+        return self._m()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._m()
+
+def _write_strings(gdir: str, name: str, values: Sequence[str]) -> None:
+    offsets = np.zeros((len(values) + 1,), dtype=np.int64)
+    with open(os.path.join(gdir, f"{name}.bin"), "wb") as f:
+        pos = 0
+        for i, v in enumerate(values):
+            b = (v or "").encode("utf-8")
+            f.write(b)
+            pos += len(b)
+            offsets[i + 1] = pos
+    np.save(os.path.join(gdir, f"{name}.offsets.npy"), offsets)
+
+def _open_strings(d: str, name: str) -> _Strings:
+    offsets = np.load(os.path.join(d, f"{name}.offsets.npy"), mmap_mode="r")
+    blob: object = b""
+    if int(offsets[-1]) > 0:
+        with open(os.path.join(d, f"{name}.bin"), "rb") as f:
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return _Strings(blob, offsets)
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _files(d: str) -> List[str]:
+    return [f"{a}.npy" for a in _ARRAYS] + [f for s in _STRINGS for f in (f"{s}.bin", f"{s}.offsets.npy")]
+
+# ---- Yazma ----
+def write(out_dir: str, idx: "local_index.LocalVectorIndex", collection: str = "") -> Dict[str, object]:
+    """Yerel indeksi out_dir'e snapshot olarak yaz (klasör yoksa oluşturulur, varsa üzerine yazılır)."""
+    os.makedirs(out_dir, exist_ok=True)
+    n = len(idx)
+    names = sorted({str(c) for c in idx.categories.tolist()})
+    code = {c: k for k, c in enumerate(names)}
+    vectors = np.ascontiguousarray(idx.vectors, dtype=np.float32).reshape(n, -1) if n else np.zeros((0, idx.dim), np.float32)
+    np.save(os.path.join(out_dir, "vectors.npy"), vectors)
+    np.save(os.path.join(out_dir, "norms.npy"), np.linalg.norm(vectors, axis=1).astype(np.float32))
+    np.save(os.path.join(out_dir, "ids.npy"), np.asarray(idx.ids, dtype=np.int64))
+    np.save(os.path.join(out_dir, "chunk_id.npy"), np.asarray(idx.chunk_ids, dtype=np.int64))
+    np.save(os.path.join(out_dir, "category.npy"), np.asarray([code[str(c)] for c in idx.categories.tolist()], dtype=np.uint16))
+    _write_strings(out_dir, "url", idx.urls)
+    _write_strings(out_dir, "text", idx.texts)
+    manifest = {
+        "format": FORMAT,
+        "model": settings.openai_embed_model,
+        "dim": int(vectors.shape[1]) if n else int(idx.dim),
+        "metric": idx.metric,
+        "count": n,
+        "collection": collection,
+        "categories": names,
+        "created_at": int(time.time()),
+        "files": {
+            f: {"bytes": os.path.getsize(os.path.join(out_dir, f)), "sha256": _sha256(os.path.join(out_dir, f))}
+            for f in _files(out_dir)
+        },
+    }
+    # manifest en son yazılır: manifest'i olan klasör tamdır
+    tmp = os.path.join(out_dir, _MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(out_dir, _MANIFEST))
+    return manifest
+
+def publish(root: str, idx: "local_index.LocalVectorIndex", collection: str = "") -> str:
+    """root/v<zaman>/ altına yaz, CURRENT'ı atomik çevir; bir önceki sürüm saklanır, daha eskiler silinir."""
+    os.makedirs(root, exist_ok=True)
+    gen = f"v{time.time_ns()}"
+    write(os.path.join(root, gen), idx, collection)
+    cur = os.path.join(root, _CURRENT)
+    try:
+        with open(cur, "r", encoding="utf-8") as f:
+            prev = f.read().strip()
+    except OSError:
+        prev = ""
+    tmp = cur + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(gen)
+    os.replace(tmp, cur)
+    for d in os.listdir(root):
+        if d not in (gen, prev, _CURRENT) and os.path.isdir(os.path.join(root, d)):
+            shutil.rmtree(os.path.join(root, d), ignore_errors=True)
+    return os.path.join(root, gen)
+
+# ---- Okuma ----
+def resolve(path: str) -> str:
+    """Snapshot klasörü ya da CURRENT içeren kök → snapshot klasörü."""
+    path = os.path.abspath(path)
+    if os.path.exists(os.path.join(path, _MANIFEST)):
+        return path
+    try:
+        with open(os.path.join(path, _CURRENT), "r", encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    except OSError:
+        raise FileNotFoundError(f"no snapshot at {path} (manifest.json or CURRENT expected)")
+
+def read_manifest(path: str) -> Dict[str, object]:
+    with open(os.path.join(resolve(path), _MANIFEST), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _check(d: str, m: Dict[str, object], verify: bool = False) -> None:
+    if m.get("format") != FORMAT:
+        raise ValueError(f"unsupported snapshot format: {m.get('format')}")
+    if m.get("model") != settings.openai_embed_model or int(m.get("dim") or 0) != int(settings.milvus_dim):
+        raise ValueError(
+            f"snapshot built with {m.get('model')}/{m.get('dim')}, "
+            f"config is {settings.openai_embed_model}/{settings.milvus_dim}"
+        )
+    for f, info in (m.get("files") or {}).items():
+        p = os.path.join(d, f)
+        if not os.path.exists(p) or os.path.getsize(p) != int(info["bytes"]):
+            raise ValueError(f"snapshot file missing or truncated: {p}")
+        if verify and _sha256(p) != info["sha256"]:
+            raise ValueError(f"snapshot checksum mismatch: {p}")
+
+def load(path: str, verify: bool = False) -> "local_index.LocalVectorIndex":
+    """Snapshot'ı mmap'leyerek salt-okunur LocalVectorIndex olarak aç (ilk yazımda belleğe kopyalanır)."""
+    d = resolve(path)
+    m = read_manifest(d)
+    _check(d, m, verify)
+    idx = local_index.LocalVectorIndex(d, dim=int(m["dim"]))
+    idx.metric = str(m.get("metric") or idx.metric).upper()
+    idx.vectors = np.load(os.path.join(d, "vectors.npy"), mmap_mode="r")
+    idx.norms = np.load(os.path.join(d, "norms.npy"), mmap_mode="r")
+    idx.ids = np.load(os.path.join(d, "ids.npy"), mmap_mode="r")
+    idx.chunk_ids = np.load(os.path.join(d, "chunk_id.npy"), mmap_mode="r")
+    codes = np.load(os.path.join(d, "category.npy"), mmap_mode="r")
+    names = np.asarray(m.get("categories") or [], dtype=str)
+    idx.categories = names[codes] if names.size else np.zeros((len(codes),), dtype=str)
+    idx.urls = _open_strings(d, "url")
+    idx.texts = _open_strings(d, "text")
+    idx._rows = _RowMap(idx.ids)
+    idx._cat_rows = {str(c): np.flatnonzero(codes == k) for k, c in enumerate(names.tolist())}
+    idx.read_only = True
+    return idx
+
+def import_snapshot(path: str, name: Optional[str] = None, verify: bool = True) -> int:
+    """Snapshot'ı LOCAL_INDEX_DIR'deki yerel indekse (vektör + meta + BM25 + metin deposu) dönüştür."""
+    from . import bm25_index, category_router, text_store
+
+    snap = load(path, verify=verify)
+    idx = local_index.LocalVectorIndex(local_index.index_path(name), dim=snap.dim)
+    idx.upsert(
+        np.asarray(snap.ids).tolist(), snap.categories.tolist(), list(snap.urls),
+        np.asarray(snap.chunk_ids).tolist(), list(snap.texts), np.asarray(snap.vectors),
+    )
+    idx.metric = snap.metric
+    # Aynı klasörde eski indeksin metin deposu varsa snapshot'ta olmayan satırları düş (tam değişim)
+    idx._deleted.update(set(np.asarray(text_store.get_store(name).ids).tolist()) - set(idx.ids.tolist()))
+    idx.save()
+    bm25_index.rebuild(name, idx)
+    category_router.build(name, idx)
+    return len(idx)
+
+# ---- Süreç içi önbellek: CURRENT/manifest değişince yeniden aç ----
+_CACHE: Dict[str, "tuple[float, local_index.LocalVectorIndex]"] = {}
+_CACHE_LOCK = threading.Lock()
+
+def get_snapshot(path: str) -> "local_index.LocalVectorIndex":
+    path = os.path.abspath(path)
+    try:
+        marker = os.path.join(path, _CURRENT)
+        if not os.path.exists(marker):
+            marker = os.path.join(path, _MANIFEST)
+        mtime = os.stat(marker).st_mtime
+    except OSError:
+        mtime = 0.0
+    with _CACHE_LOCK:
+        hit = _CACHE.get(path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+        idx = load(path)
+        _CACHE[path] = (mtime, idx)
+        return idx
+
+# ----------------- CLI -----------------
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Diyoloji - taşınabilir indeks snapshot'ı")
+    ap.add_argument("--export", type=str, default=None, help="Yerel indeksi bu klasöre snapshot olarak yaz")
+    ap.add_argument("--import", dest="import_path", type=str, default=None,
+                    help="Snapshot'ı LOCAL_INDEX_DIR'e yerel indeks olarak aktar (BM25 + metin deposu dahil)")
+    ap.add_argument("--info", type=str, default=None, help="Snapshot manifest'ini göster ve dosyaları doğrula")
+    ap.add_argument("--collection", type=str, default=None, help="Koleksiyon/sürüm adı (varsayılan: etkin)")
+    args = ap.parse_args()
+
+    if args.export:
+        idx = local_index.get_index(args.collection, writable=True)
+        m = write(os.path.abspath(args.export), idx, collection=os.path.basename(idx.path))
+        print(f"Snapshot yazıldı: {args.export} ({m['count']} satır, {m['model']}, dim={m['dim']}, {m['metric']})")
+    if args.import_path:
+        print(f"İçe aktarılan satır: {import_snapshot(args.import_path, args.collection)}")
+    if args.info:
+        d = resolve(args.info)
+        m = read_manifest(d)
+        t0 = time.perf_counter()
+        _check(d, m, verify=True)
+        n = len(load(d))
+        print(json.dumps({k: v for k, v in m.items() if k != "files"}, ensure_ascii=False, indent=2))
+        print(f"Doğrulandı: {n} satır, açılış+doğrulama {1000 * (time.perf_counter() - t0):.0f} ms")
@@ -0,0 +1,164 @@
+"""
+Bellek eşlemeli (mmap) chunk metin deposu.
+Arama sonuçlarının metni Milvus'tan taşınmadan yerelde, row id (_hash_row_id) ile çözülür.
+Aynı makinedeki uvicorn worker'ları dosyaları mmap'ler; sayfalar OS önbelleğinde paylaşılır.
+
+Disk düzeni (<LOCAL_INDEX_DIR>/<koleksiyon>/text/):
+  - CURRENT               : geçerli sürüm klasörünün adı (atomik değiştirilir)
+  - <sürüm>/ids.npy       : int64, artan sıralı row id'ler
+  - <sürüm>/offsets.npy   : int64 (N+1), texts.bin içindeki bayt sınırları
+  - <sürüm>/texts.bin     : UTF-8 metinler art arda
+Yeni sürüm yazılırken okuyan süreçler eski klasörü kullanmaya devam eder; bir önceki sürüm saklanır.
+Yerel indeksin metinleri yalnızca burada tutulur: LocalVectorIndex.save() son kayıttan beri eklenen/silinen
+satırları update() ile geçerli sürüme işler (meta.json metin içermez).
+"""
+from __future__ import annotations
+
+import os
+import mmap
+import time
+import shutil
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from . import local_index
+
+_DIR = "text"
+_CURRENT = "CURRENT"
+
+def store_path(name: Optional[str] = None) -> str:
+    return store_dir(local_index.index_path(name))
+
+def store_dir(index_dir: str) -> str:
+    """Bir yerel indeks klasörünün metin deposu klasörü."""
+    return os.path.join(index_dir, _DIR)
+
+class TextStore:
+    def __init__(self, path: str, ids: np.ndarray, offsets: np.ndarray, blob):
+        self.path = path
+        self.ids = ids
+        self.offsets = offsets
+        self._blob = blob
+        self._view = memoryview(blob)
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    @classmethod
+    def empty(cls, path: str) -> "TextStore":
+        return cls(path, np.zeros((0,), np.int64), np.zeros((1,), np.int64), b"")
+
+    @classmethod
+    def open(cls, path: str) -> "TextStore":
+        try:
+            with open(os.path.join(path, _CURRENT), "r", encoding="utf-8") as f:
+                gen = f.read().strip()
+        except OSError:
+            return cls.empty(path)
+        gdir = os.path.join(path, gen)
+        ids = np.load(os.path.join(gdir, "ids.npy"), mmap_mode="r")
+        offsets = np.load(os.path.join(gdir, "offsets.npy"), mmap_mode="r")
+        blob: object = b""
+        if int(offsets[-1]) > 0:
+            with open(os.path.join(gdir, "texts.bin"), "rb") as f:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(path, ids, offsets, blob)
+
+    def _text(self, i: int) -> str:
+        return str(self._view[int(self.offsets[i]) : int(self.offsets[i + 1])], "utf-8")
+
+    def get(self, row_id: int) -> Optional[str]:
+        i = int(np.searchsorted(self.ids, row_id))
+        if i < len(self) and int(self.ids[i]) == int(row_id):
+            return self._text(i)
+        return None
+
+    def get_many(self, row_ids: Sequence[int]) -> Dict[int, str]:
+        """Bulunan id'ler için {row_id: metin}; bulunamayanlar sonuçta yer almaz."""
+        if not len(self) or not len(row_ids):
+            return {}
+        q = np.asarray(row_ids, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.ids, q), len(self) - 1)
+        found = self.ids[pos] == q
+        return {int(r): self._text(int(i)) for r, i, ok in zip(q.tolist(), pos.tolist(), found.tolist()) if ok}
+
+def _publish(path: str, ids: np.ndarray, chunks: Iterable[bytes]) -> int:
+    """Yeni sürüm klasörü yaz (ids artan sıralı, chunks aynı sırada), CURRENT'ı atomik olarak ona çevir."""
+    os.makedirs(path, exist_ok=True)
+    offsets = np.zeros((int(ids.shape[0]) + 1,), dtype=np.int64)
+    gen = f"v{time.time_ns()}"
+    gdir = os.path.join(path, gen)
+    os.makedirs(gdir)
+    with open(os.path.join(gdir, "texts.bin"), "wb") as f:
+        pos = 0
+        for k, b in enumerate(chunks):
+            f.write(b)
+            pos += len(b)
+            offsets[k + 1] = pos
+    np.save(os.path.join(gdir, "ids.npy"), np.asarray(ids, dtype=np.int64))
+    np.save(os.path.join(gdir, "offsets.npy"), offsets)
+
+    cur = os.path.join(path, _CURRENT)
+    try:
+        with open(cur, "r", encoding="utf-8") as f:
+            prev = f.read().strip()
+    except OSError:
+        prev = ""
+    tmp = cur + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(gen)
+    os.replace(tmp, cur)
+    for d in os.listdir(path):
+        if d not in (gen, prev, _CURRENT) and os.path.isdir(os.path.join(path, d)):
+            shutil.rmtree(os.path.join(path, d), ignore_errors=True)
+    with _CACHE_LOCK:
+        _CACHE.pop(path, None)
+    return int(ids.shape[0])
+
+def update(path: str, texts: Dict[int, str], deleted: Iterable[int] = ()) -> int:
+    """
+    Geçerli sürümü yeni/değişen metinlerle (texts) birleştirip yeni sürüm yaz; deleted id'ler düşer.
+    Eski metinler mmap'ten bayt olarak kopyalanır (bellekte tüm korpus tutulmaz). Satır sayısını döner.
+    """
+    cur = TextStore.open(path)
+    old_ids = np.asarray(cur.ids, dtype=np.int64)
+    drop = np.fromiter(set(deleted) | set(texts), dtype=np.int64)
+    keep = np.flatnonzero(~np.isin(old_ids, drop))
+    if not texts and keep.shape[0] == old_ids.shape[0]:
+        return len(cur)
+    new_ids = np.asarray(sorted(texts), dtype=np.int64)
+    ids = np.concatenate([old_ids[keep], new_ids])
+    order = np.argsort(ids, kind="stable")
+    n_old = int(keep.shape[0])
+
+    def _chunks() -> Iterator[bytes]:
+        for k in order.tolist():
+            if k < n_old:
+                i = int(keep[k])
+                yield cur._view[int(cur.offsets[i]) : int(cur.offsets[i + 1])]
+            else:
+                yield (texts[int(new_ids[k - n_old])] or "").encode("utf-8")
+
+    return _publish(path, ids[order], _chunks())
+
+# ---- Süreç içi önbellek: CURRENT değişince (yeni ingest) yeniden aç ----
+_CACHE: Dict[str, "tuple[float, TextStore]"] = {}
+_CACHE_LOCK = threading.Lock()
+
+def get_store(name: Optional[str] = None) -> TextStore:
+    return get_store_at(store_path(name))
+
+def get_store_at(path: str) -> TextStore:
+    try:
+        mtime = os.stat(os.path.join(path, _CURRENT)).st_mtime
+    except OSError:
+        mtime = 0.0
+    with _CACHE_LOCK:
+        hit = _CACHE.get(path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+        store = TextStore.open(path)
+        _CACHE[path] = (mtime, store)
+        return store
@@ -0,0 +1,44 @@
+"""
+Token sayımı (rate limit bütçesi, chunk boyutu, ingest planı için).
+tiktoken kuruluysa ve kodlama yüklenebiliyorsa gerçek sayım; değilse ~4 karakter/token yaklaşımı.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Optional
+
+from .config import settings
+
+try:
+    import tiktoken  # opsiyonel
+except ImportError:  # pragma: no cover
+    tiktoken = None
+
+_ENCODERS: Dict[str, object] = {}
+_LOCK = threading.Lock()
+
+def _encoder(model: str):
+    with _LOCK:
+        if model in _ENCODERS:
+            return _ENCODERS[model]
+        enc = None
+        if tiktoken is not None:
+            try:
+                enc = tiktoken.encoding_for_model(model)
+            except KeyError:
+                try:
+                    enc = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    print(f"[warn] tiktoken encoding unavailable, using len/4: {e}")
+            except Exception as e:
+                # Kodlama dosyası indirilemedi (çevrimdışı) vb.
+                print(f"[warn] tiktoken encoding unavailable, using len/4: {e}")
+        _ENCODERS[model] = enc
+        return enc
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    text = text or ""
+    enc = _encoder(model or settings.openai_embed_model)
+    if enc is None:
+        return max(1, (len(text) + 3) // 4) if text else 0
+    return len(enc.encode(text, disallowed_special=()))
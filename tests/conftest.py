@@ -0,0 +1,26 @@
+"""
+Ağ gerektirmeyen birim testleri için ortak ayar.
+src modülleri içe aktarılmadan önce tüm yerel depolar (indeks, manifest, önbellekler) geçici klasöre yönlendirilir;
+böylece testler data/ altındaki gerçek dosyalara dokunmaz.
+"""
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="diyoloji-tests-")
+
+# Zorunlu ayarlar (.env yoksa, ör. CI); hiçbir test gerçek servise bağlanmaz
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MILVUS_URI", "https://example.invalid")
+os.environ.setdefault("MILVUS_TOKEN", "test")
+os.environ["LANGCHAIN_TRACING_V2"] = "false"
+os.environ["LANGSMITH_TRACING"] = "false"
+os.environ["VECTOR_BACKEND"] = "local"
+os.environ["SNAPSHOT_PATH"] = ""
+os.environ["LOCAL_INDEX_DIR"] = os.path.join(_TMP, "index")
+os.environ["INGEST_MANIFEST_DB"] = os.path.join(_TMP, "ingest_manifest.sqlite")
+os.environ["EMBED_CACHE_DB"] = os.path.join(_TMP, "embed_cache.sqlite")
+os.environ["EMBED_STORE_DIR"] = os.path.join(_TMP, "embed_store")
+os.environ["CORPUS_STAMP_PATH"] = os.path.join(_TMP, "corpus_version")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from src import answer_cache
+from src.answer_cache import SemanticAnswerCache
+
+@pytest.fixture(autouse=True)
+def _stamp(tmp_path, monkeypatch):
+    monkeypatch.setattr(answer_cache, "_STAMP_PATH", str(tmp_path / "corpus_version"))
+
+class _Clock:
+    def __init__(self, t: float = 1000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(answer_cache.time, "time", c)
+    return c
+
+def _vec(angle_deg: float):
+    a = np.deg2rad(angle_deg)
+    return [float(np.cos(a)), float(np.sin(a)), 0.0]
+
+def test_threshold(clock):
+    cache = SemanticAnswerCache(max_items=10, ttl_s=60, threshold=0.95, enabled=True)
+    cache.store(_vec(0), "billing", {"answer": "A"})
+    hit = cache.lookup(_vec(10), "billing")          # cos 10° ≈ 0.985
+    assert hit is not None and hit[0] == {"answer": "A"} and hit[1] == pytest.approx(np.cos(np.deg2rad(10)))
+    assert cache.lookup(_vec(30), "billing") is None  # cos 30° ≈ 0.866
+    # ölçek önemsiz (birim vektörle karşılaştırılır), kategori kapsamı önemli
+    assert cache.lookup([5.0, 0.0, 0.0], "billing") is not None
+    assert cache.lookup(_vec(0), "package") is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+def test_returned_payload_is_a_copy(clock):
+    cache = SemanticAnswerCache(max_items=10, ttl_s=60, threshold=0.9, enabled=True)
+    cache.store(_vec(0), None, {"answer": "A"})
+    cache.lookup(_vec(0), None)[0]["answer"] = "değişti"
+    assert cache.lookup(_vec(0), "other")[0] == {"answer": "A"}
+
+def test_ttl(clock):
+    cache = SemanticAnswerCache(max_items=10, ttl_s=60, threshold=0.9, enabled=True)
+    cache.store(_vec(0), "billing", {"answer": "A"})
+    clock.t += 59
+    assert cache.lookup(_vec(0), "billing") is not None
+    clock.t += 2
+    assert cache.lookup(_vec(0), "billing") is None
+    cache.store(_vec(90), "billing", {"answer": "B"})  # store süresi dolanları atar
+    assert len(cache) == 1
+
+def test_lru_eviction_within_scope(clock):
+    cache = SemanticAnswerCache(max_items=2, ttl_s=600, threshold=0.99, enabled=True)
+    cache.store(_vec(0), "billing", {"answer": "A"})
+    cache.store(_vec(90), "billing", {"answer": "B"})
+    assert cache.lookup(_vec(0), "billing") is not None   # A kullanıldı → B en eski
+    cache.store(_vec(180), "billing", {"answer": "C"})
+    assert len(cache) == 2
+    assert cache.lookup(_vec(90), "billing") is None
+    assert cache.lookup(_vec(0), "billing")[0] == {"answer": "A"}
+
+def test_lru_eviction_across_scopes(clock):
+    cache = SemanticAnswerCache(max_items=2, ttl_s=600, threshold=0.99, enabled=True)
+    cache.store(_vec(0), "billing", {"answer": "A"})
+    cache.store(_vec(0), "package", {"answer": "B"})
+    assert cache.lookup(_vec(0), "billing") is not None   # A kullanıldı → en eski B
+    cache.store(_vec(90), "roaming", {"answer": "C"})
+    assert cache.lookup(_vec(0), "package") is None
+    assert cache.lookup(_vec(0), "billing")[0] == {"answer": "A"}
+    assert cache.lookup(_vec(90), "roaming")[0] == {"answer": "C"}
+
+def test_corpus_stamp_invalidates_other_instances(clock):
+    cache = SemanticAnswerCache(max_items=10, ttl_s=600, threshold=0.9, enabled=True)
+    cache.store(_vec(0), "billing", {"answer": "A"})
+    answer_cache.bump_corpus_stamp()   # ör. başka süreçte ingest
+    assert cache.lookup(_vec(0), "billing") is None
+    assert len(cache) == 0
+    cache.store(_vec(0), "billing", {"answer": "B"})
+    assert cache.lookup(_vec(0), "billing")[0] == {"answer": "B"}
+
+def test_disabled_cache_is_inert(clock):
+    for cache in (SemanticAnswerCache(enabled=False), SemanticAnswerCache(max_items=0, enabled=True)):
+        cache.store(_vec(0), "billing", {"answer": "A"})
+        assert cache.lookup(_vec(0), "billing") is None and len(cache) == 0
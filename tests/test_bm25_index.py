@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from src import bm25_index, local_index
+from src.bm25_index import BM25Index, tokenize, tr_fold
+from src.project_pipeline import _rrf_fuse
+
+# ---- Türkçe katlama / kök ----
+@pytest.mark.parametrize("raw, folded", [
+    ("İSTANBUL", "istanbul"),
+    ("Iğdır", "igdir"),
+    ("ÇĞÖŞÜ", "cgosu"),
+    ("Yurtdışı", "yurtdisi"),
+])
+def test_tr_fold(raw, folded):
+    assert tr_fold(raw) == folded
+
+@pytest.mark.parametrize("variants, stem", [
+    (["paket", "paketim", "paketler", "paketlerinden"], "paket"),
+    (["fatura", "faturası", "faturanın", "FATURASI"], "fatura"),
+    (["Yurtdışı", "yurtdışında", "YURTDIŞINDA"], "yurtdi"),
+])
+def test_suffix_variants_share_a_stem(variants, stem):
+    assert {tuple(tokenize(v)) for v in variants} == {(stem,)}
+
+def test_short_roots_and_numbers_are_kept():
+    # kök 4 (tek harfli ekte 5) karakterin altına inmez; sayılar olduğu gibi
+    assert tokenize("evim kimi 2024 5GB") == ["evim", "kimi", "2024", "5gb"]
+
+def test_tokenize_splits_on_punctuation():
+    assert tokenize("Hat-iptali, nasıl?") == ["hat", "iptal", "nasil"]
+
+# ---- BM25 sıralaması ----
+TEXTS = [
+    ("billing", "Faturası gecikenler son ödeme tarihini uygulamadan görebilir."),
+    ("billing", "Otomatik ödeme talimatı bankanızdan verilir."),
+    ("package", "Yurtdışında paketlerin nasıl kullanılacağı anlatılır."),
+    ("package", "Ek paket almak için menüye girin."),
+]
+
+def _build(name: str) -> local_index.LocalVectorIndex:
+    idx = local_index.LocalVectorIndex(local_index.index_path(name), dim=2)
+    n = len(TEXTS)
+    idx.upsert(list(range(1, n + 1)), [c for c, _ in TEXTS], [f"https://x/{i}" for i in range(1, n + 1)],
+               [0] * n, [t for _, t in TEXTS], np.ones((n, 2), dtype=np.float32))
+    idx.save()
+    bm25_index.rebuild(name)
+    return idx
+
+def test_top_ranks_inflected_match_first(tmp_path):
+    idx = local_index.LocalVectorIndex(str(tmp_path), dim=2)
+    idx.upsert([1, 2, 3, 4], [c for c, _ in TEXTS], ["u"] * 4, [0] * 4, [t for _, t in TEXTS], np.ones((4, 2)))
+    bm = BM25Index.build(idx)
+    ranked = bm.top("faturanın son ödeme tarihi", 4)
+    assert ranked[0][0] == 1
+    assert [s for _, s in ranked] == sorted((s for _, s in ranked), reverse=True)
+    assert all(s > 0 for _, s in ranked)
+    assert bm.top("", 4) == [] and bm.top("fatura", 0) == []
+    # kaydedilen token dosyasından aynı sonuç
+    assert BM25Index.load(str(tmp_path)).top("faturanın son ödeme tarihi", 4) == ranked
+
+def test_search_category_filter_and_score_scale():
+    _build("bm25_test")
+    hits = bm25_index.search("yurtdışı paket", "package", 5, name="bm25_test")
+    assert [h["id"] for h in hits] == [3, 4]
+    assert hits[0]["score"] == pytest.approx(1.0)
+    assert all(h["category"] == "package" for h in hits)
+    assert bm25_index.search("yurtdışı paket", "billing", 5, name="bm25_test") == []
+
+# ---- RRF birleştirme ----
+def _h(i, score, **kw):
+    return {"id": i, "url": f"https://x/{i}", "category": "c", "chunk_id": 0, "text": f"t{i}", "score": score, **kw}
+
+def test_rrf_fusion_order():
+    dense = [_h(1, 0.9), _h(2, 0.8), _h(3, 0.7)]
+    lexical = [_h(3, 1.0, bm25_score=7.0), _h(1, 0.5, bm25_score=3.5), _h(4, 0.2, bm25_score=1.4)]
+    out = _rrf_fuse([dense, lexical], top_k=10, k=60)
+    # 1: 1/61+1/62 > 3: 1/63+1/61 > 2: 1/62 > 4: 1/63
+    assert [h["id"] for h in out] == [1, 3, 2, 4]
+    assert out[0]["score"] == pytest.approx((1 / 61 + 1 / 62) / (2 / 61))
+    assert all(0 < h["score"] <= 1 for h in out)
+    assert (out[0]["dense_score"], out[0]["bm25_score"]) == (0.9, 3.5)
+    assert out[2]["dense_score"] == 0.8 and "bm25_score" not in out[2]
+    assert out[3]["bm25_score"] == 1.4 and "dense_score" not in out[3]
+
+def test_rrf_top_k_and_text_fill():
+    dense = [dict(_h(1, 0.9), text=None), _h(2, 0.8)]
+    lexical = [_h(1, 1.0, bm25_score=2.0)]
+    out = _rrf_fuse([dense, lexical], top_k=1, k=60)
+    assert [h["id"] for h in out] == [1]
+    assert out[0]["text"] == "t1"
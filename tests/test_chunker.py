@@ -0,0 +1,88 @@
+import pytest
+
+from src import chunker
+from src.project_pipeline import chunk_text
+
+@pytest.fixture(autouse=True)
+def _word_tokens(monkeypatch):
+    # Token = kelime: sınır hesapları tiktoken'dan (ve ağdan) bağımsız, elle doğrulanabilir
+    monkeypatch.setattr(chunker, "count_tokens", lambda t: len((t or "").split()))
+
+TEXT = (
+    "Bir iki üç dört. Beş altı yedi sekiz. Dokuz on on-bir on-iki. "
+    "On-üç on-dört on-beş on-altı. On-yedi on-sekiz."
+)
+SENTENCES = chunker.split_sentences(TEXT)
+
+def test_split_sentences_keeps_abbreviations_and_ordinals():
+    text = "T.C. Kimlik No. 5 ile başvurun. Ücret 10 TL. 3. Adımda onaylayın! Prof. Dr. Ali gelir mi? Evet."
+    assert chunker.split_sentences(text) == [
+        "T.C. Kimlik No. 5 ile başvurun.", "Ücret 10 TL.", "3. Adımda onaylayın!", "Prof. Dr. Ali gelir mi?", "Evet.",
+    ]
+
+def test_split_paragraphs_drops_related_content_tail():
+    text = "Başlık\n\nBir iki üç. Dört beş.\nAltı yedi.\n\nDiğer içerikler Şunu da okuyun."
+    assert chunker.split_paragraphs(text) == [["Başlık"], ["Bir iki üç.", "Dört beş."], ["Altı yedi."]]
+
+def test_chunks_end_on_sentence_boundaries_within_budget():
+    chunks = chunker.chunk_sentences(TEXT, max_tokens=10, overlap_tokens=0)
+    assert chunks == [
+        "Bir iki üç dört. Beş altı yedi sekiz.",
+        "Dokuz on on-bir on-iki. On-üç on-dört on-beş on-altı. On-yedi on-sekiz.",
+    ]
+    assert all(len(c.split()) <= 10 for c in chunks)
+    assert " ".join(chunks) == " ".join(SENTENCES)
+
+def test_overlap_carries_trailing_sentences():
+    chunks = chunker.chunk_sentences(TEXT, max_tokens=10, overlap_tokens=4)
+    assert chunks == [
+        "Bir iki üç dört. Beş altı yedi sekiz.",
+        "Beş altı yedi sekiz. Dokuz on on-bir on-iki.",
+        "Dokuz on on-bir on-iki. On-üç on-dört on-beş on-altı. On-yedi on-sekiz.",
+    ]
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.startswith(prev.split(". ")[-1])
+    assert all(len(c.split()) <= 10 for c in chunks)
+
+def test_overlap_never_exceeds_overlap_budget():
+    # son cümle (4 token) örtüşme bütçesine (3) sığmıyor → taşınmaz
+    assert chunker.chunk_sentences(TEXT, max_tokens=10, overlap_tokens=3) == \
+        chunker.chunk_sentences(TEXT, max_tokens=10, overlap_tokens=0)
+
+def test_paragraph_end_cuts_half_full_chunk():
+    text = "Kısa paragraf bir iki. Üç dört beş altı.\n\nİkinci paragraf burada. Bitiyor işte."
+    # ilk paragraf 8 token ≥ 12 // 2 → ikinci paragraf sığsa da yeni chunk
+    assert chunker.chunk_sentences(text, max_tokens=12) == [
+        "Kısa paragraf bir iki. Üç dört beş altı.", "İkinci paragraf burada. Bitiyor işte.",
+    ]
+    # yarıdan az doluysa paragraflar birleşir
+    assert len(chunker.chunk_sentences(text, max_tokens=20)) == 1
+
+def test_long_sentence_is_split_on_words():
+    long = " ".join(f"k{i}" for i in range(25)) + "."
+    chunks = chunker.chunk_sentences(long, max_tokens=10)
+    assert [len(c.split()) for c in chunks] == [10, 10, 5]
+    assert " ".join(chunks) == long
+
+def test_boilerplate_and_dropped_sentences():
+    text = "Başlık çerez politikası. Metin var. Çerezleri kabul ediyorsunuz. Her sayfada aynı cümle."
+    drop = {chunker.sentence_key("her SAYFADA  aynı cümle.")}
+    # ilk cümle (başlık) filtreden muaf; çerez bildirimi ve tekrar eden cümle atılır
+    assert chunker.chunk_sentences(text, max_tokens=50, drop=drop) == ["Başlık çerez politikası. Metin var."]
+
+def test_repeated_sentences_min_pages():
+    pages = ["Ortak cümle burada. Bir.", "Ortak cümle burada. İki.", "Üç."]
+    assert chunker.repeated_sentences(pages, 2) == {chunker.sentence_key("Ortak cümle burada.")}
+    assert chunker.repeated_sentences(pages, 3) == set()
+    assert chunker.repeated_sentences(pages, 0) == set()
+
+# ---- CHUNKER=chars ----
+def test_char_chunks_overlap_and_cover_text():
+    text = "".join(chr(ord("a") + i % 26) for i in range(25))
+    chunks = chunk_text(text, chunk_size=10, overlap=3)
+    assert [len(c) for c in chunks] == [10, 10, 10, 4]
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev[-3:] == nxt[:3]
+    assert chunks[0] + "".join(c[3:] for c in chunks[1:]) == text
+    assert chunk_text("", 10, 3) == []
+    assert chunk_text("abc", 2, 5) == ["ab", "bc", "c"]  # overlap ≥ size → adım 1
@@ -0,0 +1,73 @@
+import numpy as np
+
+from src import collection_alias
+from src.dedup import MinHasher, NearDupIndex, find_duplicates
+from src.ingest_manifest import IngestManifest
+from src.project_pipeline import _hash_row_id, attach_alt_urls
+
+BASE = " ".join(f"kelime{i}" for i in range(80))
+NEAR = BASE.replace("kelime40", "farklı")          # tek kelime farkı → 5 shingle değişir
+OTHER = " ".join(f"başka{i}" for i in range(80))
+
+def _jaccard(a: str, b: str, mh: MinHasher) -> float:
+    sa, sb = set(mh.shingles(a)), set(mh.shingles(b))
+    return len(sa & sb) / len(sa | sb)
+
+# ---- MinHash ----
+def test_signature_estimates_jaccard():
+    mh = MinHasher(num_perm=128)
+    # Türkçe büyük harf (i → İ) ve noktalama/boşluk farkı aynı imzayı verir
+    tr_upper = BASE.replace("i", "İ").upper().replace(" ", ",  ")
+    assert np.array_equal(mh.signature(BASE), mh.signature(tr_upper))
+    est = float(np.mean(mh.signature(BASE) == mh.signature(NEAR)))
+    assert abs(est - _jaccard(BASE, NEAR, mh)) < 0.1
+    assert float(np.mean(mh.signature(BASE) == mh.signature(OTHER))) < 0.1
+    assert mh.signature("") is None
+    assert mh.shingles("iki kelime") == ["iki kelime"]
+
+def test_near_dup_index_returns_first_canonical():
+    mh = MinHasher()
+    idx = NearDupIndex(threshold=0.8, bands=16)
+    assert idx.add("a", "g", mh.signature(BASE)) is None
+    assert idx.add("b", "g", mh.signature(NEAR)) == "a"
+    assert idx.add("c", "g", mh.signature(OTHER)) is None
+    # farklı grup (kategori) asla eşleşmez
+    assert idx.add("d", "h", mh.signature(BASE)) is None
+
+def test_find_duplicates_within_category_in_corpus_order():
+    pages = [
+        ("https://x/a", "billing", [BASE, OTHER]),
+        ("https://x/b", "billing", ["kısa özgün metin burada duruyor", NEAR]),
+        ("https://x/c", "package", [BASE]),
+        ("https://x/d", "billing", [OTHER, ""]),
+    ]
+    dups, stats = find_duplicates(pages, threshold=0.8)
+    assert dups == {("https://x/b", 1): ("https://x/a", 0), ("https://x/d", 0): ("https://x/a", 1)}
+    assert stats == {"chunks": 7, "duplicates": 2, "groups": 2, "ratio": round(2 / 7, 4)}
+
+def test_find_duplicates_threshold():
+    pages = [("https://x/a", "c", [BASE]), ("https://x/b", "c", [NEAR])]
+    assert find_duplicates(pages, threshold=0.8)[0]
+    assert not find_duplicates(pages, threshold=0.99)[0]
+
+# ---- alt_urls ----
+def test_attach_alt_urls_groups_duplicate_pages():
+    m = IngestManifest(collection_alias.physical_name())
+    canon = _hash_row_id("https://x/a", "billing", 0)
+    other = _hash_row_id("https://x/a", "billing", 1)
+    m.record_page("https://x/a", "billing", "h", [(0, canon, "c0"), (1, other, "c1")])
+    m.record_page("https://x/b", "billing", "h", [], duplicates=[(0, canon, "https://x/a")])
+    m.record_page("https://x/c", "billing", "h", [], duplicates=[(2, canon, "https://x/a"), (3, canon, "https://x/a")])
+
+    hits = [
+        {"id": canon, "url": "https://x/a", "category": "billing", "chunk_id": 0},
+        {"id": other, "url": "https://x/a", "category": "billing", "chunk_id": 1},
+        # id'siz sonuç (ör. eski Milvus satırı): url/kategori/chunk_id'den hesaplanır
+        {"url": "https://x/a", "category": "billing", "chunk_id": 0},
+    ]
+    out = attach_alt_urls(hits)
+    assert out is hits
+    assert hits[0]["alt_urls"] == ["https://x/b", "https://x/c"]
+    assert "alt_urls" not in hits[1]
+    assert hits[2]["alt_urls"] == ["https://x/b", "https://x/c"]
+    assert attach_alt_urls([]) == []
@@ -0,0 +1,129 @@
+import json
+from concurrent.futures import Future
+
+import numpy as np
+
+from src import local_index, project_pipeline
+from src.config import settings
+from src.ingest_manifest import IngestManifest, content_hash
+from src.project_pipeline import _hash_row_id, _ingest_items
+
+def _write(path, pages):
+    with open(path, "w", encoding="utf-8") as f:
+        for url, chunks in pages:
+            f.write(json.dumps({"url": url, "category": "fatura", "chunks": chunks}, ensure_ascii=False) + "\n")
+    return str(path)
+
+def _run(path, manifest, full=False):
+    """_ingest_items'ı çalıştırır; ingest_from_json gibi her sayfayı yazımdan sonra manifest'e işler."""
+    stats = {"unchanged_pages": 0, "changed_pages": 0}
+    chunks, stale = [], {}
+    for kind, item in _ingest_items(path, manifest, full, stats):
+        if kind == "chunk":
+            _, url, text, cid = item
+            chunks.append((url, cid, text))
+        else:
+            url, cat, page_hash, entries, ts, stale_ids, dups, _ = item
+            stale[url] = stale_ids
+            manifest.record_page(url, cat, page_hash, entries, ts, duplicates=dups)
+    return chunks, stale, stats
+
+def test_content_hash_separates_parts():
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+    assert content_hash("a", None) == content_hash("a", "")
+
+def test_delta_new_changed_removed(tmp_path):
+    m = IngestManifest("t", db_path=str(tmp_path / "m.sqlite"))
+    src = tmp_path / "corpus.jsonl"
+
+    # 1) boş manifest: her şey yeni
+    _write(src, [("https://x/a", ["a0", "a1", "a2"]), ("https://x/b", ["b0"])])
+    chunks, stale, stats = _run(str(src), m)
+    assert sorted((u, c) for u, c, _ in chunks) == [("https://x/a", 0), ("https://x/a", 1), ("https://x/a", 2), ("https://x/b", 0)]
+    assert stats == {"unchanged_pages": 0, "changed_pages": 2}
+    assert stale == {"https://x/a": [], "https://x/b": []}
+    rows_a = m.chunks("https://x/a")
+    assert sorted(rows_a) == [0, 1, 2]
+
+    # 2) aynı girdi: hiçbir şey embed edilmez
+    chunks, stale, stats = _run(str(src), m)
+    assert chunks == [] and stale == {}
+    assert stats == {"unchanged_pages": 2, "changed_pages": 0}
+
+    # 3) a1 değişti, a2 silindi, b aynı, c yeni
+    _write(src, [("https://x/a", ["a0", "a1 yeni"]), ("https://x/b", ["b0"]), ("https://x/c", ["c0"])])
+    chunks, stale, stats = _run(str(src), m)
+    assert [(u, c, t) for u, c, t in chunks] == [("https://x/a", 1, "a1 yeni"), ("https://x/c", 0, "c0")]
+    assert stale == {"https://x/a": [rows_a[2][0]], "https://x/c": []}
+    assert stats == {"unchanged_pages": 1, "changed_pages": 2}
+    assert sorted(m.chunks("https://x/a")) == [0, 1]
+    assert m.chunks("https://x/a")[0] == rows_a[0]
+    assert m.stats()["pages"] == 3 and m.stats()["chunks"] == 4
+
+def test_full_reembeds_everything(tmp_path):
+    m = IngestManifest("t", db_path=str(tmp_path / "m.sqlite"))
+    src = _write(tmp_path / "corpus.jsonl", [("https://x/a", ["a0", "a1"])])
+    _run(src, m)
+    chunks, _, stats = _run(src, m, full=True)
+    assert [(u, c) for u, c, _ in chunks] == [("https://x/a", 0), ("https://x/a", 1)]
+    assert stats["changed_pages"] == 1
+
+def test_row_ids_are_stable_per_url_category_chunk(tmp_path):
+    m = IngestManifest("t", db_path=str(tmp_path / "m.sqlite"))
+    src = _write(tmp_path / "corpus.jsonl", [("https://x/a", ["a0", "a1"])])
+    _run(src, m)
+    rows = m.chunks("https://x/a")
+    cat = _category_of(m, "https://x/a")
+    assert {cid: rid for cid, (rid, _) in rows.items()} == {i: _hash_row_id("https://x/a", cat, i) for i in (0, 1)}
+
+def test_collections_are_isolated(tmp_path):
+    db = str(tmp_path / "m.sqlite")
+    a, b = IngestManifest("v1", db_path=db), IngestManifest("v2", db_path=db)
+    a.record_page("https://x/a", "c", "h", [(0, 1, "ch")])
+    assert b.page_hashes() == {} and a.page_hashes() == {"https://x/a": "h"}
+    assert a.clear() == 1 and a.chunks("https://x/a") == {}
+
+def test_ingest_keeps_unsaved_rows_when_index_is_saved_elsewhere(tmp_path, monkeypatch):
+    def _embed(texts):
+        f = Future()
+        f.set_result(np.ones((len(texts), settings.milvus_dim), dtype=np.float32))
+        return f
+
+    monkeypatch.setattr(project_pipeline, "_embed_chunks_async", _embed)
+    monkeypatch.setattr(project_pipeline, "_EMBED_BATCH", 2)
+    monkeypatch.setattr(project_pipeline, "_INGEST_INSERT_BATCH", 2)
+    monkeypatch.setattr(project_pipeline, "_INGEST_CHECKPOINT_S", 3600.0)
+    upsert, calls = project_pipeline.upsert_docs, []
+
+    def _upsert_then_foreign_save(docs, **kw):
+        n = upsert(docs, **kw)
+        calls.append(n)
+        if len(calls) == 1:
+            # Başka bir süreç aynı indeksi ingest ortasında kaydeder (meta.json mtime'ı değişir)
+            other = local_index.LocalVectorIndex.load(local_index.index_path("hold"))
+            other.upsert([1], ["fatura"], ["https://x/other"], [0], ["başka"], np.zeros((1, settings.milvus_dim)))
+            other.save()
+        return n
+
+    monkeypatch.setattr(project_pipeline, "upsert_docs", _upsert_then_foreign_save)
+    src = _write(tmp_path / "corpus.jsonl", [(f"https://x/{i}", [f"p{i} c0", f"p{i} c1"]) for i in range(4)])
+    out = project_pipeline.ingest_from_json(src, collection="hold")
+    assert out["total_chunks"] == 8 and len(calls) > 1
+    saved = local_index.LocalVectorIndex.load(local_index.index_path("hold"))
+    assert sorted(saved.urls) == sorted(f"https://x/{i}" for i in range(4) for _ in range(2))
+
+def test_milvus_backend_mirrors_local_index_only_on_opt_in(monkeypatch):
+    monkeypatch.setattr(settings, "vector_backend", "milvus")
+    monkeypatch.setattr(settings, "milvus_store_text", False)
+    monkeypatch.setattr(settings, "local_index_mirror", False)
+    assert not project_pipeline._local_mirror()
+    assert project_pipeline._milvus_stores_text()  # metin deposu yok → metin Milvus'ta kalır
+    monkeypatch.setattr(settings, "local_index_mirror", True)
+    assert project_pipeline._local_mirror() and not project_pipeline._milvus_stores_text()
+    monkeypatch.setattr(settings, "vector_backend", "local")
+    monkeypatch.setattr(settings, "local_index_mirror", False)
+    assert project_pipeline._local_mirror()
+
+def _category_of(m: IngestManifest, url: str) -> str:
+    with m._connect() as cx:
+        return cx.execute("SELECT category FROM pages WHERE collection = ? AND url = ?", (m.collection, url)).fetchone()[0]
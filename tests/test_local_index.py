@@ -0,0 +1,174 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.local_index import LocalVectorIndex
+
+def _index(tmp_path, metric: str) -> LocalVectorIndex:
+    idx = LocalVectorIndex(str(tmp_path), dim=3)
+    idx.metric = metric
+    vectors = np.asarray([
+        [1.0, 0.0, 0.0],   # 1: billing, q ile aynı yön, kısa
+        [3.0, 0.3, 0.0],   # 2: billing, q ile neredeyse aynı yön, uzun (IP'de önde, L2'de geride)
+        [0.0, 1.0, 0.0],   # 3: package, dik
+        [0.7, 0.7, 0.0],   # 4: package, 45°
+        [-1.0, 0.0, 0.0],  # 5: roaming, ters yön
+    ], dtype=np.float32)
+    idx.upsert(
+        [1, 2, 3, 4, 5],
+        ["billing", "billing", "package", "package", "roaming"],
+        [f"https://x/{i}" for i in range(1, 6)],
+        [0, 1, 0, 1, 0],
+        [f"metin {i}" for i in range(1, 6)],
+        vectors,
+    )
+    return idx
+
+Q = [1.0, 0.0, 0.0]
+
+@pytest.mark.parametrize("metric, expected", [
+    ("IP", [2, 1, 4, 3, 5]),       # büyük dot product önce
+    ("COSINE", [1, 2, 4, 3, 5]),   # yön; uzunluk etkisiz
+    ("L2", [1, 4, 3, 5, 2]),       # küçük kare uzaklık önce
+])
+def test_top_k_order_per_metric(tmp_path, metric, expected):
+    idx = _index(tmp_path, metric)
+    hits = idx.search(Q, None, 5)
+    assert [h["id"] for h in hits] == expected
+    scores = [h["score"] for h in hits]
+    assert scores == sorted(scores, reverse=(metric != "L2"))
+
+def test_top_k_truncates_and_matches_full_ranking(tmp_path):
+    idx = _index(tmp_path, "COSINE")
+    assert [h["id"] for h in idx.search(Q, None, 2)] == [1, 2]
+    assert idx.search(Q, None, 0) == []
+
+def test_l2_scores_are_squared_distances(tmp_path):
+    idx = _index(tmp_path, "L2")
+    hits = {h["id"]: h["score"] for h in idx.search(Q, None, 5)}
+    assert hits[1] == pytest.approx(0.0, abs=1e-6)
+    assert hits[5] == pytest.approx(4.0, abs=1e-5)
+
+def test_category_filter(tmp_path):
+    idx = _index(tmp_path, "COSINE")
+    hits = idx.search(Q, "package", 5)
+    assert [h["id"] for h in hits] == [4, 3]
+    assert {h["category"] for h in hits} == {"package"}
+    assert idx.search(Q, "yok-boyle-kategori", 5) == []
+
+def test_search_many_groups_match_single_queries(tmp_path):
+    idx = _index(tmp_path, "COSINE")
+    qs = [Q, [0.0, 1.0, 0.0]]
+    many = idx.search_many(qs, "billing", 2)
+    assert many == [idx.search(q, "billing", 2) for q in qs]
+
+def test_hit_shape(tmp_path):
+    idx = _index(tmp_path, "IP")
+    h = idx.search(Q, "roaming", 1)[0]
+    assert set(h) == {"id", "url", "text", "category", "chunk_id", "score"}
+    assert (h["id"], h["url"], h["text"], h["chunk_id"]) == (5, "https://x/5", "metin 5", 0)
+
+def test_upsert_replaces_and_delete_updates_filters(tmp_path):
+    idx = _index(tmp_path, "COSINE")
+    # 3 numaralı satır billing'e taşınır ve q yönüne çevrilir
+    idx.upsert([3], ["billing"], ["https://x/3b"], [7], ["yeni"], [[2.0, 0.0, 0.0]])
+    assert len(idx) == 5
+    assert 3 in [h["id"] for h in idx.search(Q, "billing", 5)]
+    assert [h["id"] for h in idx.search(Q, "package", 5)] == [4]
+    assert idx.delete([4, 999]) == 1
+    assert idx.search(Q, "package", 5) == []
+    assert idx.hit(3)["url"] == "https://x/3b"
+
+def test_save_load_roundtrip(tmp_path):
+    idx = _index(tmp_path, "COSINE")
+    idx.save()
+    again = LocalVectorIndex.load(str(tmp_path))
+    assert again.metric == "COSINE"
+    assert again.search(Q, None, 5) == idx.search(Q, None, 5)
+
+def test_incremental_upserts_match_single_batch(tmp_path):
+    rng = np.random.default_rng(0)
+    vecs = rng.normal(size=(2500, 3)).astype(np.float32)
+    ids = list(range(1, 2501))
+    cats = [("a", "b", "c")[i % 3] for i in ids]
+    one = LocalVectorIndex(str(tmp_path / "one"), dim=3)
+    one.upsert(ids, cats, [str(i) for i in ids], [0] * 2500, [str(i) for i in ids], vecs)
+    many = LocalVectorIndex(str(tmp_path / "many"), dim=3)
+    for s in range(0, 2500, 7):  # kapasite birkaç kez büyür
+        e = min(s + 7, 2500)
+        many.upsert(ids[s:e], cats[s:e], [str(i) for i in ids[s:e]], [0] * (e - s), [str(i) for i in ids[s:e]], vecs[s:e])
+    assert len(many) == 2500
+    assert np.allclose(many.norms, np.linalg.norm(vecs, axis=1))
+    for cat in (None, "a", "c"):
+        assert many.search(vecs[10], cat, 10) == one.search(vecs[10], cat, 10)
+
+def test_upsert_duplicate_ids_in_one_call_keep_last(tmp_path):
+    idx = LocalVectorIndex(str(tmp_path), dim=3)
+    idx.upsert([1, 1], ["a", "b"], ["u1", "u2"], [0, 1], ["t1", "t2"], [[1, 0, 0], [0, 1, 0]])
+    assert len(idx) == 1
+    assert idx.hit(1)["url"] == "u2"
+    assert idx.search([0, 1, 0], "a", 5) == []
+    assert [h["id"] for h in idx.search([0, 1, 0], "b", 5)] == [1]
+
+def test_search_during_upserts_sees_consistent_rows(tmp_path):
+    idx = LocalVectorIndex(str(tmp_path), dim=3)
+    stop, errors = threading.Event(), []
+
+    def reader():
+        while not stop.is_set():
+            for h in idx.search([1.0, 0.0, 0.0], None, 5):
+                if h["url"] != f"u{h['id']}" or h["chunk_id"] != h["id"]:
+                    errors.append(h)
+
+    t = threading.Thread(target=reader)
+    t.start()
+    for rid in range(1, 3001):
+        idx.upsert([rid], ["a"], [f"u{rid}"], [rid], ["t"], [[1.0, rid / 3000, 0.0]])
+    stop.set()
+    t.join()
+    assert not errors
+
+def test_texts_live_in_text_store_not_meta(tmp_path):
+    import json
+
+    from src import text_store
+
+    idx = _index(tmp_path, "COSINE")
+    idx.save()
+    with open(tmp_path / "meta.json", encoding="utf-8") as f:
+        assert "text" not in json.load(f)
+    assert idx._pending == {}
+    assert text_store.get_store_at(text_store.store_dir(str(tmp_path))).get(3) == "metin 3"
+
+    again = LocalVectorIndex.load(str(tmp_path))
+    assert again._pending == {}
+    assert again.hit(3)["text"] == "metin 3"
+    assert list(again.texts) == [f"metin {i}" for i in range(1, 6)]
+
+    # Değişen metin kayda kadar bellekte, silinen satır kayıtta depodan düşer
+    again.upsert([3], ["package"], ["https://x/3"], [0], ["metin 3b"], [[0.0, 1.0, 0.0]])
+    again.delete([5])
+    assert again.hit(3)["text"] == "metin 3b"
+    again.save()
+    store = text_store.get_store_at(text_store.store_dir(str(tmp_path)))
+    assert store.get(3) == "metin 3b" and store.get(5) is None and len(store) == 4
+
+def test_legacy_meta_texts_move_to_text_store_on_save(tmp_path):
+    import json
+
+    idx = _index(tmp_path, "COSINE")
+    idx.save()
+    meta_path = tmp_path / "meta.json"
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["text"] = [f"eski {i}" for i in meta["ids"]]
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    legacy = LocalVectorIndex.load(str(tmp_path))
+    assert legacy.hit(2)["text"] == "eski 2"
+    legacy.save()
+    with open(meta_path, encoding="utf-8") as f:
+        assert "text" not in json.load(f)
+    assert LocalVectorIndex.load(str(tmp_path)).hit(2)["text"] == "eski 2"
@@ -0,0 +1,57 @@
+import grpc
+import pytest
+from pymilvus.exceptions import MilvusException, MilvusUnavailableException
+
+from src import project_pipeline
+from src.project_pipeline import _MilvusSession
+
+class _RpcError(grpc.RpcError):
+    def __init__(self, code):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+def _session(monkeypatch):
+    s = _MilvusSession()
+    opened = []
+    monkeypatch.setattr(s, "collection", lambda name=None: opened.append(name) or object())
+    return s, opened
+
+def _failing_once(err):
+    calls = []
+
+    def fn(col):
+        calls.append(col)
+        if len(calls) == 1:
+            raise err
+        return "ok"
+
+    return fn, calls
+
+@pytest.mark.parametrize("err", [
+    MilvusUnavailableException(message="server unavailable"),
+    _RpcError(grpc.StatusCode.UNAVAILABLE),
+    MilvusException(code=grpc.StatusCode.DEADLINE_EXCEEDED, message="retry timeout"),
+])
+def test_connection_errors_reconnect_and_retry_once(monkeypatch, err):
+    s, opened = _session(monkeypatch)
+    invalidated = []
+    monkeypatch.setattr(s, "invalidate", lambda: invalidated.append(1))
+    fn, calls = _failing_once(err)
+    assert s.run(fn) == "ok"
+    assert len(calls) == 2 and len(opened) == 2 and invalidated == [1]
+
+@pytest.mark.parametrize("err", [
+    MilvusException(code=1100, message="invalid expression"),
+    _RpcError(grpc.StatusCode.INVALID_ARGUMENT),
+    ValueError("bad row"),
+])
+def test_other_errors_are_raised_without_retry(monkeypatch, err):
+    s, opened = _session(monkeypatch)
+    monkeypatch.setattr(s, "invalidate", lambda: pytest.fail("session must not be dropped"))
+    fn, calls = _failing_once(err)
+    with pytest.raises(type(err)):
+        s.run(fn)
+    assert len(calls) == 1 and len(opened) == 1
+    assert not project_pipeline._milvus_retryable(err)
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+import types
+
+import pytest
+
+from src import rag
+from src.answer_cache import SemanticAnswerCache
+
+class _SlowHistory:
+    """Okuma yazımdan yavaş: get_last_turns depoyu gecikmeyle okur (yarış penceresini garanti eder)."""
+
+    def __init__(self, turns=None, delay: float = 0.3):
+        self.turns = list(turns or [])
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def get_last_turns(self, session_id, n):
+        time.sleep(self.delay)
+        with self.lock:
+            return [dict(t) for t in self.turns[-n:]]
+
+    def add_user_message(self, session_id, content, **kw):
+        with self.lock:
+            self.turns.append({"role": "user", "content": content})
+
+    def add_assistant_message(self, session_id, content, **kw):
+        with self.lock:
+            self.turns.append({"role": "assistant", "content": content})
+
+    def purge_old(self, days):
+        pass
+
+class _Chat:
+    def __init__(self):
+        self.prompts = []
+        self.completions = self
+
+    def create(self, model, messages, **kw):
+        self.prompts.append(messages[-1]["content"])
+        body = {"answer": "Fatura dökümünü kontrol edin.", "citations": [], "tool": "billing",
+                "intent": "billing", "sentiment": "neutral"}
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=json.dumps(body)))])
+
+@pytest.fixture
+def fake_rag(monkeypatch):
+    chat = _Chat()
+    cache = SemanticAnswerCache(max_items=10, ttl_s=600, threshold=0.95, enabled=True)
+    monkeypatch.setattr(rag, "_CLIENT", types.SimpleNamespace(chat=chat))
+    monkeypatch.setattr(rag, "_HAS_GUARDS", False)
+    monkeypatch.setattr(rag, "_input_guard", lambda q: False)
+    monkeypatch.setattr(rag, "_classify_safe", lambda q, qvec=None: ("billing", "neutral"))
+    monkeypatch.setattr(rag, "embed_query", lambda q: [1.0, 0.0, 0.0])
+    monkeypatch.setattr(rag, "search", lambda *a, **k: [])
+    monkeypatch.setattr(rag, "attach_alt_urls", lambda hits: hits)
+    monkeypatch.setattr(rag, "ANSWER_CACHE", cache)
+    monkeypatch.setattr(rag.settings, "history_enabled", True, raising=False)
+    return chat, cache
+
+QUERY = "Faturam neden yüksek geldi?"
+
+def test_first_turn_history_read_slower_than_write(fake_rag, monkeypatch):
+    chat, cache = fake_rag
+    store = _SlowHistory()
+    monkeypatch.setattr(rag, "hist", store)
+
+    out = rag.ask(QUERY, session_id="s1")
+
+    assert out.answer == "Fatura dökümünü kontrol edin."
+    prompt = chat.prompts[-1]
+    # bir kez geçmişte (bu tur), bir kez soru olarak — geç tamamlanan okuma soruyu çoğaltmamalı
+    assert prompt.count(QUERY) == 2
+    assert prompt.count(f"USER: {QUERY}") == 1
+    # ilk turda önceki konuşma yok → yanıt önbelleği kullanılır
+    assert len(cache) == 1
+    assert [t["role"] for t in store.turns] == ["user", "assistant"]
+
+def test_later_turn_keeps_prior_turns_and_skips_answer_cache(fake_rag, monkeypatch):
+    chat, cache = fake_rag
+    store = _SlowHistory([{"role": "user", "content": "Merhaba"}, {"role": "assistant", "content": "Selam"}])
+    monkeypatch.setattr(rag, "hist", store)
+
+    rag.ask(QUERY, session_id="s1")
+
+    prompt = chat.prompts[-1]
+    assert "USER: Merhaba" in prompt and "ASSISTANT: Selam" in prompt
+    assert prompt.count(f"USER: {QUERY}") == 1
+    assert len(cache) == 0